@@ -2,4 +2,31 @@
 Agent package for Morocco product price search
 """
 
+import importlib
+
 __version__ = "1.0.0"
+
+# Main classes, importable as `from agent import X`. Each is loaded on first
+# access so that importing the package (or any submodule) stays cheap.
+_LAZY_EXPORTS = {
+    "MoroccoSearchAgent": "agent.langchain_agent",
+    "AdvancedMoroccoSearchAgent": "agent.langchain_agent",
+    "ProductSearchAgent": "agent.product_searcher",
+    "SearchEngine": "agent.search_engine",
+    "Product": "agent.models",
+}
+
+__all__ = ["__version__", *_LAZY_EXPORTS]
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'agent' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS))
@@ -0,0 +1,247 @@
+"""
+Batch Search
+Runs many product queries through the direct search pipeline and writes JSONL results
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Set, TextIO
+
+import config
+from agent.matching import dedupe
+from agent.models import Product
+from agent.parse_pool import close_parse_pool, configure_parse_pool
+from agent.pipeline import build_engine
+from agent.price_history import PriceHistory, get_price_history
+from agent.search_engine import SearchEngine
+
+
+def read_queries(source: TextIO) -> List[str]:
+    """
+    Read one query per line, skipping blank lines, "#" comments and repeats
+
+    Args:
+        source: Open text file or sys.stdin
+
+    Returns:
+        Queries in file order
+    """
+    queries = dict.fromkeys(
+        line.strip() for line in source if line.strip() and not line.lstrip().startswith('#')
+    )
+    return list(queries)
+
+
+def load_checkpoint(path: str) -> Set[str]:
+    """
+    Queries already completed in an existing JSONL output file
+
+    A line cut short by a crash is removed from the end of the file, so new
+    results are appended after the last complete line.
+
+    Args:
+        path: Output file of an earlier (interrupted) run
+
+    Returns:
+        Queries with an "ok" result line ("partial" and "error" queries are run again)
+    """
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            f.truncate(end)
+
+    done = set()
+    for line in data[:end].decode('utf-8').splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get('status') == 'ok':
+            done.add(record['query'])
+    return done
+
+
+class BatchRunner:
+    """
+    Runs queries through one shared SearchEngine with bounded concurrency
+
+    All queries share the engine's store tools, so they also share the pooled
+    HTTP connections, rate limiters and result/page caches. At most
+    `concurrency` queries are in flight; each result line is written and
+    flushed as soon as its query finishes, which makes the output file the
+    checkpoint for a resumed run.
+
+    A query is "ok" when every store answered, "partial" when some stores
+    failed or timed out and "error" when all of them did; only "ok" queries
+    are skipped on resume.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[SearchEngine] = None,
+        concurrency: Optional[int] = None,
+        history: Optional[PriceHistory] = None,
+        history_batch_size: int = 50,
+    ):
+        """
+        Initialize the runner
+
+        Args:
+            engine: Search engine to use (default: the direct pipeline's store tools)
+            concurrency: Queries in flight at once (default: enough to keep the
+                shared store-search worker threads busy without queueing)
+            history: Price history to record results in (None = don't record)
+            history_batch_size: Queries buffered per price-history transaction
+        """
+        self.engine = engine or build_engine()
+        self.concurrency = concurrency or max(1, config.SEARCH_WORKERS // max(1, len(self.engine.stores)))
+        self.history = history
+        self.history_batch_size = history_batch_size
+        self._pending_history = []
+
+    async def _run_query(self, query: str) -> Dict:
+        """Search one query and build its result record"""
+        start = time.perf_counter()
+        store_errors: Dict[str, str] = {}
+        try:
+            by_store = await self.engine.search_stores(query, store_errors)
+        except Exception as e:
+            return {'query': query, 'status': 'error', 'error': str(e),
+                    'elapsed': round(time.perf_counter() - start, 3)}
+
+        products: List[Product] = sorted(
+            dedupe(product for products in by_store.values() for product in products),
+            key=lambda product: product.price,
+        )
+        record = {
+            'query': query,
+            'status': 'ok',
+            'elapsed': round(time.perf_counter() - start, 3),
+            'count': len(products),
+            'stores': {store: len(found) for store, found in by_store.items() if store not in store_errors},
+            'missing_stores': [store for store in self.engine.stores if store not in by_store],
+            'store_errors': store_errors,
+            'best': products[0].to_dict() if products else None,
+            'products': [product.to_dict() for product in products],
+            '_products': products,
+        }
+        if store_errors:
+            if len(store_errors) >= len(self.engine.stores):
+                record.update(status='error', error='every store failed')
+            else:
+                record['status'] = 'partial'
+        return record
+
+    def _record_history(self, query: str, products: List[Product], flush: bool = False):
+        """Buffer results for the price history and write them in batches"""
+        if self.history is None:
+            return
+        if products:
+            self._pending_history.append((query, products))
+        if self._pending_history and (flush or len(self._pending_history) >= self.history_batch_size):
+            self.history.record_many(self._pending_history)
+            self._pending_history = []
+
+    async def run(self, queries: Iterable[str], output: TextIO, progress: Optional[TextIO] = sys.stderr) -> Dict:
+        """
+        Run every query and write one JSON line per query as it finishes
+
+        Args:
+            queries: Queries to run
+            output: Text stream receiving the JSONL records
+            progress: Stream for one progress line per query (None = quiet)
+
+        Returns:
+            Run statistics (queries, ok, partial, errors, products, elapsed)
+        """
+        queries = list(queries)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        stats = {'queries': len(queries), 'ok': 0, 'partial': 0, 'errors': 0, 'products': 0}
+        start = time.perf_counter()
+
+        async def bounded(query: str) -> Dict:
+            async with semaphore:
+                return await self._run_query(query)
+
+        tasks = [asyncio.create_task(bounded(query)) for query in queries]
+        try:
+            for finished, task in enumerate(asyncio.as_completed(tasks), 1):
+                record = await task
+                products = record.pop('_products', [])
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                output.flush()
+
+                if record['status'] == 'error':
+                    stats['errors'] += 1
+                else:
+                    stats[record['status']] += 1
+                    stats['products'] += record['count']
+                    self._record_history(record['query'], products)
+
+                if progress is not None:
+                    if record['status'] == 'error':
+                        outcome = f"error: {record['error']}"
+                    elif record['best']:
+                        best = record['best']
+                        outcome = f"{record['count']} products, best {best['price']:.2f} {best['currency']} at {best['store']}"
+                    else:
+                        outcome = "no products"
+                    if record['status'] == 'partial':
+                        outcome += f" ({len(record['store_errors'])} stores failed)"
+                    print(f"[{finished}/{len(queries)}] {record['query']} - {outcome} ({record['elapsed']:.1f}s)",
+                          file=progress)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._record_history('', [], flush=True)
+
+        stats['elapsed'] = round(time.perf_counter() - start, 3)
+        return stats
+
+
+def run_batch(
+    source: TextIO,
+    output_path: str,
+    concurrency: Optional[int] = None,
+    resume: bool = False,
+    save_history: bool = False,
+    parse_workers: Optional[int] = None,
+) -> Dict:
+    """
+    Run a batch sweep from a query file into a JSONL file
+
+    Args:
+        source: Query file or sys.stdin, one query per line
+        output_path: JSONL file receiving one record per query
+        concurrency: Queries in flight at once (default: see BatchRunner)
+        resume: Skip queries already completed in output_path and append to it
+        save_history: Also record every result in the price history
+        parse_workers: Processes extracting products from fetched pages
+            (default: one per core, 0 = parse in the fetching threads)
+
+    Returns:
+        Run statistics, including how many queries were skipped on resume
+    """
+    queries = read_queries(source)
+    done = load_checkpoint(output_path) if resume else set()
+    remaining = [query for query in queries if query not in done]
+
+    runner = BatchRunner(concurrency=concurrency, history=get_price_history() if save_history else None)
+    # A sweep parses many pages at once, so extraction gets every core
+    if parse_workers != 0:
+        configure_parse_pool(parse_workers)
+    try:
+        with open(output_path, 'a' if resume else 'w', encoding='utf-8') as output:
+            stats = asyncio.run(runner.run(remaining, output))
+    finally:
+        if parse_workers != 0:
+            close_parse_pool()
+    stats['skipped'] = len(queries) - len(remaining)
+    return stats
@@ -0,0 +1,320 @@
+"""
+Search Result Cache
+TTL + LRU cache for store search results, with single-flight de-duplication and optional SQLite persistence
+"""
+
+import functools
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import config
+from agent.models import loads_products
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share a cache entry"""
+    return " ".join(query.lower().split())
+
+
+class SQLiteCacheBackend:
+    """Persistent cache tier so cached results survive restarts"""
+
+    def __init__(self, path: str):
+        """
+        Open (or create) the cache database
+
+        Args:
+            path: Path to the SQLite database file
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute("DELETE FROM result_cache WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, expires_at) for a live entry, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM result_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return loads_products(row[0]), row[1]
+        except pickle.UnpicklingError:
+            # The entry names a class other than Product: treat it as a miss
+            return None
+
+    def set(self, key: str, value: Any, expires_at: float):
+        """Store a value until the given wall-clock expiry time"""
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO result_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, blob, expires_at),
+            )
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM result_cache")
+
+
+class _Flight:
+    """A computation in progress that concurrent callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """
+    Cache of store search results keyed on (store, normalized query)
+
+    Entries expire after `ttl` seconds and the in-memory tier keeps at most
+    `max_entries` of them, evicting the least recently used. Concurrent lookups
+    of the same missing key run the search only once; the other callers wait for
+    and share its result.
+    """
+
+    def __init__(
+        self,
+        ttl: float = config.RESULT_CACHE_TTL_SECONDS,
+        max_entries: int = config.RESULT_CACHE_MAX_ENTRIES,
+        path: Optional[str] = config.RESULT_CACHE_PATH,
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            ttl: Seconds an entry stays valid
+            max_entries: Maximum entries kept in memory
+            path: Optional SQLite file for a persistent second tier
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.backend = SQLiteCacheBackend(path) if path else None
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._inflight: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.persistent_hits = 0
+
+    @staticmethod
+    def make_key(store: str, query: str) -> str:
+        """Build the cache key for a store search"""
+        return f"{store.lower()}\x1f{normalize_query(query)}"
+
+    def _lookup(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return a live (value, expires_at) entry and mark it recently used (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, value: Any, expires_at: float):
+        """Insert a value into the memory tier, evicting LRU entries (caller holds the lock)"""
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_compute(
+        self,
+        store: str,
+        query: str,
+        compute: Callable[[], Any],
+        cache_if: Callable[[Any], bool] = bool,
+    ) -> Any:
+        """
+        Return the cached result for a store search, computing it on a miss
+
+        Args:
+            store: Store name
+            query: Search query
+            compute: Function that runs the actual search
+            cache_if: Predicate deciding whether a computed result is worth caching
+
+        Returns:
+            Cached or freshly computed search result
+        """
+        key = self.make_key(store, query)
+
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            persisted = self.backend.get(key) if self.backend else None
+            if persisted is not None:
+                value, expires_at = persisted
+                with self._lock:
+                    self.hits += 1
+                    self.persistent_hits += 1
+                    self._store(key, value, expires_at)
+            else:
+                with self._lock:
+                    self.misses += 1
+                value = compute()
+                if cache_if(value):
+                    expires_at = time.time() + self.ttl
+                    with self._lock:
+                        self._store(key, value, expires_at)
+                    if self.backend:
+                        self.backend.set(key, value, expires_at)
+            flight.value = value
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def get(self, store: str, query: str) -> Optional[Any]:
+        """
+        Return the cached result for a store search without computing it on a miss
+
+        Args:
+            store: Store name
+            query: Search query
+
+        Returns:
+            Cached search result, or None
+        """
+        key = self.make_key(store, query)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+
+        persisted = self.backend.get(key) if self.backend else None
+        with self._lock:
+            if persisted is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.persistent_hits += 1
+            self._store(key, *persisted)
+        return persisted[0]
+
+    def put(self, store: str, query: str, value: Any):
+        """
+        Cache a result computed outside get_or_compute()
+
+        Args:
+            store: Store name
+            query: Search query
+            value: Search result to cache
+        """
+        key = self.make_key(store, query)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self.backend:
+            self.backend.set(key, value, expires_at)
+
+    def clear(self):
+        """Drop every cached entry from all tiers"""
+        with self._lock:
+            self._entries.clear()
+        if self.backend:
+            self.backend.clear()
+
+    def stats(self) -> Dict:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with hit/miss counts, hit rate and current size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'coalesced': self.coalesced,
+                'persistent_hits': self.persistent_hits,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
+
+
+_cache: Optional[ResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Get the process-wide result cache
+
+    Returns:
+        The shared ResultCache instance
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
+
+
+def cached_search(store: str, cache_if: Callable[[Any], bool] = bool):
+    """
+    Decorator caching a search function's result per (store, normalized query)
+
+    The query is taken from the `product_name` keyword or the last positional
+    argument, so it works for plain functions and for scraper methods alike.
+
+    Args:
+        store: Store name used in the cache key
+        cache_if: Predicate deciding whether a result is worth caching (default: non-empty)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            product_name = kwargs['product_name'] if 'product_name' in kwargs else args[-1]
+            return get_result_cache().get_or_compute(
+                store, product_name, lambda: func(*args, **kwargs), cache_if
+            )
+        return wrapper
+    return decorator
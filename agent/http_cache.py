@@ -0,0 +1,289 @@
+"""
+HTTP Page Cache
+File-backed cache of raw store pages revalidated with ETag / Last-Modified
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import config
+from agent.models import loads_products
+
+_KEY_STRIPES = 64  # Locks serializing writes of one entry's files, shared by hashed keys
+
+
+class CachedPage:
+    """A stored page, returned in place of a response when the server answers 304"""
+
+    def __init__(self, url: str, content: bytes, etag: Optional[str], last_modified: Optional[str]):
+        self.url = url
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.status_code = 304
+        self.headers = {}
+        self.not_modified = True
+
+
+class HttpCache:
+    """
+    On-disk cache of raw HTTP responses with conditional revalidation
+
+    Every entry is a body file plus a small JSON metadata file holding the
+    validators. The parsed products for a page can be stored next to it, so a
+    304 Not Modified answer skips both the download and the HTML parsing. The
+    total size on disk is capped; least recently used entries are evicted first.
+
+    Files are written and deleted under a per-entry lock; the cache-wide lock
+    only guards the in-memory LRU index, so slow disk writes for one page
+    never hold up lookups and writes of the others.
+    """
+
+    def __init__(self, directory: str = config.HTTP_CACHE_DIR, max_bytes: int = config.HTTP_CACHE_MAX_BYTES):
+        """
+        Open (or create) the cache directory
+
+        Args:
+            directory: Directory holding cached pages
+            max_bytes: Maximum total size of cached files
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(_KEY_STRIPES)]
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+        # Counters
+        self.revalidated = 0
+        self.parse_skipped = 0
+
+    def _load_index(self):
+        """Rebuild the LRU index from the files on disk, oldest access first"""
+        sizes: Dict[str, int] = {}
+        atimes: Dict[str, float] = {}
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.tmp'):
+                # Left behind by a write that never finished
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+                continue
+            key = entry.name.split('.', 1)[0]
+            stat = entry.stat()
+            sizes[key] = sizes.get(key, 0) + stat.st_size
+            atimes[key] = max(atimes.get(key, 0.0), stat.st_mtime)
+        for key in sorted(sizes, key=atimes.get):
+            self._index[key] = sizes[key]
+            self._total += sizes[key]
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        return self._key_locks[int(key[:8], 16) % _KEY_STRIPES]
+
+    def _write(self, key: str, suffix: str, data: bytes) -> int:
+        """Atomically write one file of an entry and return its size"""
+        path = self._path(key, suffix)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return len(data)
+
+    def _account(self, key: str, size: int) -> List[str]:
+        """
+        Record an entry's new size and drop LRU entries over the cap from the index (caller holds the lock)
+
+        Returns:
+            Keys of the dropped entries, whose files the caller deletes with _evict
+        """
+        self._total += size - self._index.get(key, 0)
+        self._index[key] = size
+        self._index.move_to_end(key)
+        evicted = []
+        while self._total > self.max_bytes and len(self._index) > 1:
+            oldest, oldest_size = self._index.popitem(last=False)
+            self._total -= oldest_size
+            evicted.append(oldest)
+        return evicted
+
+    def _evict(self, keys: List[str]):
+        """Delete the files of entries dropped from the index (caller holds no lock)"""
+        for key in keys:
+            with self._key_lock(key):
+                with self._lock:
+                    if key in self._index:
+                        # Stored again since it was dropped
+                        continue
+                for suffix in ('body', 'meta', 'parsed'):
+                    try:
+                        os.remove(self._path(key, suffix))
+                    except FileNotFoundError:
+                        pass
+
+    def _read_meta(self, key: str) -> Optional[Dict]:
+        try:
+            with open(self._path(key, 'meta'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Build revalidation headers for a cached URL
+
+        Args:
+            url: Page URL
+
+        Returns:
+            If-None-Match / If-Modified-Since headers, empty if the page is not cached
+        """
+        meta = self._read_meta(self._key(url))
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def lookup(self, url: str) -> Optional[CachedPage]:
+        """
+        Load a cached page after the server confirmed it is unchanged
+
+        Args:
+            url: Page URL
+
+        Returns:
+            CachedPage, or None if the entry is missing
+        """
+        key = self._key(url)
+        meta = self._read_meta(key)
+        if meta is None:
+            return None
+        try:
+            with open(self._path(key, 'body'), 'rb') as f:
+                content = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+            self.revalidated += 1
+        return CachedPage(url, content, meta.get('etag'), meta.get('last_modified'))
+
+    def store(self, url: str, response):
+        """
+        Cache a fresh 200 response if the server sent validators
+
+        Args:
+            url: Page URL
+            response: Response with content and headers
+        """
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if response.status_code != 200 or not (etag or last_modified):
+            return
+
+        key = self._key(url)
+        meta = json.dumps({'url': url, 'etag': etag, 'last_modified': last_modified}).encode('utf-8')
+        with self._key_lock(key):
+            # Products parsed from the previous version are no longer valid
+            try:
+                os.remove(self._path(key, 'parsed'))
+            except FileNotFoundError:
+                pass
+            size = self._write(key, 'body', response.content) + self._write(key, 'meta', meta)
+            with self._lock:
+                evicted = self._account(key, size)
+        self._evict(evicted)
+
+    def get_parsed(self, url: str) -> Optional[Any]:
+        """
+        Get the products previously parsed from a cached page
+
+        Args:
+            url: Page URL
+
+        Returns:
+            Parsed products, or None if the page was never parsed
+        """
+        try:
+            with open(self._path(self._key(url), 'parsed'), 'rb') as f:
+                parsed = loads_products(f.read())
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        with self._lock:
+            self.parse_skipped += 1
+        return parsed
+
+    def store_parsed(self, url: str, products: Any):
+        """
+        Store the products parsed from a cached page
+
+        Args:
+            url: Page URL
+            products: Parsed products
+        """
+        key = self._key(url)
+        data = pickle.dumps(products, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._key_lock(key):
+            with self._lock:
+                if key not in self._index:
+                    return
+            size = self._write(key, 'parsed', data)
+            body_size = os.path.getsize(self._path(key, 'body')) + os.path.getsize(self._path(key, 'meta'))
+            with self._lock:
+                evicted = self._account(key, body_size + size)
+        self._evict(evicted)
+
+    def stats(self) -> Dict:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with entry count, bytes used and revalidation counts
+        """
+        with self._lock:
+            return {
+                'entries': len(self._index),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'revalidated': self.revalidated,
+                'parse_skipped': self.parse_skipped,
+            }
+
+
+_http_cache: Optional[HttpCache] = None
+_http_cache_lock = threading.Lock()
+
+
+def get_http_cache() -> Optional[HttpCache]:
+    """
+    Get the process-wide page cache
+
+    Returns:
+        The shared HttpCache, or None when config.HTTP_CACHE_ENABLED is off
+    """
+    global _http_cache
+    if not config.HTTP_CACHE_ENABLED:
+        return None
+    if _http_cache is None:
+        with _http_cache_lock:
+            if _http_cache is None:
+                _http_cache = HttpCache()
+    return _http_cache
@@ -3,72 +3,160 @@ LangChain Agent for Morocco Product Search
 This is the main AI agent that uses LangChain to intelligently search and compare prices
 """
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.prompts import PromptTemplate
-from langchain.memory import ConversationBufferMemory
+from langchain_core.messages import get_buffer_string
 from agent.langchain_tools import MOROCCO_SEARCH_TOOLS
+from agent.store_tools import format_comparison
+from agent.llm_cache import get_llm_cache
+from agent.memory import BoundedSummaryMemory, LLMSpanHandler, PromptTokenCounter, approx_tokens
+from agent.models import Product, products_from_json
+from agent.tracing import get_tracer
+from agent.pipeline import (
+    STORE_TOOLS,
+    build_engine,
+    parse_price_lookup,
+    run_price_lookup,
+    select_store_tools,
+)
 from dotenv import load_dotenv
+from typing import Annotated, Dict, List, Optional, TypedDict
+import config
+import operator
 import os
 
 # Load environment variables
 load_dotenv()
 
 
+def create_gemini(model: str, temperature: float = 0, use_cache: bool = config.LLM_CACHE_ENABLED):
+    """
+    Build a Google Gemini chat model
+
+    langchain_google_genai is imported here rather than at module level, since
+    it is slow to import and many code paths never call the model.
+
+    Args:
+        model: Gemini model name
+        temperature: Sampling temperature
+        use_cache: Serve repeated prompts from the LLM response cache
+
+    Returns:
+        ChatGoogleGenerativeAI instance
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=model,
+        temperature=temperature,
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        cache=get_llm_cache() if use_cache else None,
+        # AgentExecutor streams each step, and streamed calls skip the cache
+        disable_streaming=use_cache,
+    )
+
+
 class MoroccoSearchAgent:
     """
     LangChain-powered agent for searching products in Morocco
     This agent can reason about which stores to check and how to compare prices
     """
 
-    def __init__(self, model="gemini-1.5-pro", temperature=0):
+    _shared_prompt = None
+
+    def __init__(
+        self,
+        model="gemini-1.5-pro",
+        temperature=0,
+        direct_search=True,
+        memory_mode=config.MEMORY_MODE,
+        memory_token_budget=config.MEMORY_TOKEN_BUDGET,
+        use_llm_cache=config.LLM_CACHE_ENABLED,
+        llm=None,
+        search_engine=None,
+    ):
         """
         Initialize the LangChain agent
 
         Args:
             model: Google Gemini model to use (gemini-1.5-pro, gemini-1.5-flash, gemini-pro, etc.)
             temperature: Temperature for the model (0 = more focused, 1 = more creative)
+            direct_search: Answer plain price lookups with the store tools directly, without the LLM
+            memory_mode: "summary" for bounded, summarized history or "buffer" for the full history
+            memory_token_budget: Approximate token budget for the history in "summary" mode
+            use_llm_cache: Serve repeated prompts from the memory/SQLite LLM response cache
+            llm: Optional pre-built chat model to use instead of Gemini
+            search_engine: Search engine for direct lookups (default: one over the store tools)
         """
-        # Check for API key
-        if not os.getenv("GOOGLE_API_KEY"):
+        self.direct_search = direct_search
+        self.search_engine = search_engine or build_engine()
+
+        # Check for API key now, but build the Gemini client on first use: plain
+        # price lookups never reach the model
+        if llm is None and not os.getenv("GOOGLE_API_KEY"):
             raise ValueError(
                 "GOOGLE_API_KEY not found. Please create a .env file with your API key.\n"
                 "Copy .env.example to .env and add your Google API key.\n"
                 "Get your key from: https://makersuite.google.com/app/apikey"
             )
+        self._llm = llm
+        self._llm_options = {"model": model, "temperature": temperature, "use_cache": use_llm_cache}
+        self._agent_executor = None
 
-        # Initialize LLM (Google Gemini)
-        self.llm = ChatGoogleGenerativeAI(
-            model=model,
-            temperature=temperature,
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-        )
+        # Initialize memory
+        if memory_mode == "summary":
+            self.memory = BoundedSummaryMemory(
+                llm_factory=lambda: self.llm, memory_key="chat_history", max_tokens=memory_token_budget
+            )
+        else:
+            from langchain.memory import ConversationBufferMemory
 
-        # Create the agent prompt
-        self.prompt = self._create_prompt()
+            self.memory = ConversationBufferMemory(
+                memory_key="chat_history", return_messages=True
+            )
 
-        # Initialize memory
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history", return_messages=True
-        )
+        # Prompt-token accounting per turn, and an "llm" tracing span per model call
+        self.token_counter = PromptTokenCounter()
+        self.llm_spans = LLMSpanHandler()
+        self.turn_stats = []
+
+    @property
+    def llm(self):
+        """The chat model, created on first access"""
+        if self._llm is None:
+            self._llm = create_gemini(**self._llm_options)
+        return self._llm
+
+    @property
+    def agent_executor(self):
+        """The ReAct agent executor, built on the first turn that needs the LLM"""
+        if self._agent_executor is None:
+            from langchain.agents import AgentExecutor, create_react_agent
+
+            self._agent_executor = AgentExecutor(
+                agent=create_react_agent(llm=self.llm, tools=MOROCCO_SEARCH_TOOLS, prompt=self._create_prompt()),
+                tools=MOROCCO_SEARCH_TOOLS,
+                memory=self.memory,
+                verbose=True,
+                handle_parsing_errors=True,
+                max_iterations=10,
+            )
+        return self._agent_executor
 
-        # Create the agent
-        self.agent = create_react_agent(
-            llm=self.llm, tools=MOROCCO_SEARCH_TOOLS, prompt=self.prompt
-        )
+    def _create_prompt(self):
+        """
+        Create the agent prompt template
 
-        # Create agent executor
-        self.agent_executor = AgentExecutor(
-            agent=self.agent,
-            tools=MOROCCO_SEARCH_TOOLS,
-            memory=self.memory,
-            verbose=True,
-            handle_parsing_errors=True,
-            max_iterations=10,
-        )
+        The static head (instructions, tool descriptions and names) is rendered
+        once per process and shared by every agent, so each call sends a
+        byte-identical prefix ahead of the conversation-specific slots. That keeps
+        the prompt eligible for provider-side prefix caching and stable for the
+        LLM response cache.
+        """
+        if MoroccoSearchAgent._shared_prompt is not None:
+            return MoroccoSearchAgent._shared_prompt
+
+        from langchain_core.prompts import PromptTemplate
+        from langchain_core.tools import render_text_description
 
-    def _create_prompt(self) -> PromptTemplate:
-        """Create the agent prompt template"""
         template = """You are a helpful shopping assistant specialized in finding the best prices for products in Morocco.
 
 Your goal is to help users find products at the best prices across Moroccan e-commerce sites like Jumia, Marjane, Electroplanet, and others.
@@ -96,7 +184,7 @@ User: {input}
 
 Thought: {agent_scratchpad}"""
 
-        return PromptTemplate(
+        prompt = PromptTemplate(
             input_variables=[
                 "input",
                 "chat_history",
@@ -105,7 +193,12 @@ Thought: {agent_scratchpad}"""
                 "tool_names",
             ],
             template=template,
+        ).partial(
+            tools=render_text_description(MOROCCO_SEARCH_TOOLS),
+            tool_names=", ".join(tool.name for tool in MOROCCO_SEARCH_TOOLS),
         )
+        MoroccoSearchAgent._shared_prompt = prompt
+        return prompt
 
     def search(self, product_name: str) -> str:
         """
@@ -120,11 +213,45 @@ Thought: {agent_scratchpad}"""
         query = f"Search for '{product_name}' in Morocco and show me the prices sorted from cheapest to most expensive."
 
         try:
-            result = self.agent_executor.invoke({"input": query})
-            return result["output"]
+            with get_tracer().span('agent.turn', direct=self.direct_search):
+                if self.direct_search:
+                    return self._direct_lookup(query, product_name)
+                return self._run_agent(query)
         except Exception as e:
             return f"Error during search: {str(e)}"
 
+    def _direct_lookup(self, message: str, product_name: str) -> str:
+        """Run the fixed search-and-compare pipeline and record the turn in memory"""
+        self.token_counter.reset()
+        output = run_price_lookup(product_name, self.search_engine)
+        self.memory.save_context({"input": message}, {"output": output})
+        self._record_turn()
+        return output
+
+    def _run_agent(self, message: str) -> str:
+        """Run one ReAct turn, counting the prompt tokens it sends"""
+        self.token_counter.reset()
+        result = self.agent_executor.invoke(
+            {"input": message}, config={"callbacks": [self.token_counter, self.llm_spans]}
+        )
+        self._record_turn()
+        return result["output"]
+
+    def _record_turn(self):
+        """Append the prompt-token counts of the turn that just finished"""
+        history = self.memory.load_memory_variables({})["chat_history"]
+        history_text = history if isinstance(history, str) else get_buffer_string(history)
+        self.turn_stats.append({
+            "llm_calls": self.token_counter.llm_calls,
+            "prompt_tokens": self.token_counter.prompt_tokens,
+            "history_tokens": approx_tokens(history_text),
+        })
+
+    @property
+    def last_turn_stats(self) -> Dict:
+        """Prompt-token counts for the most recent turn"""
+        return self.turn_stats[-1] if self.turn_stats else {}
+
     def chat(self, message: str) -> str:
         """
         Have a conversation with the agent
@@ -136,24 +263,143 @@ Thought: {agent_scratchpad}"""
             Agent's response
         """
         try:
-            result = self.agent_executor.invoke({"input": message})
-            return result["output"]
+            # Plain price lookups skip the LLM; real conversation goes to the ReAct agent
+            product_name = parse_price_lookup(message) if self.direct_search else None
+            with get_tracer().span('agent.turn', direct=bool(product_name)):
+                if product_name:
+                    return self._direct_lookup(message, product_name)
+                return self._run_agent(message)
         except Exception as e:
             return f"Error: {str(e)}"
 
 
 # Alternative: Using LangGraph for more complex workflows
+class SearchState(TypedDict):
+    """State flowing through the AdvancedMoroccoSearchAgent graph"""
+
+    product_name: str
+    max_price: Optional[float]
+    preferred_stores: Optional[List[str]]
+    products: Annotated[List[Product], operator.add]  # Merged from the parallel store nodes
+    report: str
+    summary: str
+
+
 class AdvancedMoroccoSearchAgent:
     """
     Advanced agent using LangGraph for complex multi-step workflows
-    Uncomment and implement if you need more sophisticated reasoning
+
+    The graph fans out to one fetch node per selected store, runs them in
+    parallel within a single step, merges their products into a compare node and
+    makes at most one LLM call to summarize the result. Filters are pushed down:
+    stores outside preferred_stores are never queried and offers above max_price
+    are dropped in the fetch nodes.
     """
 
-    def __init__(self):
-        """Initialize the advanced agent with LangGraph"""
-        # TODO: Implement LangGraph workflow
-        # This would allow for more complex decision trees and parallel processing
-        pass
+    def __init__(self, model="gemini-1.5-flash", temperature=0, summarize=True, llm=None):
+        """
+        Initialize the advanced agent with LangGraph
+
+        Args:
+            model: Google Gemini model used for the final summary
+            temperature: Temperature for the model
+            summarize: Add an LLM-written recommendation after the comparison
+            llm: Optional pre-built chat model to use instead of Gemini
+        """
+        if summarize and llm is None and not os.getenv("GOOGLE_API_KEY"):
+            raise ValueError(
+                "GOOGLE_API_KEY not found. Please create a .env file with your API key.\n"
+                "Or create the agent with summarize=False to skip the LLM entirely."
+            )
+        self._llm = llm
+        self._llm_options = {"model": model, "temperature": temperature, "use_cache": True}
+        self._graph = None
+        self.summarize = summarize
+        self.llm_spans = LLMSpanHandler()
+
+    @property
+    def llm(self):
+        """The chat model for summaries, created on first access"""
+        if self._llm is None and self.summarize:
+            self._llm = create_gemini(**self._llm_options)
+        return self._llm
+
+    @property
+    def graph(self):
+        """The compiled workflow, built on the first search"""
+        if self._graph is None:
+            self._graph = self._build_graph()
+        return self._graph
+
+    def _build_graph(self):
+        """Compile the fan-out / compare / summarize workflow"""
+        from langgraph.graph import END, START, StateGraph
+
+        graph = StateGraph(SearchState)
+        graph.add_node("fetch_store", self._fetch_store)
+        graph.add_node("compare", self._compare)
+        graph.add_conditional_edges(START, self._fan_out, ["fetch_store", "compare"])
+        graph.add_edge("fetch_store", "compare")
+        if self.summarize:
+            graph.add_node("summarize", self._summarize)
+            graph.add_edge("compare", "summarize")
+            graph.add_edge("summarize", END)
+        else:
+            graph.add_edge("compare", END)
+        return graph.compile()
+
+    @staticmethod
+    def _fan_out(state: SearchState):
+        """Send one fetch task per selected store; they all run in the same step"""
+        from langgraph.types import Send
+
+        tools = select_store_tools(state.get("preferred_stores"))
+        if not tools:
+            return "compare"
+        return [
+            Send("fetch_store", {
+                "tool_name": tool.__name__,
+                "product_name": state["product_name"],
+                "max_price": state.get("max_price"),
+            })
+            for tool in tools
+        ]
+
+    @staticmethod
+    def _fetch_store(task: Dict) -> Dict:
+        """Query one store and keep only the offers within the price limit"""
+        tool = next(tool for tool in STORE_TOOLS if tool.__name__ == task["tool_name"])
+        output = tool(task["product_name"])
+        try:
+            products = products_from_json(output)
+        except ValueError:
+            print(f"  ✗ {output}")
+            return {"products": []}
+
+        max_price = task.get("max_price")
+        if max_price is not None:
+            products = [p for p in products if p.price <= max_price]
+        return {"products": products}
+
+    @staticmethod
+    def _compare(state: SearchState) -> Dict:
+        """Merge every store's products into one cheapest-first report"""
+        products = state.get("products") or []
+        if not products:
+            return {"report": f"No products found for '{state['product_name']}' matching your filters."}
+        return {"report": format_comparison(products)}
+
+    def _summarize(self, state: SearchState) -> Dict:
+        """Single LLM call turning the comparison into a short recommendation"""
+        if not state.get("products"):
+            return {"summary": ""}
+        message = self.llm.invoke(
+            "You are a helpful shopping assistant for Moroccan e-commerce sites. "
+            "In two or three friendly sentences, recommend the best deal from this "
+            f"price comparison for '{state['product_name']}' and mention the savings.\n"
+            f"{state['report']}"
+        )
+        return {"summary": getattr(message, "content", str(message))}
 
     def search_with_filters(
         self, product_name: str, max_price: float = None, preferred_stores: list = None
@@ -165,6 +411,24 @@ class AdvancedMoroccoSearchAgent:
             product_name: Product to search for
             max_price: Maximum price filter
             preferred_stores: List of preferred stores
+
+        Returns:
+            Price comparison report, followed by the agent's recommendation
         """
-        # TODO: Implement advanced filtering logic
-        pass
+        try:
+            with get_tracer().span('agent.filtered_search', query=product_name):
+                state = self.graph.invoke(
+                    {
+                        "product_name": product_name,
+                        "max_price": max_price,
+                        "preferred_stores": preferred_stores,
+                        "products": [],
+                    },
+                    config={"callbacks": [self.llm_spans]},
+                )
+        except Exception as e:
+            return f"Error during search: {str(e)}"
+
+        if state.get("summary"):
+            return f"{state['report']}\n{state['summary']}"
+        return state["report"]
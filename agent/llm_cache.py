@@ -0,0 +1,159 @@
+"""
+LLM Response Cache
+Two-tier (memory + SQLite) cache of model responses keyed on model settings and the full prompt
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Optional
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, Generation, GenerationChunk
+
+import config
+
+# Classes a cached response may be rebuilt from; anything else in the database is rejected
+_CACHED_TYPES = [Generation, GenerationChunk, ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk]
+
+# loads() warns that it is in beta on every call, i.e. on every SQLite hit
+warnings.filterwarnings('ignore', category=LangChainBetaWarning, module=r'agent\.llm_cache$')
+
+
+class TieredLLMCache(BaseCache):
+    """
+    LLM cache with an in-memory LRU tier in front of a bounded SQLite tier
+
+    The key is a digest of the model settings (model name, temperature, ...) and
+    the complete prompt, which for the ReAct agent includes the conversation and
+    every tool observation so far. With temperature=0 a repeated query therefore
+    replays the same answers at cache speed instead of calling Gemini again.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = config.LLM_CACHE_MAX_ENTRIES,
+        path: Optional[str] = config.LLM_CACHE_PATH,
+        max_rows: int = config.LLM_CACHE_MAX_ROWS,
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum responses kept in memory
+            path: SQLite file for the persistent tier (None = memory only)
+            max_rows: Maximum responses kept in SQLite; least recently used are evicted
+        """
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[str, RETURN_VAL_TYPE]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, generations TEXT NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache (accessed_at)")
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode('utf-8')).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            generations = self._entries.get(key)
+            if generations is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return generations
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT generations FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    with self._conn:
+                        self._conn.execute(
+                            "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                        )
+                    items = loads(row[0], allowed_objects=_CACHED_TYPES)
+                    generations = [loads(item, allowed_objects=_CACHED_TYPES) for item in items]
+                    self._remember(key, generations)
+                    self.hits += 1
+                    return generations
+
+            self.misses += 1
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            self._remember(key, return_val)
+            if self._conn is None:
+                return
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, generations, accessed_at) VALUES (?, ?, ?)",
+                    (key, dumps([dumps(generation) for generation in return_val]), time.time()),
+                )
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                )
+
+    def _remember(self, key: str, generations: RETURN_VAL_TYPE):
+        """Insert into the memory tier, evicting the least recently used (caller holds the lock)"""
+        self._entries[key] = generations
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with hits, misses and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._entries),
+            }
+
+
+@lru_cache(maxsize=None)
+def get_llm_cache() -> Optional[TieredLLMCache]:
+    """
+    Get the process-wide LLM cache
+
+    Returns:
+        The shared TieredLLMCache, or None when config.LLM_CACHE_ENABLED is off
+    """
+    return TieredLLMCache() if config.LLM_CACHE_ENABLED else None
@@ -0,0 +1,379 @@
+"""
+Cross-Store Product Matching
+Groups offers for the same product across stores with normalized tokens and MinHash/LSH
+"""
+
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+import config
+from agent.models import Product
+
+# Brands common on Moroccan stores; the first one found in a name is its brand
+KNOWN_BRANDS = frozenset({
+    'acer', 'apple', 'asus', 'beko', 'bosch', 'braun', 'candy', 'canon', 'dell', 'epson',
+    'haier', 'hisense', 'honor', 'hp', 'huawei', 'infinix', 'jbl', 'lenovo', 'lg', 'logitech',
+    'microsoft', 'moulinex', 'msi', 'nikon', 'nokia', 'oppo', 'philips', 'realme', 'samsung',
+    'sharp', 'siemens', 'sony', 'tcl', 'tecno', 'tefal', 'toshiba', 'vivo', 'whirlpool', 'xiaomi',
+})
+
+# Words that never help tell two products apart
+_STOPWORDS = frozenset({
+    'and', 'au', 'avec', 'de', 'des', 'du', 'en', 'et', 'for', 'la', 'le', 'les', 'new',
+    'nouveau', 'noir', 'black', 'blanc', 'white', 'original', 'par', 'pour', 'promo', 'the', 'un',
+    'une', 'with', '4g', '5g',
+})
+
+# Words naming a model variant; two names only match when they carry the same ones
+VARIANT_WORDS = frozenset({'pro', 'max', 'ultra', 'plus', 'lite', 'mini', 'fe', 'note'})
+
+_UNIT_ALIASES = {'go': 'gb', 'to': 'tb', 'mo': 'mb', 'pouces': 'inch', 'pouce': 'inch', '"': 'inch'}
+_UNIT = re.compile(r'(\d+(?:[.,]\d+)?)\s*(gb|go|tb|to|mb|mo|mah|w|hz|mp|inch|pouces?|")(?![a-z0-9])')
+_PLUS_SUFFIX = re.compile(r'(?<=[a-z0-9])\+')
+_NON_WORD = re.compile(r'[^a-z0-9.]+')
+_CAPACITY = re.compile(r'^\d+(?:\.\d+)?(?:gb|tb|mb)$')
+_MEASURE = re.compile(r'^\d+(?:\.\d+)?(?:mah|w|hz|mp|inch)$')
+
+# Universal hashing modulo a prime just above 2**32: with 32-bit token hashes and
+# coefficients every a * x + b fits in uint64, so signatures are computed in NumPy
+_PRIME = np.uint64(4294967311)
+_CHUNK = 2048  # Products hashed per NumPy batch, bounds the (num_perm x tokens) matrix
+
+
+@dataclass(frozen=True)
+class NameFeatures:
+    """Normalized view of a product name used for matching"""
+
+    tokens: FrozenSet[str]
+    brand: Optional[str]
+    model: FrozenSet[str]       # Tokens mixing letters and digits, or bare numbers ("a54", "15")
+    capacity: FrozenSet[str]    # Storage / memory sizes ("128gb")
+    variant: FrozenSet[str]     # Variant words ("pro", "max", "ultra")
+
+
+@lru_cache(maxsize=65536)
+def normalize_name(name: str) -> str:
+    """
+    Normalize a product name for comparison
+
+    Lowercases, strips accents, glues numbers to their units ("128 Go" -> "128gb"),
+    spells out a trailing "+" ("S24+" -> "s24 plus") and drops punctuation and
+    filler words.
+
+    Args:
+        name: Product name as shown by the store
+
+    Returns:
+        Space-separated normalized tokens
+    """
+    text = unicodedata.normalize('NFKD', name.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = _PLUS_SUFFIX.sub(' plus', text)
+    text = _UNIT.sub(lambda m: f" {m.group(1).replace(',', '.')}{_UNIT_ALIASES.get(m.group(2), m.group(2))} ", text)
+    tokens = (token.strip('.') for token in _NON_WORD.split(text))
+    return ' '.join(token for token in tokens if token and token not in _STOPWORDS)
+
+
+@lru_cache(maxsize=65536)
+def extract_features(name: str) -> NameFeatures:
+    """
+    Split a product name into tokens, brand, model tokens, capacities and variant words
+
+    Args:
+        name: Product name as shown by the store
+
+    Returns:
+        NameFeatures for the name
+    """
+    tokens = normalize_name(name).split()
+    brand = next((token for token in tokens if token in KNOWN_BRANDS), None)
+    capacity = frozenset(token for token in tokens if _CAPACITY.match(token))
+    model = frozenset(
+        token for token in tokens
+        if any(char.isdigit() for char in token) and token not in capacity and not _MEASURE.match(token)
+    )
+    variant = frozenset(token for token in tokens if token in VARIANT_WORDS)
+    return NameFeatures(frozenset(tokens), brand, model, capacity, variant)
+
+
+def _model_key(model: FrozenSet[str]) -> int:
+    """
+    Blocking key for model tokens: the smallest token hash, 0 without a model
+
+    Names with the same model tokens always get the same key, and a name whose
+    model tokens extend another's does whenever the shared token hashes lowest.
+    """
+    return min((zlib.crc32(token.encode('utf-8')) + 1 for token in model), default=0)
+
+
+def _compatible(a: FrozenSet[str], b: FrozenSet[str]) -> bool:
+    """Attribute sets agree unless both are present and neither contains the other"""
+    return not a or not b or a <= b or b <= a
+
+
+@dataclass
+class ProductGroup:
+    """Offers for one product across stores, cheapest first"""
+
+    title: str
+    brand: Optional[str]
+    offers: List[Product] = field(default_factory=list)
+
+    @property
+    def best(self) -> Product:
+        """Cheapest offer for the product"""
+        return self.offers[0]
+
+    @property
+    def stores(self) -> List[str]:
+        """Stores selling the product, in order of their cheapest offer"""
+        return list(dict.fromkeys(offer.store for offer in self.offers))
+
+    @property
+    def savings(self) -> float:
+        """Difference between the most expensive and the cheapest offer"""
+        return self.offers[-1].price - self.offers[0].price
+
+
+class _DisjointSet:
+    """Union-find over offer indices with path halving"""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+class ProductMatcher:
+    """
+    Groups offers that describe the same product
+
+    Each distinct name gets a MinHash signature of its normalized tokens, and the
+    signatures are split into LSH bands: only names sharing a band bucket are
+    compared, so grouping n offers costs about O(n) instead of O(n^2) pairs.
+    Candidates are confirmed by exact token Jaccard similarity and must agree on
+    brand, model numbers, storage capacity and variant words ("Pro", "Ultra")
+    before they are merged; names that differ by a single swapped word only
+    match when they share a model number.
+    """
+
+    def __init__(
+        self,
+        threshold: float = config.MATCH_THRESHOLD,
+        num_perm: int = config.MATCH_NUM_PERM,
+        bands: int = config.MATCH_BANDS,
+        max_bucket_checks: int = 8,
+        seed: int = 1,
+    ):
+        """
+        Initialize the matcher
+
+        Args:
+            threshold: Minimum token Jaccard similarity for a match
+            num_perm: MinHash signature length
+            bands: Number of LSH bands (num_perm must be a multiple)
+            max_bucket_checks: Earlier bucket mates each name is paired with per band,
+                which keeps huge buckets linear
+            seed: Seed for the hash coefficients
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_bucket_checks = max_bucket_checks
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**32, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, size=(num_perm, 1), dtype=np.uint64)
+
+    def signatures(self, token_sets: Sequence[FrozenSet[str]]) -> np.ndarray:
+        """
+        MinHash signatures for token sets
+
+        Args:
+            token_sets: Non-empty token sets
+
+        Returns:
+            Array of shape (len(token_sets), num_perm)
+        """
+        result = np.empty((len(token_sets), self._a.shape[0]), dtype=np.uint64)
+        for start in range(0, len(token_sets), _CHUNK):
+            chunk = token_sets[start:start + _CHUNK]
+            hashes = np.fromiter(
+                (zlib.crc32(token.encode('utf-8')) for tokens in chunk for token in tokens),
+                dtype=np.uint64,
+            )
+            offsets = np.cumsum([0] + [len(tokens) for tokens in chunk[:-1]])
+            permuted = (self._a * hashes + self._b) % _PRIME
+            result[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        return result
+
+    def _candidate_pairs(self, signatures: np.ndarray, model_keys: np.ndarray) -> np.ndarray:
+        """
+        Distinct row pairs sharing at least one LSH band bucket
+
+        Band keys also include each name's model key, so "Galaxy A54" and
+        "Galaxy A34" never share a bucket however many other words they have in
+        common. Rows are sorted by band key, so bucket mates sit next to each
+        other; each row is paired with at most `max_bucket_checks` earlier mates
+        per band.
+
+        Args:
+            signatures: MinHash signatures, one row per name
+            model_keys: _model_key of each name
+
+        Returns:
+            Array of shape (pairs, 2) with the smaller row index first
+        """
+        count = len(signatures)
+        banded = signatures.reshape(count, self.bands, self.rows)
+        found = []
+        for band in range(self.bands):
+            keys = model_keys.copy()
+            for row in range(self.rows):
+                keys = keys * np.uint64(0x100000001B3) ^ banded[:, band, row]
+            order = np.argsort(keys, kind='stable')
+            keys = keys[order]
+            for distance in range(1, min(self.max_bucket_checks, count - 1) + 1):
+                same = np.flatnonzero(keys[distance:] == keys[:-distance])
+                if len(same):
+                    first, second = order[same], order[same + distance]
+                    found.append(np.minimum(first, second) * count + np.maximum(first, second))
+        if not found:
+            return np.empty((0, 2), dtype=np.int64)
+        encoded = np.unique(np.concatenate(found))
+        return np.stack((encoded // count, encoded % count), axis=1)
+
+    def _similar(self, a: NameFeatures, b: NameFeatures) -> bool:
+        """Exact check of an LSH candidate pair"""
+        if a.brand and b.brand and a.brand != b.brand:
+            return False
+        if not (_compatible(a.model, b.model) and _compatible(a.capacity, b.capacity)):
+            return False
+        if a.variant != b.variant:
+            # "iPhone 15" / "iPhone 15 Pro" / "iPhone 15 Pro Max" are different phones
+            return False
+        if len(a.tokens - b.tokens) == 1 and len(b.tokens - a.tokens) == 1 and not a.model & b.model:
+            # Swapping one word ("Basic" / "Premium") makes another variant unless a model number ties them
+            return False
+        union = len(a.tokens | b.tokens)
+        return union > 0 and len(a.tokens & b.tokens) / union >= self.threshold
+
+    def labels(self, products: Sequence[Product]) -> List[int]:
+        """
+        Group label of every offer
+
+        Args:
+            products: Offers from any number of stores
+
+        Returns:
+            One label per offer; offers for the same product share a label
+        """
+        # Offers with the same normalized name are the same product: match names, not offers
+        name_ids: Dict[str, int] = {}
+        features: List[NameFeatures] = []
+        offer_names = []
+        for product in products:
+            normalized = normalize_name(product.name)
+            name_id = name_ids.get(normalized)
+            if name_id is None:
+                name_id = name_ids[normalized] = len(features)
+                features.append(extract_features(product.name))
+            offer_names.append(name_id)
+
+        groups = _DisjointSet(len(features))
+        hashed = np.asarray([index for index, feature in enumerate(features) if feature.tokens], dtype=np.int64)
+        if len(hashed) > 1:
+            signatures = self.signatures([features[index].tokens for index in hashed.tolist()])
+            model_keys = np.fromiter(
+                (_model_key(features[index].model) for index in hashed.tolist()), dtype=np.uint64, count=len(hashed)
+            )
+            for first, second in self._candidate_pairs(signatures, model_keys).tolist():
+                name_id, other = int(hashed[first]), int(hashed[second])
+                if groups.find(name_id) != groups.find(other) and self._similar(features[name_id], features[other]):
+                    groups.union(name_id, other)
+
+        return [groups.find(name_id) for name_id in offer_names]
+
+    def group(self, products: Iterable[Product]) -> List[ProductGroup]:
+        """
+        Group offers by product
+
+        Args:
+            products: Offers from any number of stores
+
+        Returns:
+            Product groups with offers sorted by price, cheapest group first
+        """
+        products = list(products)
+        grouped: Dict[int, List[Product]] = defaultdict(list)
+        for label, product in zip(self.labels(products), products):
+            grouped[label].append(product)
+
+        groups = []
+        for offers in grouped.values():
+            offers.sort(key=lambda offer: offer.price)
+            groups.append(ProductGroup(offers[0].name, extract_features(offers[0].name).brand, offers))
+        groups.sort(key=lambda group: group.best.price)
+        return groups
+
+
+def dedupe(products: Iterable[Product]) -> List[Product]:
+    """
+    Drop repeated listings of the same offer
+
+    A store listing the same product twice (e.g. on two results pages) keeps one
+    entry: offers are duplicates when store and URL match, or, without a URL,
+    when store, normalized name and price match.
+
+    Args:
+        products: Offers, in any order
+
+    Returns:
+        Offers without duplicates, first occurrence kept
+    """
+    seen = set()
+    unique = []
+    for product in products:
+        key = (product.store, product.url) if product.url else (product.store, normalize_name(product.name), product.price)
+        if key not in seen:
+            seen.add(key)
+            unique.append(product)
+    return unique
+
+
+@lru_cache(maxsize=None)
+def get_matcher() -> ProductMatcher:
+    """Shared matcher built from the config settings"""
+    return ProductMatcher()
+
+
+def group_products(products: Iterable[Product]) -> List[ProductGroup]:
+    """
+    Deduplicate offers and group them by product with the shared matcher
+
+    Args:
+        products: Offers from any number of stores
+
+    Returns:
+        Product groups, cheapest first
+    """
+    return get_matcher().group(dedupe(products))
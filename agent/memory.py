@@ -0,0 +1,258 @@
+"""
+Bounded Conversation Memory
+Chat memory that keeps recent turns verbatim, summarizes older ones and compacts tool payloads
+"""
+
+import json
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.messages import BaseMessage, SystemMessage, get_buffer_string
+
+import config
+from agent.tracing import Span, current_span, get_tracer
+
+
+def approx_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) that needs no API call"""
+    return len(text) // 4 + 1 if text else 0
+
+
+_REPORT_HEADER = re.compile(r"PRICE COMPARISON - (\d+) Products Found")
+_REPORT_BEST = re.compile(r"#1 - ([\d.,]+) (\w+)\s+Product: (.+)\n\s+Store: (.+)")
+_JSON_ARRAY = re.compile(r"\[\s*\{.*?\}\s*\]", re.DOTALL)
+
+
+def _describe_products(products: List[Dict]) -> str:
+    """One-line reference for a list of products"""
+    priced = [p for p in products if isinstance(p, dict) and 'price' in p]
+    if not priced:
+        return f"[{len(products)} products]"
+    best = min(priced, key=lambda p: p['price'])
+    stores = sorted({p.get('store', 'Unknown') for p in priced})
+    return (
+        f"[{len(products)} products from {', '.join(stores)}; cheapest "
+        f"{best['price']:.2f} {best.get('currency', 'MAD')} - {best.get('name', '')} at {best.get('store', 'Unknown')}]"
+    )
+
+
+def compact_tool_payload(text: str, max_chars: int = config.MEMORY_MAX_OUTPUT_CHARS) -> str:
+    """
+    Shrink bulky tool output in an agent answer down to compact references
+
+    Price comparison reports and raw product JSON are replaced by one-line
+    summaries, and anything still too long is truncated.
+
+    Args:
+        text: Agent output to store in memory
+        max_chars: Maximum characters to keep
+
+    Returns:
+        Compacted text
+    """
+    header = _REPORT_HEADER.search(text)
+    if header:
+        best = _REPORT_BEST.search(text)
+        reference = f"[price comparison of {header.group(1)} products"
+        if best:
+            price, currency, name, store = best.groups()
+            reference += f"; cheapest {price} {currency} - {name.strip()} at {store.strip()}"
+        reference += "]"
+
+        # Replace the report itself but keep any prose the agent wrote around it
+        start = max(text.rfind("=" * 80, 0, header.start()), 0)
+        end = text.rfind("-" * 80)
+        end = end + 80 if end > header.start() else len(text)
+        savings = text.find("SAVINGS:", end)
+        if savings != -1:
+            line_end = text.find("\n", savings)
+            end = len(text) if line_end == -1 else line_end
+        text = text[:start] + reference + text[end:]
+
+    def replace_json(match):
+        try:
+            products = json.loads(match.group())
+        except ValueError:
+            return match.group()
+        return _describe_products(products) if isinstance(products, list) else match.group()
+
+    text = _JSON_ARRAY.sub(replace_json, text).strip()
+    if len(text) > max_chars:
+        text = text[:max_chars].rstrip() + " …"
+    return text
+
+
+class BoundedSummaryMemory(BaseChatMemory):
+    """
+    Conversation memory with a fixed prompt budget
+
+    The last `max_turns` exchanges are kept verbatim (with tool payloads
+    compacted); older exchanges are folded into a running summary, so the
+    {chat_history} slot stays within `max_tokens` however long the session runs.
+    Pass `llm_factory` instead of `llm` to create the model only once a
+    summary is actually needed.
+    """
+
+    llm: Optional[BaseLanguageModel] = None
+    llm_factory: Optional[Callable[[], BaseLanguageModel]] = None
+    memory_key: str = "chat_history"
+    max_turns: int = config.MEMORY_MAX_TURNS
+    max_tokens: int = config.MEMORY_TOKEN_BUDGET
+    max_output_chars: int = config.MEMORY_MAX_OUTPUT_CHARS
+    summary: str = ""
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def _history(self) -> List[BaseMessage]:
+        messages = list(self.chat_memory.messages)
+        if self.summary:
+            messages.insert(0, SystemMessage(content=f"Summary of earlier conversation: {self.summary}"))
+        return messages
+
+    def history_tokens(self) -> int:
+        """Estimated tokens the history adds to each prompt"""
+        return approx_tokens(get_buffer_string(self._history()))
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        messages = self._history()
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        input_str, output_str = self._get_input_output(inputs, outputs)
+        super().save_context(
+            {"input": input_str},
+            {"output": compact_tool_payload(output_str, self.max_output_chars)},
+        )
+        self._prune()
+
+    def _prune(self):
+        """Move the oldest turns into the summary until the history fits the budget"""
+        messages = list(self.chat_memory.messages)
+        evicted: List[BaseMessage] = []
+        while len(messages) > 2 and (
+            len(messages) > 2 * self.max_turns
+            or approx_tokens(get_buffer_string(messages)) + approx_tokens(self.summary) > self.max_tokens
+        ):
+            evicted.extend(messages[:2])
+            messages = messages[2:]
+
+        if not evicted:
+            return
+        self.chat_memory.clear()
+        self.chat_memory.add_messages(messages)
+        self.summary = self._summarize(evicted)
+
+    def _summarize(self, messages: List[BaseMessage]) -> str:
+        """Fold evicted messages into the running summary"""
+        transcript = get_buffer_string(messages)
+        budget_chars = self.max_tokens  # The summary may use ~1/4 of the token budget
+        if self.llm is None and self.llm_factory is not None:
+            self.llm = self.llm_factory()
+        if self.llm is None:
+            # No model available: keep a truncated running transcript instead
+            return (f"{self.summary} {transcript}".strip())[-budget_chars:]
+
+        prompt = (
+            "Progressively summarize the shopping conversation, keeping the products searched, "
+            "the best prices and stores found, and any user preferences. Reply with the new summary only.\n\n"
+            f"Current summary:\n{self.summary or '(none)'}\n\nNew lines:\n{transcript}\n\nNew summary:"
+        )
+        try:
+            result = self.llm.invoke(prompt)
+            return getattr(result, "content", str(result)).strip()[:budget_chars]
+        except Exception as e:
+            print(f"Error summarizing conversation: {e}")
+            return (f"{self.summary} {transcript}".strip())[-budget_chars:]
+
+    def clear(self) -> None:
+        super().clear()
+        self.summary = ""
+
+
+class PromptTokenCounter(BaseCallbackHandler):
+    """Callback counting the estimated prompt tokens sent to the LLM during a turn"""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.llm_calls = 0
+
+    def reset(self):
+        self.prompt_tokens = 0
+        self.llm_calls = 0
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.llm_calls += 1
+        self.prompt_tokens += sum(approx_tokens(prompt) for prompt in prompts)
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.llm_calls += 1
+        self.prompt_tokens += sum(approx_tokens(get_buffer_string(batch)) for batch in messages)
+
+
+class LLMSpanHandler(BaseCallbackHandler):
+    """
+    Callback recording every chat model call as an "llm" tracing span
+
+    Spans carry the model name and the prompt/completion token counts the
+    provider reports; the token totals also feed the llm_tokens counter.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[UUID, Tuple[float, Optional[Span], str]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        params = kwargs.get('invocation_params') or {}
+        model = params.get('model') or params.get('model_name') or (serialized or {}).get('name', '')
+        with self._lock:
+            self._started[run_id] = (time.perf_counter(), current_span(), str(model))
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self.on_chat_model_start(serialized, [], run_id=run_id, **kwargs)
+
+    def _end(self, run_id: UUID, response=None, error: Optional[BaseException] = None):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is None:
+            return
+        start, parent, model = started
+        tracer = get_tracer()
+        usage = _token_usage(response) if response is not None else {}
+        for kind, tokens in usage.items():
+            if tokens:
+                tracer.metrics.inc('llm_tokens', tokens, model=model, kind=kind)
+        tracer.record(
+            'llm', time.perf_counter() - start, parent=parent, model=model,
+            prompt_tokens=usage.get('prompt'), completion_tokens=usage.get('completion'),
+            error=type(error).__name__ if error else None,
+        )
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._end(run_id, response)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        self._end(run_id, error=error)
+
+
+def _token_usage(response) -> Dict[str, int]:
+    """Prompt/completion token counts of an LLMResult, however the provider reports them"""
+    usage = (response.llm_output or {}).get('token_usage') or {}
+    if usage:
+        return {'prompt': usage.get('prompt_tokens', 0), 'completion': usage.get('completion_tokens', 0)}
+    totals = {'prompt': 0, 'completion': 0}
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+            totals['prompt'] += metadata.get('input_tokens', 0)
+            totals['completion'] += metadata.get('output_tokens', 0)
+    return totals
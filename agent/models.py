@@ -0,0 +1,153 @@
+"""
+Product Model
+Compact typed product record shared by the scrapers, the search engine and the agent tools
+"""
+
+import io
+import json
+import pickle
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List
+
+import config
+
+_intern = sys.intern
+_set = object.__setattr__
+
+# Reused encoder: ensure_ascii=False keeps Arabic/French product names readable for the LLM
+_ENCODER = json.JSONEncoder(ensure_ascii=False)
+
+
+@dataclass(frozen=True, slots=True, init=False)
+class Product:
+    """
+    One product offer from one store
+
+    Slots keep each record to a fixed handful of pointers instead of a per-object
+    dict, and the low-cardinality fields (store, currency, availability) are
+    interned so thousands of offers share a single copy of each value.
+    """
+
+    name: str
+    price: float
+    currency: str = config.DEFAULT_CURRENCY
+    store: str = 'Unknown'
+    url: str = ''
+    availability: str = 'Unknown'
+
+    def __init__(
+        self,
+        name: str,
+        price: float,
+        currency: str = config.DEFAULT_CURRENCY,
+        store: str = 'Unknown',
+        url: str = '',
+        availability: str = 'Unknown',
+    ):
+        # Hand-written so interning happens in the same pass as the frozen assignments
+        _set(self, 'name', name)
+        _set(self, 'price', price)
+        _set(self, 'currency', _intern(currency))
+        _set(self, 'store', _intern(store))
+        _set(self, 'url', url)
+        _set(self, 'availability', _intern(availability))
+
+    def __reduce__(self):
+        # Positional tuple: smaller pickles for the result/HTTP caches, and values are re-interned on load
+        return (Product, (self.name, self.price, self.currency, self.store, self.url, self.availability))
+
+    def to_dict(self) -> Dict:
+        """Plain dictionary form, as sent to the LLM and written to result files"""
+        return {
+            'name': self.name,
+            'price': self.price,
+            'currency': self.currency,
+            'store': self.store,
+            'url': self.url,
+            'availability': self.availability,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Product":
+        """
+        Build a product from a dictionary, filling in defaults for missing fields
+
+        Args:
+            data: Product dictionary (e.g. parsed from a tool's JSON output)
+
+        Returns:
+            Product instance
+        """
+        get = data.get
+        return cls(
+            data['name'],
+            float(data['price']),
+            get('currency') or config.DEFAULT_CURRENCY,
+            get('store') or 'Unknown',
+            get('url') or '',
+            get('availability') or 'Unknown',
+        )
+
+
+def products_to_json(products: Iterable[Product]) -> str:
+    """
+    Serialize products to a JSON array of objects
+
+    Args:
+        products: Products to serialize
+
+    Returns:
+        JSON string
+    """
+    return _ENCODER.encode([product.to_dict() for product in products])
+
+
+def products_from_json(text: str) -> List[Product]:
+    """
+    Parse a JSON array of product objects
+
+    Args:
+        text: JSON string such as a store tool's output
+
+    Returns:
+        List of products
+
+    Raises:
+        ValueError: If the text is not a JSON array of products
+    """
+    data = json.loads(text)
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON list of products")
+    try:
+        return [Product.from_dict(item) for item in data]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Invalid product entry: {e}") from e
+
+
+class _ProductUnpickler(pickle.Unpickler):
+    """Unpickler that rebuilds Product records and plain containers, and no other class"""
+
+    def find_class(self, module: str, name: str):
+        if module == __name__ and name == 'Product':
+            return Product
+        raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a product cache")
+
+
+def loads_products(data: bytes) -> Any:
+    """
+    Unpickle a cached value written with pickle.dumps, refusing every class but Product
+
+    Cache files and databases can be edited by anyone with access to the disk,
+    so a plain pickle.loads would run whatever callable an entry names.
+
+    Args:
+        data: Pickled products (lists, tuples, dicts and Product records)
+
+    Returns:
+        The unpickled value
+
+    Raises:
+        pickle.UnpicklingError: If the data names any other class or function
+    """
+    return _ProductUnpickler(io.BytesIO(data)).load()
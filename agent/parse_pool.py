@@ -0,0 +1,182 @@
+"""
+Parse Pool
+Runs HTML product extraction on every core, off the threads that fetch pages
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+from agent.models import Product
+from agent.parsers import get_parser
+from agent.store_specs import CompiledExtractor, StoreSpec
+
+
+def gil_disabled() -> bool:
+    """Whether this is a free-threaded interpreter running without the GIL"""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+# Extractors compiled inside a worker, keyed on (store key, parser backend)
+_worker_extractors: Dict[Tuple[str, str], CompiledExtractor] = {}
+
+
+def _extract_page(spec: StoreSpec, parser_name: str, content: bytes, limit: Optional[int]) -> List[Product]:
+    """Extract one page's products inside a worker, compiling each spec once per worker"""
+    cache_key = (spec.key, parser_name)
+    extractor = _worker_extractors.get(cache_key)
+    if extractor is None or extractor.spec != spec:
+        extractor = _worker_extractors[cache_key] = CompiledExtractor(spec, get_parser(parser_name))
+    return extractor.extract(content, limit)
+
+
+class ParsePool:
+    """
+    Worker pool for the parse stage of the fetch -> parse pipeline
+
+    Fetching threads hand raw page bytes to the pool and get Product records
+    back, so extraction runs on all cores instead of queueing behind the GIL.
+    Worker processes start from a clean interpreter (forkserver / spawn) and
+    compile each store spec once. On a free-threaded interpreter threads are
+    used instead, which skips pickling pages and results.
+
+    At most `max_pending` pages are queued or being parsed; submitting more
+    blocks the caller, so fetchers slow down to the pace of the parsers instead
+    of piling page bodies up in memory.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 use_threads: Optional[bool] = None):
+        """
+        Initialize the pool
+
+        Args:
+            workers: Parse workers (default: one per core)
+            max_pending: Pages queued or in progress before submit() blocks
+                (default: two per worker)
+            use_threads: Use threads instead of processes (default: only on a
+                free-threaded interpreter)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.use_threads = gil_disabled() if use_threads is None else use_threads
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self.pages = 0
+
+        if self.use_threads:
+            self._executor: Executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+        else:
+            methods = multiprocessing.get_all_start_methods()
+            # Forking a process that runs fetch threads can copy held locks
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def submit(self, spec: StoreSpec, content: bytes, parser: str, limit: Optional[int] = None) -> Future:
+        """
+        Queue a page for extraction, waiting while the pool is full
+
+        Args:
+            spec: Store spec of the page
+            content: Raw page body
+            parser: Parser backend name
+            limit: Maximum products to return
+
+        Returns:
+            Future resolving to the page's products
+        """
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(_extract_page, spec, parser, content, limit)
+        except BaseException:
+            self._slots.release()
+            raise
+        self.pages += 1
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def extract(self, spec: StoreSpec, content: bytes, parser: str, limit: Optional[int] = None) -> List[Product]:
+        """Extract a page's products in the pool and wait for them"""
+        return self.submit(spec, content, parser, limit).result()
+
+    def map(self, pages: Iterable[Tuple[StoreSpec, bytes]], parser: str) -> Iterator[List[Product]]:
+        """
+        Extract a stream of pages, yielding each page's products in input order
+
+        Pages are read from `pages` only as fast as the workers free up, so a
+        generator that fetches pages is throttled by the parse stage.
+
+        Args:
+            pages: (spec, content) pairs
+            parser: Parser backend name
+
+        Yields:
+            Lists of products, one per page
+        """
+        queued = deque()
+        try:
+            for spec, content in pages:
+                queued.append(self.submit(spec, content, parser))
+                while queued and queued[0].done():
+                    yield queued.popleft().result()
+            while queued:
+                yield queued.popleft().result()
+        finally:
+            for future in queued:
+                future.cancel()
+
+    def close(self):
+        """Stop the workers, dropping pages not yet started"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_parse_pool: Optional[ParsePool] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> Optional[ParsePool]:
+    """
+    Get the process-wide parse pool
+
+    Returns:
+        The shared ParsePool, or None when pages are parsed in the fetching
+        thread (config.PARSE_WORKERS = 0 and no pool was configured)
+    """
+    global _parse_pool
+    if _parse_pool is None and config.PARSE_WORKERS != 0:
+        with _parse_pool_lock:
+            if _parse_pool is None:
+                _parse_pool = ParsePool(config.PARSE_WORKERS)
+    return _parse_pool
+
+
+def configure_parse_pool(workers: Optional[int] = None) -> ParsePool:
+    """
+    Replace the process-wide parse pool, e.g. for a bulk crawl
+
+    Args:
+        workers: Parse workers (default: one per core)
+
+    Returns:
+        The new shared ParsePool
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        previous, _parse_pool = _parse_pool, ParsePool(workers)
+    if previous is not None:
+        previous.close()
+    return _parse_pool
+
+
+def close_parse_pool():
+    """Stop the shared parse pool; the next get_parse_pool() follows config again"""
+    global _parse_pool
+    with _parse_pool_lock:
+        previous, _parse_pool = _parse_pool, None
+    if previous is not None:
+        previous.close()
@@ -0,0 +1,207 @@
+"""
+HTML Parser Backends
+Pluggable engines that turn a results page into product-card nodes and field values
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+import config
+
+try:
+    import lxml.html
+    from lxml import etree
+    _LXML = True
+except ImportError:
+    _LXML = False
+
+try:  # Needed to compile CSS selectors for the plain lxml backend
+    from cssselect import GenericTranslator
+    _CSSSELECT = True
+except ImportError:
+    _CSSSELECT = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    _SELECTOLAX = True
+except ImportError:
+    _SELECTOLAX = False
+
+
+def _collapse(text: Optional[str]) -> Optional[str]:
+    """Collapse runs of whitespace so every backend returns the same text"""
+    if text is None:
+        return None
+    return " ".join(text.split())
+
+
+class ParserBackend:
+    """
+    Interface shared by all parser backends
+
+    Selectors are plain CSS. select_items() returns one node per product card and
+    text()/attr() read a field inside a card; a selector of None means the card
+    element itself.
+    """
+
+    name = "base"
+
+    def select_items(self, content: bytes, item_selector: str) -> List:
+        """Parse a page and return its product-card nodes"""
+        raise NotImplementedError
+
+    def text(self, node, selector: Optional[str]) -> Optional[str]:
+        """Return the whitespace-collapsed text of the first match in a card"""
+        raise NotImplementedError
+
+    def attr(self, node, selector: Optional[str], name: str) -> Optional[str]:
+        """Return an attribute of the first match in a card"""
+        raise NotImplementedError
+
+
+class SoupBackend(ParserBackend):
+    """BeautifulSoup building the full document tree (html.parser or lxml tree builder)"""
+
+    def __init__(self, features: str = 'html.parser'):
+        self.features = features
+        self.name = 'bs4' if features == 'html.parser' else f'bs4-{features}'
+
+    def _soup(self, content: bytes, item_selector: str) -> BeautifulSoup:
+        return BeautifulSoup(content, self.features)
+
+    def select_items(self, content: bytes, item_selector: str) -> List:
+        return self._soup(content, item_selector).select(item_selector)
+
+    def _find(self, node, selector: Optional[str]):
+        return node if selector is None else node.select_one(selector)
+
+    def text(self, node, selector: Optional[str]) -> Optional[str]:
+        elem = self._find(node, selector)
+        return _collapse(elem.get_text()) if elem is not None else None
+
+    def attr(self, node, selector: Optional[str], name: str) -> Optional[str]:
+        elem = self._find(node, selector)
+        return elem.get(name) if elem is not None else None
+
+
+_SIMPLE_SELECTOR = re.compile(r'^([a-zA-Z][\w-]*)?(?:\.([\w-]+))?$')
+
+
+@lru_cache(maxsize=None)
+def _strainer_for(item_selector: str) -> Optional[SoupStrainer]:
+    """Build a SoupStrainer for a `tag`, `.class` or `tag.class` selector"""
+    match = _SIMPLE_SELECTOR.match(item_selector.strip())
+    if not match or not any(match.groups()):
+        return None
+    tag, css_class = match.groups()
+    if not css_class:
+        return SoupStrainer(tag)
+    # Match the class as a whole word: during parsing bs4 may see the raw
+    # "prd _fb col" attribute string rather than a list of classes
+    return SoupStrainer(tag, class_=re.compile(rf'(^|\s){re.escape(css_class)}(\s|$)'))
+
+
+class StrainedSoupBackend(SoupBackend):
+    """
+    BeautifulSoup that only builds the product-card subtrees
+
+    Headers, navigation, scripts and footers are skipped while parsing. Item
+    selectors more complex than `tag.class` fall back to a full parse.
+    """
+
+    def __init__(self, features: str = 'html.parser'):
+        super().__init__(features)
+        self.name = 'strainer' if features == 'html.parser' else f'strainer-{features}'
+
+    def _soup(self, content: bytes, item_selector: str) -> BeautifulSoup:
+        strainer = _strainer_for(item_selector)
+        return BeautifulSoup(content, self.features, parse_only=strainer)
+
+
+class LxmlBackend(ParserBackend):
+    """lxml's C parser with CSS selectors compiled once to XPath"""
+
+    name = 'lxml'
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _xpath(selector: str):
+        return etree.XPath(GenericTranslator().css_to_xpath(selector, prefix='descendant-or-self::'))
+
+    def select_items(self, content: bytes, item_selector: str) -> List:
+        return self._xpath(item_selector)(lxml.html.fromstring(content))
+
+    def _find(self, node, selector: Optional[str]):
+        if selector is None:
+            return node
+        found = self._xpath(selector)(node)
+        return found[0] if found else None
+
+    def text(self, node, selector: Optional[str]) -> Optional[str]:
+        elem = self._find(node, selector)
+        return _collapse(elem.text_content()) if elem is not None else None
+
+    def attr(self, node, selector: Optional[str], name: str) -> Optional[str]:
+        elem = self._find(node, selector)
+        return elem.get(name) if elem is not None else None
+
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax bindings to the lexbor HTML engine"""
+
+    name = 'selectolax'
+
+    def select_items(self, content: bytes, item_selector: str) -> List:
+        return LexborHTMLParser(content).css(item_selector)
+
+    def _find(self, node, selector: Optional[str]):
+        return node if selector is None else node.css_first(selector)
+
+    def text(self, node, selector: Optional[str]) -> Optional[str]:
+        elem = self._find(node, selector)
+        return _collapse(elem.text()) if elem is not None else None
+
+    def attr(self, node, selector: Optional[str], name: str) -> Optional[str]:
+        elem = self._find(node, selector)
+        return elem.attributes.get(name) if elem is not None else None
+
+
+def available_backends() -> Dict[str, ParserBackend]:
+    """
+    Get every parser backend usable with the installed packages
+
+    Returns:
+        Dictionary mapping backend name to an instance
+    """
+    backends = [SoupBackend(), StrainedSoupBackend()]
+    if _LXML:
+        backends += [SoupBackend('lxml'), StrainedSoupBackend('lxml')]
+        if _CSSSELECT:
+            backends.append(LxmlBackend())
+    if _SELECTOLAX:
+        backends.append(SelectolaxBackend())
+    return {backend.name: backend for backend in backends}
+
+
+def get_parser(name: Optional[str] = None) -> ParserBackend:
+    """
+    Get a parser backend by name
+
+    Args:
+        name: Backend name, or "auto" / None for config.PARSER_BACKEND
+
+    Returns:
+        The requested backend; "auto" picks the fastest one installed
+    """
+    name = name or config.PARSER_BACKEND
+    backends = available_backends()
+    if name == 'auto':
+        for preferred in ('selectolax', 'lxml', 'strainer'):
+            if preferred in backends:
+                return backends[preferred]
+    if name not in backends:
+        raise ValueError(f"Unknown or unavailable parser backend: {name}")
+    return backends[name]
@@ -0,0 +1,141 @@
+"""
+Direct Search Pipeline
+Runs the store searches and price comparison without the LLM for plain price lookups
+"""
+
+import re
+from typing import List, Optional
+
+from agent.scrapers import get_scrapers
+from agent.search_engine import SearchEngine
+from agent.store_tools import (
+    format_comparison,
+    search_jumia_morocco,
+    search_marjane_online,
+    search_other_morocco_stores,
+)
+
+# The store tools the ReAct agent would call for a price lookup, in its usual order.
+# These are the plain functions behind the LangChain tools (same names), so the
+# pipeline runs without importing LangChain.
+STORE_TOOLS = [search_jumia_morocco, search_marjane_online, search_other_morocco_stores]
+
+# Store names users may mention for each tool, used to skip unwanted stores
+STORE_TOOL_ALIASES = {
+    search_jumia_morocco.__name__: ("jumia",),
+    search_marjane_online.__name__: ("marjane",),
+    search_other_morocco_stores.__name__: ("electroplanet", "aswak assalam", "aswak", "other"),
+}
+
+_LOOKUP_PATTERNS = [
+    re.compile(
+        r"^(?:please\s+)?(?:find|search(?:\s+for)?|look\s+up)\s+(?:me\s+)?(?:the\s+)?"
+        r"(?:(?:cheapest|best\s+prices?\s+(?:for|of)|prices?\s+(?:for|of))\s+)?"
+        r"(?P<product>.+?)"
+        r"(?:\s+(?:in|on)\s+morocco)?"
+        r"(?:,?\s*(?:and\s+)?(?:sort(?:ed)?|order(?:ed)?)\s+(?:them\s+)?by\s+(?:the\s+)?(?:lowest\s+)?price)?"
+        r"\s*[.!]?$",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"^(?:what(?:'s|\s+is|\s+are)\s+the\s+)?(?:cheapest|best\s+prices?\s+for|prices?\s+(?:for|of))\s+"
+        r"(?P<product>.+?)(?:\s+(?:in|on)\s+morocco)?\s*[?.!]?$",
+        re.IGNORECASE,
+    ),
+]
+
+# Words that mean the user wants reasoning, filtering or a follow-up, not a plain lookup
+_CONVERSATIONAL = re.compile(
+    r"\b(under|below|less\s+than|cheaper\s+than|more\s+than|between|budget|vs|versus|or|compare|"
+    r"which|why|how|recommend|should|about|it|them|that|those|previous|save|without|except)\b",
+    re.IGNORECASE,
+)
+
+# Words that only point back at earlier results ("search again", "find the second one");
+# a "product" made of nothing else is a follow-up for the agent
+_FOLLOW_UP_WORDS = frozenset({
+    'a', 'again', 'another', 'cheapest', 'detail', 'details', 'earlier', 'first', 'for', 'item', 'items',
+    'last', 'link', 'links', 'me', 'more', 'next', 'of', 'one', 'ones', 'option', 'options', 'other',
+    'product', 'products', 'result', 'results', 'second', 'the', 'third', 'this', 'to',
+})
+
+
+def parse_price_lookup(message: str) -> Optional[str]:
+    """
+    Detect a plain "find X / cheapest X" request
+
+    Args:
+        message: User message
+
+    Returns:
+        The product name if the message is a plain price lookup, otherwise None
+    """
+    text = message.strip()
+    for pattern in _LOOKUP_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            product = match.group('product').strip(" '\"")
+            if product and not _CONVERSATIONAL.search(product) and not _is_follow_up(product):
+                return product
+    return None
+
+
+def _is_follow_up(product: str) -> bool:
+    """Whether a looked-up "product" only refers back to earlier results"""
+    return all(word in _FOLLOW_UP_WORDS for word in re.findall(r"[a-z0-9]+", product.lower()))
+
+
+def select_store_tools(preferred_stores: Optional[List[str]] = None) -> List:
+    """
+    Pick the store tools matching a list of preferred stores
+
+    Args:
+        preferred_stores: Store names such as "Jumia" or "Electroplanet" (None = all stores)
+
+    Returns:
+        Store tools to query
+    """
+    if not preferred_stores:
+        return list(STORE_TOOLS)
+    wanted = [store.strip().lower() for store in preferred_stores if store.strip()]
+    return [
+        tool for tool in STORE_TOOLS
+        if any(alias in store or store in alias for store in wanted for alias in STORE_TOOL_ALIASES[tool.__name__])
+    ]
+
+
+def build_engine(store_concurrency: Optional[int] = None) -> SearchEngine:
+    """
+    Build a search engine over every store declared in config.STORE_SPECS
+
+    Args:
+        store_concurrency: Maximum searches running at once per store (None = unlimited)
+
+    Returns:
+        SearchEngine with one store per shared scraper
+    """
+    engine = SearchEngine(store_concurrency=store_concurrency)
+    for scraper in get_scrapers().values():
+        engine.register(scraper.spec.name, scraper.search, pages=scraper.search_pages)
+    return engine
+
+
+def run_price_lookup(product_name: str, engine: Optional[SearchEngine] = None) -> str:
+    """
+    Search every store concurrently and return the price comparison report
+
+    This is the fixed tool sequence the ReAct agent runs for a price lookup,
+    without any LLM round-trips.
+
+    Args:
+        product_name: Product to search for
+        engine: Search engine to use (default: a new one over every store)
+
+    Returns:
+        Price comparison report sorted from cheapest to most expensive
+    """
+    engine = engine or build_engine()
+    products = engine.search_sync(product_name)
+    if not products:
+        return f"No products found for '{product_name}'."
+    return format_comparison(products)
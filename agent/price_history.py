@@ -0,0 +1,254 @@
+"""
+Price History Store
+SQLite-backed record of every search and observed price, with indexed history queries
+"""
+
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import config
+from agent.matching import normalize_name
+from agent.models import Product
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    id INTEGER PRIMARY KEY,
+    query TEXT NOT NULL,
+    searched_at REAL NOT NULL,
+    result_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    search_id INTEGER NOT NULL REFERENCES searches (id),
+    product_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    store TEXT NOT NULL,
+    price REAL NOT NULL,
+    currency TEXT NOT NULL,
+    url TEXT NOT NULL,
+    availability TEXT NOT NULL,
+    observed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS latest_prices (
+    product_key TEXT NOT NULL,
+    store TEXT NOT NULL,
+    name TEXT NOT NULL,
+    url TEXT NOT NULL,
+    price REAL NOT NULL,
+    observed_at REAL NOT NULL,
+    PRIMARY KEY (product_key, store)
+);
+CREATE INDEX IF NOT EXISTS searches_query ON searches (query, searched_at);
+CREATE INDEX IF NOT EXISTS latest_prices_time ON latest_prices (observed_at);
+CREATE INDEX IF NOT EXISTS observations_product ON observations (product_key, store, observed_at);
+CREATE INDEX IF NOT EXISTS observations_time ON observations (observed_at);
+"""
+
+_DAY = 24 * 3600
+
+
+class PriceHistory:
+    """
+    Append-only price history
+
+    Every saved search adds one `searches` row and one `observations` row per
+    product. Observations are keyed on the normalized product name, and the
+    (product, store, time) index answers history, lowest-price and price-drop
+    queries without scanning the table. `latest_prices` keeps the newest price
+    of each (product, store), so price-drop queries start from the recently
+    seen products instead of grouping the whole period's observations.
+    """
+
+    def __init__(self, path: str = config.PRICE_HISTORY_PATH):
+        """
+        Open (or create) the history database
+
+        Args:
+            path: Path to the SQLite database file (":memory:" for a throwaway store)
+        """
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def record_search(self, query: str, products: Sequence[Product], searched_at: Optional[float] = None) -> int:
+        """
+        Save one search and the prices it found
+
+        Args:
+            query: Product name that was searched
+            products: Products the search returned
+            searched_at: Unix time of the search (default: now)
+
+        Returns:
+            Id of the saved search
+        """
+        return self.record_many([(query, products)], searched_at)[0]
+
+    def record_many(
+        self, searches: Iterable[Tuple[str, Sequence[Product]]], searched_at: Optional[float] = None
+    ) -> List[int]:
+        """
+        Save several searches in a single transaction
+
+        Args:
+            searches: (query, products) pairs
+            searched_at: Unix time of the searches (default: now)
+
+        Returns:
+            Ids of the saved searches, in order
+        """
+        searched_at = time.time() if searched_at is None else searched_at
+        search_ids = []
+        with self._lock, self._conn:
+            for query, products in searches:
+                cursor = self._conn.execute(
+                    "INSERT INTO searches (query, searched_at, result_count) VALUES (?, ?, ?)",
+                    (query, searched_at, len(products)),
+                )
+                search_id = cursor.lastrowid
+                rows = [
+                    (search_id, normalize_name(p.name), p.name, p.store, p.price, p.currency, p.url,
+                     p.availability, searched_at)
+                    for p in products
+                ]
+                self._conn.executemany(
+                    "INSERT INTO observations (search_id, product_key, name, store, price, currency, url, "
+                    "availability, observed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.executemany(
+                    "INSERT INTO latest_prices (product_key, store, name, url, price, observed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (product_key, store) DO UPDATE SET "
+                    "name = excluded.name, url = excluded.url, price = excluded.price, "
+                    "observed_at = excluded.observed_at WHERE excluded.observed_at >= latest_prices.observed_at",
+                    [(row[1], row[3], row[2], row[6], row[4], row[8]) for row in rows],
+                )
+                search_ids.append(search_id)
+        return search_ids
+
+    def _query(self, sql: str, params) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def history(self, product_name: str, store: Optional[str] = None, since: Optional[float] = None) -> List[Dict]:
+        """
+        Price of a product over time
+
+        Args:
+            product_name: Product name (matched after normalization)
+            store: Only this store (default: every store)
+            since: Only observations after this Unix time
+
+        Returns:
+            Observations (store, price, currency, url, observed_at), oldest first
+        """
+        sql = (
+            "SELECT name, store, price, currency, url, availability, observed_at FROM observations "
+            "WHERE product_key = ?"
+        )
+        params: list = [normalize_name(product_name)]
+        if store is not None:
+            sql += " AND store = ?"
+            params.append(store)
+        if since is not None:
+            sql += " AND observed_at >= ?"
+            params.append(since)
+        return self._query(sql + " ORDER BY observed_at", params)
+
+    def lowest_per_store(self, product_name: str) -> List[Dict]:
+        """
+        Lowest price ever seen for a product at each store
+
+        Args:
+            product_name: Product name (matched after normalization)
+
+        Returns:
+            One row per store (store, price, currency, url, observed_at), cheapest store first
+        """
+        # SQLite returns the other columns from the row holding MIN(price)
+        return self._query(
+            "SELECT store, MIN(price) AS price, currency, url, observed_at FROM observations "
+            "WHERE product_key = ? GROUP BY store ORDER BY price",
+            (normalize_name(product_name),),
+        )
+
+    def price_drops(self, days: float = 7, min_drop: float = 0.10, now: Optional[float] = None) -> List[Dict]:
+        """
+        Products whose latest price is well below their recent high
+
+        The latest price of each (product, store) seen in the last `days` is
+        compared with the highest price since the last observation before that
+        period, so a drop right at the start of the period is still caught.
+
+        Args:
+            days: Length of the period in days
+            min_drop: Minimum relative drop, e.g. 0.10 for 10%
+            now: End of the period as Unix time (default: now)
+
+        Returns:
+            Rows (name, store, url, previous_price, price, price_drop), biggest drop first
+        """
+        since = (time.time() if now is None else now) - days * _DAY
+        return self._query(
+            """
+            WITH latest AS (
+                SELECT product_key, store, name, url, price, observed_at
+                FROM latest_prices WHERE observed_at >= :since
+            ),
+            previous AS (
+                SELECT l.product_key, l.store, MAX(o.price) AS price
+                FROM latest l
+                JOIN observations o ON o.product_key = l.product_key AND o.store = l.store
+                WHERE o.observed_at < l.observed_at
+                  AND o.observed_at >= COALESCE((
+                      SELECT MAX(b.observed_at) FROM observations b
+                      WHERE b.product_key = l.product_key AND b.store = l.store AND b.observed_at < :since
+                  ), :since)
+                GROUP BY l.product_key, l.store
+            )
+            SELECT l.name, l.store, l.url, p.price AS previous_price, l.price,
+                   (p.price - l.price) / p.price AS price_drop
+            FROM latest l JOIN previous p ON p.product_key = l.product_key AND p.store = l.store
+            WHERE p.price > 0 AND l.price <= p.price * (1 - :min_drop)
+            ORDER BY price_drop DESC
+            """,
+            {'since': since, 'min_drop': min_drop},
+        )
+
+    def recent_searches(self, limit: int = 20) -> List[Dict]:
+        """
+        Latest saved searches
+
+        Args:
+            limit: Maximum searches to return
+
+        Returns:
+            Rows (id, query, searched_at, result_count), newest first
+        """
+        return self._query(
+            "SELECT id, query, searched_at, result_count FROM searches ORDER BY searched_at DESC LIMIT ?",
+            (limit,),
+        )
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache(maxsize=None)
+def get_price_history() -> PriceHistory:
+    """
+    Get the process-wide price history store
+
+    Returns:
+        PriceHistory backed by config.PRICE_HISTORY_PATH
+    """
+    return PriceHistory()
@@ -3,23 +3,45 @@ Product Search Agent
 Main agent class for searching products and comparing prices
 """
 
-import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict
-import json
-from datetime import datetime
+import functools
+from typing import AsyncIterator, Iterator, List, Tuple
+
+from agent.matching import ProductGroup, dedupe, group_products
+from agent.models import Product
+from agent.price_history import get_price_history
+from agent.scrapers import get_scrapers
+from agent.search_engine import SearchEngine
 
 
 class ProductSearchAgent:
     """Agent class for searching products in Morocco e-commerce sites"""
     
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
+        """
+        Initialize the agent
+        
+        Args:
+            use_cache: Answer store searches from the result cache when possible
+                (False = always crawl the stores)
+        """
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         self.results = []
         
-    def search_products(self, product_name: str) -> List[Dict]:
+        # Every store declared in config.STORE_SPECS is queried concurrently by the search engine
+        self.engine = SearchEngine()
+        for scraper in get_scrapers().values():
+            if use_cache:
+                self.engine.register(scraper.spec.name, scraper.search, pages=scraper.search_pages)
+            else:
+                self.engine.register(
+                    scraper.spec.name,
+                    functools.partial(scraper.search, use_cache=False),
+                    pages=functools.partial(scraper.search_pages, use_cache=False),
+                )
+        
+    def search_products(self, product_name: str) -> List[Product]:
         """
         Search for products across multiple Moroccan e-commerce sites
         
@@ -27,100 +49,73 @@ class ProductSearchAgent:
             product_name: Name of the product to search
             
         Returns:
-            List of product dictionaries sorted by price (cheapest first)
+            List of products sorted by price (cheapest first)
         """
-        all_products = []
-        
-        # Search on different platforms
-        # Note: These are example structures - actual implementation needs real site scraping
-        all_products.extend(self._search_jumia(product_name))
-        all_products.extend(self._search_marjane(product_name))
-        all_products.extend(self._search_generic(product_name))
-        
-        # Sort by price (cheapest to most expensive)
-        sorted_products = sorted(all_products, key=lambda x: x['price'])
-        
-        return sorted_products
+        # Search on different platforms at the same time; a store that times out
+        # is skipped and the others' results are still returned
+        return dedupe(self.engine.search_sync(product_name))
     
-    def _search_jumia(self, product_name: str) -> List[Dict]:
-        """Search Jumia Morocco"""
-        products = []
-        try:
-            # Example placeholder - replace with actual Jumia Morocco API/scraping
-            print("  → Searching Jumia...")
-            # Actual implementation would scrape or use API here
-            
-        except Exception as e:
-            print(f"  ✗ Error searching Jumia: {str(e)}")
+    def search_grouped(self, product_name: str) -> List[ProductGroup]:
+        """
+        Search all stores and line up offers for the same product
         
-        return products
+        Args:
+            product_name: Name of the product to search
+            
+        Returns:
+            Product groups (one per distinct product, offers cheapest first),
+            sorted by each product's best price
+        """
+        return group_products(self.engine.search_sync(product_name))
     
-    def _search_marjane(self, product_name: str) -> List[Dict]:
-        """Search Marjane online"""
-        products = []
-        try:
-            print("  → Searching Marjane...")
-            # Actual implementation would scrape or use API here
+    async def search_products_async(self, product_name: str) -> List[Product]:
+        """
+        Async variant of search_products for callers already inside an event loop
+        
+        Args:
+            product_name: Name of the product to search
             
-        except Exception as e:
-            print(f"  ✗ Error searching Marjane: {str(e)}")
+        Returns:
+            List of products sorted by price (cheapest first)
+        """
+        return dedupe(await self.engine.search(product_name))
+    
+    def iter_products(self, product_name: str) -> Iterator[Tuple[str, List[Product]]]:
+        """
+        Search all stores and yield products as soon as each results page is parsed
+        
+        Feed the batches into an agent.ranking.TopK to keep a live
+        cheapest-first view while slower stores are still being queried.
         
-        return products
+        Args:
+            product_name: Name of the product to search
+            
+        Yields:
+            (store name, products) tuples in the order results arrive
+        """
+        return self.engine.iter_search(product_name)
     
-    def _search_generic(self, product_name: str) -> List[Dict]:
-        """Generic search method - add more stores here"""
-        products = []
-        try:
-            print("  → Searching other stores...")
-            # Example mock data for demonstration
-            products = [
-                {
-                    'name': f'{product_name} - Basic Model',
-                    'price': 299.99,
-                    'currency': 'MAD',
-                    'store': 'Store A',
-                    'url': 'https://example.com/product1',
-                    'availability': 'In Stock'
-                },
-                {
-                    'name': f'{product_name} - Premium Model',
-                    'price': 499.99,
-                    'currency': 'MAD',
-                    'store': 'Store B',
-                    'url': 'https://example.com/product2',
-                    'availability': 'In Stock'
-                },
-                {
-                    'name': f'{product_name} - Standard',
-                    'price': 399.99,
-                    'currency': 'MAD',
-                    'store': 'Store C',
-                    'url': 'https://example.com/product3',
-                    'availability': 'Limited Stock'
-                }
-            ]
-        except Exception as e:
-            print(f"  ✗ Error in generic search: {str(e)}")
+    def aiter_products(self, product_name: str) -> AsyncIterator[Tuple[str, List[Product]]]:
+        """
+        Async variant of iter_products
         
-        return products
+        Args:
+            product_name: Name of the product to search
+            
+        Yields:
+            (store name, products) tuples in the order results arrive
+        """
+        return self.engine.stream(product_name)
     
-    def save_results(self, results: List[Dict], product_name: str):
+    def save_results(self, results: List[Product], product_name: str) -> int:
         """
-        Save search results to a JSON file
+        Save search results to the price history
         
         Args:
-            results: List of product dictionaries
+            results: List of products
             product_name: Name of the searched product
+            
+        Returns:
+            Id of the saved search
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"results_{product_name.replace(' ', '_')}_{timestamp}.json"
-        
-        data = {
-            'search_query': product_name,
-            'timestamp': timestamp,
-            'total_results': len(results),
-            'products': results
-        }
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        return get_price_history().record_search(product_name, results)
@@ -0,0 +1,88 @@
+"""
+Incremental Ranking
+Running cheapest-first top-K view over products arriving store by store
+"""
+
+import heapq
+import itertools
+from typing import Iterable, List, Optional
+
+from agent.models import Product
+
+
+class TopK:
+    """
+    Keeps the K cheapest products seen so far
+
+    Products are pushed as each store answers; a bounded max-heap keeps only the
+    K cheapest, so every update costs O(log K) and the current best can be shown
+    long before the slowest store has replied.
+    """
+
+    def __init__(self, k: int = 10):
+        """
+        Initialize the ranking
+
+        Args:
+            k: Number of cheapest products to keep (0 or less keeps none)
+        """
+        self.k = k
+        self.seen = 0
+        self._heap = []  # (-price, -seq, product): the most expensive kept product is on top
+        self._seq = itertools.count()
+
+    def push(self, product: Product) -> bool:
+        """
+        Offer one product to the ranking
+
+        Args:
+            product: Product to rank
+
+        Returns:
+            True if the product entered the top K
+        """
+        self.seen += 1
+        if self.k <= 0:
+            return False
+        entry = (-product.price, -next(self._seq), product)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+
+    def extend(self, products: Iterable[Product]) -> bool:
+        """
+        Offer several products to the ranking
+
+        Args:
+            products: Products to rank
+
+        Returns:
+            True if the top K changed
+        """
+        changed = False
+        for product in products:
+            changed = self.push(product) or changed
+        return changed
+
+    @property
+    def best(self) -> Optional[Product]:
+        """The cheapest product seen so far"""
+        if not self._heap:
+            return None
+        return max(self._heap)[2]
+
+    def items(self) -> List[Product]:
+        """
+        Get the current top K
+
+        Returns:
+            List of products sorted by price (cheapest first)
+        """
+        return [entry[2] for entry in sorted(self._heap, reverse=True)]
+
+    def __len__(self):
+        return len(self._heap)
@@ -0,0 +1,166 @@
+"""
+Rate Limiting
+Per-host token-bucket limiter shared by threads and asyncio tasks
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import config
+
+
+class TokenBucket:
+    """
+    Token bucket enforcing a requests-per-minute budget
+
+    Up to `burst` requests go through immediately; after that callers wait only
+    as long as it takes for the next token to refill. Waiting is done outside the
+    lock by reserving a token first, so the same bucket can be shared safely by
+    worker threads (acquire) and coroutines (acquire_async).
+    """
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        """
+        Initialize the bucket
+
+        Args:
+            rate_per_minute: Sustained number of requests allowed per minute
+            burst: Requests allowed back to back before throttling (default: one minute's budget)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def _refill(self, now: float):
+        """Add the tokens earned since the last update (caller holds the lock)"""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self) -> float:
+        """Take one token and return how long the caller must wait before using it"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+            self.acquired += 1
+            self.last_wait = wait
+            if wait > 0:
+                self.throttled += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def acquire(self) -> float:
+        """
+        Block the calling thread until a request is allowed
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def try_acquire(self) -> bool:
+        """
+        Take a token only if one is available right now, never waiting
+
+        Returns:
+            Whether a token was taken
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.acquired += 1
+            self.last_wait = 0.0
+            return True
+
+    async def acquire_async(self) -> float:
+        """
+        Suspend the calling coroutine until a request is allowed
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    @property
+    def current_wait(self) -> float:
+        """Seconds a request issued right now would have to wait"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+
+    def metrics(self) -> Dict:
+        """
+        Get throttling metrics for this bucket
+
+        Returns:
+            Dictionary with request counts and wait times in seconds
+        """
+        return {
+            'rate_per_minute': self.rate * 60,
+            'burst': self.capacity,
+            'acquired': self.acquired,
+            'throttled': self.throttled,
+            'current_wait': self.current_wait,
+            'last_wait': self.last_wait,
+            'max_wait': self.max_wait,
+            'avg_wait': self.total_wait / self.acquired if self.acquired else 0.0,
+        }
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(url_or_host: str) -> TokenBucket:
+    """
+    Get the shared token bucket for a store host
+
+    Args:
+        url_or_host: Full URL or bare host name
+
+    Returns:
+        TokenBucket limited by config.STORE_RATE_LIMITS or config.RATE_LIMIT
+    """
+    host = urlsplit(url_or_host).netloc or url_or_host
+    bucket = _buckets.get(host)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(host)
+            if bucket is None:
+                rate = config.STORE_RATE_LIMITS.get(host, config.RATE_LIMIT)
+                bucket = _buckets[host] = TokenBucket(rate, config.RATE_LIMIT_BURST)
+    return bucket
+
+
+def rate_limit_metrics() -> Dict[str, Dict]:
+    """
+    Get throttling metrics for every host seen so far
+
+    Returns:
+        Dictionary mapping host to its bucket metrics
+    """
+    with _buckets_lock:
+        buckets = dict(_buckets)
+    return {host: bucket.metrics() for host, bucket in buckets.items()}
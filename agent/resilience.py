@@ -0,0 +1,335 @@
+"""
+Fetch Resilience
+Per-store latency tracking, adaptive timeouts, hedged requests and circuit breakers
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+import config
+from agent.rate_limit import get_rate_limiter
+from agent.tracing import bind_context, current_span
+from agent.transport import get_transport
+
+# Hedged requests run both copies here so the caller can wait on whichever answers
+# first. Like the store-search pool it is never shut down: a losing request just
+# finishes in the background and returns its connection to the pool.
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=config.HEDGE_WORKERS, thread_name_prefix="fetch-hedge")
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request to a store whose circuit is open"""
+
+
+class LatencyTracker:
+    """Rolling window of recent response times for one store"""
+
+    def __init__(self, window: int = config.LATENCY_WINDOW, min_samples: int = config.LATENCY_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._sorted = None
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self._sorted = None
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Latency at quantile q (0-1) of the window
+
+        Returns:
+            Seconds, or None until min_samples responses were seen
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            if self._sorted is None:
+                self._sorted = sorted(self._samples)
+            ordered = self._sorted
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one store
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    requests are refused without touching the network. After `reset_seconds`
+    one probe request is let through: success closes the circuit, failure
+    opens it again for another period.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = config.CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds: float = config.CIRCUIT_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """Whether a request could go through now (does not claim the half-open probe)"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() >= self.opened_at + self.reset_seconds
+            return not (self.state == self.HALF_OPEN and self._probing)
+
+    def allow(self) -> bool:
+        """Claim permission to send one request"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() < self.opened_at + self.reset_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"  ✓ {self.name} is answering again, circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.opened += 1
+                print(f"  ✗ {self.name} keeps failing, skipping it for {self.reset_seconds:.0f}s")
+
+
+class StoreHealth:
+    """Latency window, circuit breaker and hedging budget of one store host"""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(host)
+        self._lock = threading.Lock()
+
+        # Metrics, updated under _lock
+        self.requests = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.short_circuited = 0
+
+    def timeout(self, ceiling: float) -> float:
+        """
+        Request timeout for this store
+
+        A multiple of the recent p99 latency, so a store that normally answers
+        in 300 ms is given up on after about a second instead of `ceiling`.
+
+        Args:
+            ceiling: The configured (maximum) timeout
+
+        Returns:
+            Timeout in seconds
+        """
+        if not config.ADAPTIVE_TIMEOUT_ENABLED:
+            return ceiling
+        p99 = self.latency.percentile(0.99)
+        if p99 is None:
+            return ceiling
+        return min(ceiling, max(config.ADAPTIVE_TIMEOUT_MIN, p99 * config.ADAPTIVE_TIMEOUT_MULTIPLIER))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before sending a duplicate request (None = don't hedge)"""
+        if not config.HEDGE_ENABLED:
+            return None
+        p95 = self.latency.percentile(0.95)
+        return None if p95 is None else max(config.HEDGE_MIN_DELAY, p95)
+
+    def claim_hedge(self) -> bool:
+        """Count a hedge if the budget (HEDGE_MAX_RATIO of all requests) allows one"""
+        with self._lock:
+            if self.hedges + 1 > config.HEDGE_MAX_RATIO * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def metrics(self) -> Dict:
+        """
+        Get resilience metrics for this store
+
+        Returns:
+            Dictionary with latency percentiles, request/failure/hedge counts
+            and the circuit state
+        """
+        with self._lock:
+            counts = {
+                'requests': self.requests,
+                'failures': self.failures,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'short_circuited': self.short_circuited,
+            }
+        return {
+            'p50': self.latency.percentile(0.5),
+            'p95': self.latency.percentile(0.95),
+            'p99': self.latency.percentile(0.99),
+            'timeout': self.timeout(config.TIMEOUT_SECONDS),
+            **counts,
+            'circuit': self.breaker.state,
+            'circuit_opened': self.breaker.opened,
+        }
+
+
+_stores: Dict[str, StoreHealth] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store_health(url_or_host: str) -> StoreHealth:
+    """
+    Get the shared health record for a store host
+
+    Args:
+        url_or_host: Full URL or bare host name
+
+    Returns:
+        StoreHealth for that host
+    """
+    host = urlsplit(url_or_host).netloc or url_or_host
+    health = _stores.get(host)
+    if health is None:
+        with _stores_lock:
+            health = _stores.get(host)
+            if health is None:
+                health = _stores[host] = StoreHealth(host)
+    return health
+
+
+def _is_store_failure(error: requests.RequestException) -> bool:
+    """Connection errors, timeouts, 5xx and 429 count against a store; other 4xx do not"""
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        return response is None or response.status_code >= 500 or response.status_code == 429
+    return True
+
+
+def _timed_get(health: StoreHealth, url: str, headers: Optional[Dict], timeout: float):
+    """One request, adding its latency to the store's window"""
+    start = time.perf_counter()
+    try:
+        response = get_transport().get(url, headers=headers, timeout=timeout)
+    except requests.Timeout:
+        # Count timeouts as slow samples so percentiles are not biased toward fast answers
+        health.latency.add(time.perf_counter() - start)
+        raise
+    health.latency.add(time.perf_counter() - start)
+    return response
+
+
+def _hedged_get(health: StoreHealth, url: str, headers: Optional[Dict], timeout: float):
+    """
+    Send the request, and a duplicate if the first is still running after the store's p95
+
+    Whichever copy answers first wins; if one copy fails the other is awaited.
+    """
+    delay = health.hedge_delay()
+    if delay is None or delay >= timeout:
+        return _timed_get(health, url, headers, timeout)
+
+    first = _HEDGE_EXECUTOR.submit(bind_context(_timed_get), health, url, headers, timeout)
+    try:
+        return first.result(timeout=delay)
+    except FutureTimeout:
+        pass
+
+    # The duplicate must fit the hedge budget and the store's rate limit without waiting
+    if not health.claim_hedge() or not get_rate_limiter(url).try_acquire():
+        return first.result()
+
+    second = _HEDGE_EXECUTOR.submit(bind_context(_timed_get), health, url, headers, timeout)
+    span = current_span()
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                response = future.result()
+            except requests.RequestException as e:
+                error = error or e
+                continue
+            if future is second:
+                with health._lock:
+                    health.hedge_wins += 1
+            if span:
+                span.set(hedged=True, hedge_won=future is second)
+            return response
+    raise error
+
+
+def fetch(url: str, headers: Optional[Dict] = None, timeout: float = config.TIMEOUT_SECONDS):
+    """
+    GET a store page through its circuit breaker, adaptive timeout and hedging
+
+    Args:
+        url: URL to fetch
+        headers: Request headers
+        timeout: Maximum timeout in seconds; the store's adaptive timeout may be shorter
+
+    Returns:
+        Response object
+
+    Raises:
+        CircuitOpenError: The store's circuit is open, nothing was sent
+        requests.RequestException: The request failed
+    """
+    health = get_store_health(url)
+    if not health.breaker.allow():
+        with health._lock:
+            health.short_circuited += 1
+        raise CircuitOpenError(f"Circuit open for {health.host}")
+
+    with health._lock:
+        health.requests += 1
+    try:
+        response = _hedged_get(health, url, headers, health.timeout(timeout))
+    except requests.RequestException as e:
+        if _is_store_failure(e):
+            with health._lock:
+                health.failures += 1
+            health.breaker.record_failure()
+        else:
+            health.breaker.record_success()
+        raise
+    health.breaker.record_success()
+    return response
@@ -0,0 +1,276 @@
+"""
+Columnar Result Set
+NumPy-backed product offers for vectorized sorting, filtering and price statistics
+"""
+
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from agent.models import Product
+
+_OUT_OF_STOCK = re.compile(r'out of stock|sold out|unavailable|rupture|indisponible|épuisé', re.IGNORECASE)
+_IN_STOCK = re.compile(r'in stock|limited stock|en stock|disponible', re.IGNORECASE)
+
+
+def is_in_stock(availability: str) -> bool:
+    """Whether an availability label explicitly says the product can be bought"""
+    return not _OUT_OF_STOCK.search(availability) and bool(_IN_STOCK.search(availability))
+
+
+def product_key(name: str) -> str:
+    """Default group-by key: the product name lowercased with whitespace collapsed"""
+    return ' '.join(name.lower().split())
+
+
+class ResultSet:
+    """
+    Product offers stored column by column
+
+    Prices live in a float64 array, stores in an int32 array of ids into a small
+    table of store names and availability in a boolean in-stock array. Sorting,
+    filtering and statistics run as NumPy operations over those columns; the
+    Product objects are only touched again when rows are displayed.
+
+    Every transformation returns a new ResultSet sharing the product list and
+    store table, so chaining filter().sort() copies index arrays, not offers.
+    """
+
+    def __init__(self, products: Iterable[Product] = ()):
+        """
+        Build a result set from products
+
+        Args:
+            products: Product offers
+        """
+        self._products: List[Product] = list(products)
+        count = len(self._products)
+        self.store_names: List[str] = []
+        store_ids: Dict[str, int] = {}
+        stock_by_label: Dict[str, bool] = {}
+
+        self._rows = np.arange(count)
+        self.prices = np.fromiter((p.price for p in self._products), dtype=np.float64, count=count)
+        self.store_ids = np.empty(count, dtype=np.int32)
+        self.in_stock = np.empty(count, dtype=bool)
+        for row, product in enumerate(self._products):
+            store_id = store_ids.get(product.store)
+            if store_id is None:
+                store_id = store_ids[product.store] = len(self.store_names)
+                self.store_names.append(product.store)
+            self.store_ids[row] = store_id
+            # Labels are few and interned, so each one is classified once
+            stock = stock_by_label.get(product.availability)
+            if stock is None:
+                stock = stock_by_label[product.availability] = is_in_stock(product.availability)
+            self.in_stock[row] = stock
+
+    @classmethod
+    def of(cls, products) -> "ResultSet":
+        """Return `products` unchanged if it already is a ResultSet, otherwise build one"""
+        return products if isinstance(products, cls) else cls(products)
+
+    def _take(self, positions: np.ndarray) -> "ResultSet":
+        """New result set holding the rows at `positions` (indices into this set's columns)"""
+        subset = ResultSet.__new__(ResultSet)
+        subset._products = self._products
+        subset.store_names = self.store_names
+        subset._rows = self._rows[positions]
+        subset.prices = self.prices[positions]
+        subset.store_ids = self.store_ids[positions]
+        subset.in_stock = self.in_stock[positions]
+        return subset
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[Product]:
+        products = self._products
+        return (products[row] for row in self._rows.tolist())
+
+    def __getitem__(self, index: int) -> Product:
+        return self._products[int(self._rows[index])]
+
+    def __bool__(self) -> bool:
+        return len(self._rows) > 0
+
+    def to_products(self) -> List[Product]:
+        """The rows as a list of products, in the current order"""
+        return list(self)
+
+    @property
+    def stores(self) -> np.ndarray:
+        """Store name of every row"""
+        return np.asarray(self.store_names, dtype=object)[self.store_ids]
+
+    def sort(self, descending: bool = False) -> "ResultSet":
+        """
+        Sort by price
+
+        Args:
+            descending: Most expensive first instead of cheapest first
+
+        Returns:
+            Sorted result set (ties keep their original order)
+        """
+        order = np.argsort(-self.prices if descending else self.prices, kind='stable')
+        return self._take(order)
+
+    def cheapest(self, count: int) -> "ResultSet":
+        """
+        The `count` cheapest offers, sorted, without sorting the whole set
+
+        Args:
+            count: Number of offers to keep
+
+        Returns:
+            Result set with at most `count` rows
+        """
+        if count >= len(self):
+            return self.sort()
+        candidates = np.argpartition(self.prices, count)[:count]
+        return self._take(candidates[np.argsort(self.prices[candidates], kind='stable')])
+
+    def filter(
+        self,
+        max_price: Optional[float] = None,
+        min_price: Optional[float] = None,
+        in_stock: bool = False,
+        stores: Optional[Sequence[str]] = None,
+    ) -> "ResultSet":
+        """
+        Keep only the offers matching every given condition
+
+        Args:
+            max_price: Highest price allowed
+            min_price: Lowest price allowed
+            in_stock: Keep only offers whose availability says in stock
+            stores: Store names to keep (case-insensitive)
+
+        Returns:
+            Filtered result set
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if max_price is not None:
+            mask &= self.prices <= max_price
+        if min_price is not None:
+            mask &= self.prices >= min_price
+        if in_stock:
+            mask &= self.in_stock
+        if stores is not None:
+            wanted = {store.lower() for store in stores}
+            store_ids = [i for i, name in enumerate(self.store_names) if name.lower() in wanted]
+            mask &= np.isin(self.store_ids, store_ids)
+        return self._take(np.flatnonzero(mask))
+
+    def savings(self) -> Dict:
+        """
+        Savings from buying the cheapest offer instead of the most expensive one
+
+        Returns:
+            Dictionary with savings, percentage, cheapest_price and most_expensive_price
+        """
+        if len(self) < 2:
+            return {'savings': 0, 'percentage': 0}
+        cheapest = float(self.prices.min())
+        most_expensive = float(self.prices.max())
+        savings = most_expensive - cheapest
+        return {
+            'savings': savings,
+            'percentage': (savings / most_expensive) * 100 if most_expensive > 0 else 0,
+            'cheapest_price': cheapest,
+            'most_expensive_price': most_expensive,
+        }
+
+    def store_stats(self, percentiles: Sequence[float] = (25, 75)) -> Dict[str, Dict]:
+        """
+        Price statistics per store
+
+        Args:
+            percentiles: Extra percentiles to report, e.g. (10, 90)
+
+        Returns:
+            Dictionary mapping store name to count, min, median, max, mean and
+            one "p<N>" entry per requested percentile
+        """
+        stats = {}
+        if not len(self):
+            return stats
+
+        # One sort groups the rows by store with prices ascending inside each group
+        order = np.lexsort((self.prices, self.store_ids))
+        store_ids = self.store_ids[order]
+        prices = self.prices[order]
+        starts = np.flatnonzero(np.r_[True, store_ids[1:] != store_ids[:-1]])
+        ends = np.r_[starts[1:], len(prices)]
+        quantiles = [50, *percentiles]
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            group = prices[start:end]
+            values = np.percentile(group, quantiles)
+            entry = {
+                'count': end - start,
+                'min': float(group[0]),
+                'median': float(values[0]),
+                'max': float(group[-1]),
+                'mean': float(group.mean()),
+            }
+            for percentile, value in zip(percentiles, values[1:].tolist()):
+                entry[f'p{percentile:g}'] = value
+            stats[self.store_names[int(store_ids[start])]] = entry
+        return stats
+
+    def group_stats(
+        self, key: Callable[[str], str] = product_key, labels: Optional[Sequence] = None
+    ) -> Dict[str, Dict]:
+        """
+        Price statistics per product across stores
+
+        Args:
+            key: Function mapping a product name to its group key
+            labels: Precomputed group label per row, in the current order (e.g.
+                from agent.matching.ProductMatcher.labels); overrides `key`
+
+        Returns:
+            Dictionary mapping group key to count, store count, min, max, mean,
+            savings and the cheapest offer, ordered by cheapest price
+        """
+        if not len(self):
+            return {}
+
+        if labels is not None:
+            keys = np.asarray(labels)
+        else:
+            keys = np.asarray([key(product.name) for product in self], dtype=object)
+        group_keys, group_ids = np.unique(keys, return_inverse=True)
+        group_ids = group_ids.ravel()
+
+        order = np.lexsort((self.prices, group_ids))
+        sorted_groups = group_ids[order]
+        prices = self.prices[order]
+        starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+
+        counts = np.diff(np.r_[starts, len(prices)])
+        minimums = prices[starts]
+        maximums = np.maximum.reduceat(prices, starts)
+        means = np.add.reduceat(prices, starts) / counts
+
+        # Distinct stores per group: unique (group, store) pairs counted per group
+        pairs = np.unique(group_ids.astype(np.int64) * (len(self.store_names) + 1) + self.store_ids)
+        store_counts = np.bincount(pairs // (len(self.store_names) + 1), minlength=len(group_keys))
+
+        stats = {}
+        for index in np.argsort(minimums, kind='stable').tolist():
+            start = int(starts[index])
+            group = int(sorted_groups[start])
+            stats[group_keys[group]] = {
+                'count': int(counts[index]),
+                'stores': int(store_counts[group]),
+                'min': float(minimums[index]),
+                'max': float(maximums[index]),
+                'mean': float(means[index]),
+                'savings': float(maximums[index] - minimums[index]),
+                'cheapest': self[int(order[start])],
+            }
+        return stats
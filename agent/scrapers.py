@@ -3,175 +3,364 @@ Example scraper implementation for Moroccan e-commerce sites
 This module contains example scrapers - customize based on actual site structure
 """
 
+import math
+import threading
 import requests
-from bs4 import BeautifulSoup
-from typing import List, Dict
-import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, List, Dict, Optional
+
+import config
+
+from agent.cache import get_result_cache
+from agent.http_cache import get_http_cache
+from agent.models import Product
+from agent.parse_pool import get_parse_pool
+from agent.parsers import get_parser
+from agent.store_specs import StoreSpec, compile_spec, load_store_specs
+from agent.rate_limit import get_rate_limiter
+from agent.resilience import CircuitOpenError, fetch, get_store_health
+from agent.tracing import bind_context, get_tracer
 
 
 class ScraperBase:
     """Base class for all scrapers"""
     
-    def __init__(self, timeout=10):
+    def __init__(self, timeout=10, parser: Optional[str] = None):
+        """
+        Initialize the scraper
+        
+        Args:
+            timeout: Request timeout in seconds
+            parser: Parser backend name (default: config.PARSER_BACKEND)
+        """
         self.timeout = timeout
+        self.parser = get_parser(parser)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
+        self.http_cache = get_http_cache()
     
     def get_page(self, url: str):
-        """Fetch a web page with error handling"""
-        try:
-            response = requests.get(url, headers=self.headers, timeout=self.timeout)
-            response.raise_for_status()
+        """
+        Fetch a web page over the shared keep-alive connection pool
+        
+        Pages already in the HTTP cache are revalidated with If-None-Match /
+        If-Modified-Since; on 304 the cached page is returned with
+        `not_modified` set instead of downloading it again. The request is
+        traced as a "fetch" span with the transport's connect/tls/ttfb/download
+        phases under it.
+        
+        Requests go through the store's circuit breaker, adaptive timeout (at
+        most self.timeout) and hedging; a store whose circuit is open is
+        skipped without a request.
+        """
+        with get_tracer().span('fetch', url=url) as span:
+            headers = self.headers
+            if self.http_cache:
+                headers = {**self.headers, **self.http_cache.conditional_headers(url)}
+            
+            # Wait only when this store's request budget is used up
+            waited = get_rate_limiter(url).acquire()
+            if waited:
+                get_tracer().record('rate_limit', waited)
+            try:
+                response = fetch(url, headers=headers, timeout=self.timeout)
+            except CircuitOpenError:
+                if span:
+                    span.error = 'circuit_open'
+                return None
+            except requests.RequestException as e:
+                print(f"Error fetching {url}: {e}")
+                if span:
+                    span.error = type(e).__name__
+                return None
+            
+            if self.http_cache:
+                if response.status_code == 304:
+                    cached = self.http_cache.lookup(url)
+                    if cached:
+                        if span:
+                            span.set(status=304)
+                        return cached
+                    # Cache entry vanished since the request went out - fetch it in full
+                    waited = get_rate_limiter(url).acquire()
+                    if waited:
+                        get_tracer().record('rate_limit', waited)
+                    try:
+                        response = fetch(url, headers=self.headers, timeout=self.timeout)
+                    except CircuitOpenError:
+                        if span:
+                            span.error = 'circuit_open'
+                        return None
+                    except requests.RequestException as e:
+                        print(f"Error fetching {url}: {e}")
+                        if span:
+                            span.error = type(e).__name__
+                        return None
+                self.http_cache.store(url, response)
+            if span:
+                span.set(status=response.status_code)
             return response
-        except requests.RequestException as e:
-            print(f"Error fetching {url}: {e}")
-            return None
-
-
-class JumiaScraper(ScraperBase):
-    """Scraper for Jumia Morocco"""
-    
-    BASE_URL = "https://www.jumia.ma"
     
-    def search(self, product_name: str) -> List[Dict]:
+    def fetch_products(self, url: str, parse: Callable[[bytes], List[Product]]) -> List[Product]:
         """
-        Search for products on Jumia Morocco
+        Fetch a results page and parse it, skipping the parse for unchanged pages
         
         Args:
-            product_name: Product to search for
+            url: Results page URL
+            parse: Function turning the page body into products
             
         Returns:
-            List of product dictionaries
+            List of products
         """
-        products = []
+        response = self.get_page(url)
+        if not response:
+            return []
         
-        try:
-            # Example search URL structure - adjust based on actual site
-            search_url = f"{self.BASE_URL}/catalog/?q={product_name.replace(' ', '+')}"
-            
-            response = self.get_page(search_url)
-            if not response:
+        if getattr(response, 'not_modified', False):
+            products = self.http_cache.get_parsed(url)
+            if products is not None:
                 return products
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Example parsing - CUSTOMIZE based on actual HTML structure
-            # This is a template - you need to inspect the actual site
-            product_items = soup.find_all('article', class_='prd')  # Example class
-            
-            for item in product_items[:10]:  # Limit to top 10
-                try:
-                    # Extract product details - CUSTOMIZE selectors
-                    name_elem = item.find('h3', class_='name')
-                    price_elem = item.find('div', class_='prc')
-                    link_elem = item.find('a', class_='core')
-                    
-                    if name_elem and price_elem:
-                        # Extract and clean price
-                        price_text = price_elem.get_text(strip=True)
-                        price = self._extract_price(price_text)
-                        
-                        product = {
-                            'name': name_elem.get_text(strip=True),
-                            'price': price,
-                            'currency': 'MAD',
-                            'store': 'Jumia',
-                            'url': self.BASE_URL + link_elem['href'] if link_elem else '',
-                            'availability': 'Check Store'
-                        }
-                        products.append(product)
-                        
-                except Exception as e:
-                    print(f"Error parsing product: {e}")
-                    continue
-            
-            # Be respectful - add delay
-            time.sleep(1)
-            
-        except Exception as e:
-            print(f"Error scraping Jumia: {e}")
         
+        products = parse(response.content)
+        if self.http_cache:
+            self.http_cache.store_parsed(url, products)
         return products
-    
-    def _extract_price(self, price_text: str) -> float:
-        """Extract numeric price from text"""
-        try:
-            # Remove currency symbols and spaces
-            price_clean = price_text.replace('DH', '').replace('MAD', '').replace(',', '').strip()
-            return float(price_clean)
-        except:
-            return 0.0
 
 
-class MarjaneScraper(ScraperBase):
-    """Scraper for Marjane Online"""
+class SpecScraper(ScraperBase):
+    """
+    Generic scraper driven by a declarative StoreSpec
+    
+    Every store in config.STORE_SPECS is searched by this one engine; the spec
+    is compiled once into an extractor for the configured parser backend.
+    """
     
-    BASE_URL = "https://www.marjane.ma"
+    SPEC_KEY = None
+    
+    def __init__(self, spec: Optional[StoreSpec] = None, timeout=10, parser: Optional[str] = None):
+        """
+        Initialize the scraper
+        
+        Args:
+            spec: Store spec (default: the config.STORE_SPECS entry named by SPEC_KEY)
+            timeout: Request timeout in seconds
+            parser: Parser backend name (default: config.PARSER_BACKEND)
+        """
+        super().__init__(timeout=timeout, parser=parser)
+        self.spec = spec or load_store_specs()[self.SPEC_KEY]
+        self.extractor = compile_spec(self.spec, self.parser)
     
-    def search(self, product_name: str) -> List[Dict]:
+    def search(self, product_name: str, max_results: int = config.MAX_RESULTS_PER_STORE,
+               use_cache: bool = True) -> List[Product]:
         """
-        Search for products on Marjane
+        Search for products on the store
         
         Args:
             product_name: Product to search for
+            max_results: Maximum products to collect across results pages
+            use_cache: Answer from the result cache when possible (False = always
+                crawl; the fresh results still refresh the cache)
             
         Returns:
-            List of product dictionaries
+            List of products
         """
-        products = []
+        breaker = get_store_health(self.spec.base_url).breaker
         
-        try:
-            # Example search URL - adjust based on actual site
-            search_url = f"{self.BASE_URL}/search?q={product_name.replace(' ', '+')}"
-            
-            response = self.get_page(search_url)
-            if not response:
-                return products
+        def crawl():
+            # A store that keeps failing is skipped at once (empty results are not cached)
+            if not breaker.available:
+                return []
+            return [product for page in self.iter_pages(product_name, max_results) for product in page]
+        
+        cache = get_result_cache()
+        cache_store = self._cache_store(max_results)
+        if use_cache:
+            return cache.get_or_compute(cache_store, product_name, crawl)
+        products = crawl()
+        if products:
+            cache.put(cache_store, product_name, products)
+        return products
+    
+    def search_pages(self, product_name: str, max_results: int = config.MAX_RESULTS_PER_STORE,
+                     use_cache: bool = True) -> Iterator[List[Product]]:
+        """
+        Search for products on the store, yielding each results page as soon as it is parsed
+        
+        A cached result is yielded as one batch; otherwise the pages are crawled
+        and their combined products are cached once the crawl completes.
+        Unlike search(), concurrent crawls of the same query are not coalesced.
+        
+        Args:
+            product_name: Product to search for
+            max_results: Maximum products to collect across results pages
+            use_cache: Answer from the result cache when possible (False = always
+                crawl; the fresh results still refresh the cache)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+        Yields:
+            Lists of products
+        """
+        cache = get_result_cache()
+        cache_store = self._cache_store(max_results)
+        cached = cache.get(cache_store, product_name) if use_cache else None
+        if cached is not None:
+            yield cached
+            return
+        if not get_store_health(self.spec.base_url).breaker.available:
+            return
+        
+        products = []
+        for page in self.iter_pages(product_name, max_results):
+            products.extend(page)
+            yield page
+        if products:
+            cache.put(cache_store, product_name, products)
+    
+    def _cache_store(self, max_results: int) -> str:
+        """Result cache store name; limits other than the default get their own entries"""
+        if max_results != config.MAX_RESULTS_PER_STORE:
+            return f"{self.spec.name}:{max_results}"
+        return self.spec.name
+    
+    def iter_pages(self, product_name: str, max_results: int = config.MAX_RESULTS_PER_STORE) -> Iterator[List[Product]]:
+        """
+        Crawl results pages and yield each page's products as soon as it is parsed
+        
+        The first page tells how many products a page holds; the further pages
+        needed to reach max_results are then fetched concurrently. The crawl
+        stops early once enough products are collected or a page comes back empty.
+        
+        Args:
+            product_name: Product to search for
+            max_results: Maximum products to yield in total
             
-            # Example parsing - CUSTOMIZE based on actual HTML structure
-            product_items = soup.find_all('div', class_='product-item')  # Example class
+        Yields:
+            Lists of products, one per results page
+        """
+        first_page = self._fetch_page(product_name, 1)
+        if not first_page:
+            return
+        collected = min(len(first_page), max_results)
+        yield first_page[:collected]
+        
+        if collected >= max_results or not self.spec.paginated:
+            return
+        
+        page_count = min(
+            math.ceil((max_results - collected) / len(first_page)),
+            config.MAX_PAGES_PER_STORE - 1,
+        )
+        if page_count <= 0:
+            return
+        
+        pool = ThreadPoolExecutor(max_workers=config.PAGE_FETCH_CONCURRENCY)
+        try:
+            pending = {
+                pool.submit(bind_context(self._fetch_page), product_name, page): page
+                for page in range(2, 2 + page_count)
+            }
+            last_page = 1 + page_count
             
-            for item in product_items[:10]:
-                try:
-                    name_elem = item.find('div', class_='product-name')
-                    price_elem = item.find('span', class_='price')
-                    link_elem = item.find('a')
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = pending.pop(future)
+                    if page > last_page:
+                        continue
+                    products = future.result()
+                    if not products:
+                        # Results ran out - later pages will be empty too
+                        last_page = page - 1
+                        for other, other_page in list(pending.items()):
+                            if other_page > last_page:
+                                other.cancel()
+                        continue
                     
-                    if name_elem and price_elem:
-                        price_text = price_elem.get_text(strip=True)
-                        price = self._extract_price(price_text)
-                        
-                        product = {
-                            'name': name_elem.get_text(strip=True),
-                            'price': price,
-                            'currency': 'MAD',
-                            'store': 'Marjane',
-                            'url': link_elem['href'] if link_elem else '',
-                            'availability': 'Check Store'
-                        }
-                        products.append(product)
-                        
-                except Exception as e:
-                    print(f"Error parsing product: {e}")
-                    continue
-            
-            time.sleep(1)
-            
+                    products = products[:max_results - collected]
+                    collected += len(products)
+                    yield products
+                    if collected >= max_results:
+                        return
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _fetch_page(self, product_name: str, page: int) -> List[Product]:
+        """Fetch and parse one results page, returning an empty list on errors"""
+        try:
+            return self.fetch_products(self.spec.url_for(product_name, page), self._parse_results)
         except Exception as e:
-            print(f"Error scraping Marjane: {e}")
+            print(f"Error scraping {self.spec.name} page {page}: {e}")
+            return []
+    
+    def _parse_results(self, content: bytes) -> List[Product]:
+        """Extract the products of a results page with the compiled spec"""
+        pool = get_parse_pool()
+        if pool is not None:
+            # Worker processes have no trace, so the pool round trip is the parse span
+            with get_tracer().child('parse', pool=True):
+                return pool.extract(self.spec, content, self.parser.name)
+        return self.extractor.extract(content)
+
+
+class JumiaScraper(SpecScraper):
+    """Scraper for Jumia Morocco"""
+    
+    SPEC_KEY = "jumia"
+
+
+class MarjaneScraper(SpecScraper):
+    """Scraper for Marjane Online"""
+    
+    SPEC_KEY = "marjane"
+
+
+def build_scrapers(timeout=10, parser: Optional[str] = None) -> Dict[str, SpecScraper]:
+    """
+    Build a scraper for every store declared in config.STORE_SPECS
+    
+    Args:
+        timeout: Request timeout in seconds
+        parser: Parser backend name (default: config.PARSER_BACKEND)
         
-        return products
+    Returns:
+        Dictionary mapping store key to its scraper
+    """
+    return {
+        key: SpecScraper(spec, timeout=timeout, parser=parser)
+        for key, spec in load_store_specs().items()
+    }
+
+
+_scrapers: Optional[Dict[str, SpecScraper]] = None
+_scrapers_lock = threading.Lock()
+
+
+def get_scrapers() -> Dict[str, SpecScraper]:
+    """
+    Get the process-wide scrapers that every search path queries
     
-    def _extract_price(self, price_text: str) -> float:
-        """Extract numeric price from text"""
-        try:
-            price_clean = price_text.replace('DH', '').replace('MAD', '').replace(',', '').strip()
-            return float(price_clean)
-        except:
-            return 0.0
+    Returns:
+        Dictionary mapping store key to its scraper, built on first use from
+        config.STORE_SPECS
+    """
+    global _scrapers
+    if _scrapers is None:
+        with _scrapers_lock:
+            if _scrapers is None:
+                _scrapers = build_scrapers()
+    return _scrapers
+
+
+def configure_scrapers(scrapers: Optional[Dict[str, SpecScraper]]):
+    """
+    Replace the shared scrapers, e.g. with scrapers pointed at a local fixture server
+    
+    Args:
+        scrapers: Dictionary mapping store key to its scraper (None = rebuild from config on next use)
+    """
+    global _scrapers
+    with _scrapers_lock:
+        _scrapers = scrapers
 
 
 # Example usage
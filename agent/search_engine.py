@@ -0,0 +1,292 @@
+"""
+Async Search Engine
+Queries every registered store concurrently with per-store timeouts and an overall deadline
+"""
+
+import asyncio
+import threading
+import time
+from operator import attrgetter
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+from agent.models import Product
+from agent.tracing import bind_context, get_tracer, run_in
+
+
+StoreSearch = Callable[[str], List[Product]]
+StorePages = Callable[[str], Iterable[List[Product]]]
+
+_by_price = attrgetter('price')
+
+_SLOT_POLL_SECONDS = 0.01  # How often a search waiting for a per-store slot checks again
+
+# Shared worker pool for blocking store searches. It is never shut down with the
+# event loop, so a store that overruns its timeout cannot hold up asyncio.run().
+_STORE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=config.SEARCH_WORKERS, thread_name_prefix="store-search"
+)
+
+
+class SearchEngine:
+    """
+    Fan-out search engine for Moroccan e-commerce stores
+
+    Every registered store is searched at the same time, so a query costs roughly
+    the latency of the slowest store instead of the sum of all of them. A store
+    that misses its timeout is dropped from the answer and the other stores'
+    results are still returned.
+    """
+
+    def __init__(
+        self,
+        store_timeout: float = config.TIMEOUT_SECONDS,
+        deadline: float = config.SEARCH_DEADLINE_SECONDS,
+        store_concurrency: Optional[int] = None,
+    ):
+        """
+        Initialize the search engine
+
+        Args:
+            store_timeout: Maximum seconds to wait for a single store
+            deadline: Maximum seconds to wait for the whole query
+            store_concurrency: Maximum searches running at once against each
+                store across all concurrent queries (None = unlimited)
+        """
+        self.store_timeout = store_timeout
+        self.deadline = deadline
+        self.store_concurrency = store_concurrency
+        self.stores: Dict[str, StoreSearch] = {}
+        self.pages: Dict[str, StorePages] = {}
+        # Thread-safe, so the cap also holds across the event loops of search_sync() callers
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._limits_lock = threading.Lock()
+
+    def register(self, name: str, search: StoreSearch, pages: Optional[StorePages] = None):
+        """
+        Register a store search function
+
+        Args:
+            name: Store name used in logs and results
+            search: Blocking callable taking a product name and returning products
+            pages: Optional blocking generator function taking a product name and
+                yielding products one results page at a time; stream() then
+                forwards each page as soon as it is parsed
+        """
+        self.stores[name] = search
+        if pages is not None:
+            self.pages[name] = pages
+        else:
+            self.pages.pop(name, None)
+
+    def _store_limit(self, name: str) -> Optional[threading.BoundedSemaphore]:
+        """Per-store semaphore shared by every event loop using this engine"""
+        if self.store_concurrency is None:
+            return None
+        with self._limits_lock:
+            limit = self._limits.get(name)
+            if limit is None:
+                limit = self._limits[name] = threading.BoundedSemaphore(self.store_concurrency)
+            return limit
+
+    async def _search_store(self, name: str, product_name: str, results: asyncio.Queue, errors: Dict[str, str]):
+        """Run one blocking store search in a worker thread, bounded by the store timeout"""
+        limit = self._store_limit(name)
+        if limit is None:
+            return await self._run_store(name, product_name, results, errors)
+
+        # Waiting for a free slot is bounded by the query deadline, not the store timeout.
+        # The slot is polled rather than waited on in a thread, so a cancelled wait holds nothing.
+        while not limit.acquire(blocking=False):
+            await asyncio.sleep(_SLOT_POLL_SECONDS)
+        try:
+            return await self._run_store(name, product_name, results, errors)
+        finally:
+            limit.release()
+
+    async def _run_store(self, name: str, product_name: str, results: asyncio.Queue, errors: Dict[str, str]):
+        """
+        Put the store's products on `results`, one batch per results page for paged stores
+
+        A timeout or exception is recorded in `errors` under the store name.
+        """
+        loop = asyncio.get_running_loop()
+        pages = self.pages.get(name)
+        stop = threading.Event()
+        found = batches_sent = 0
+
+        def crawl():
+            nonlocal found, batches_sent
+            batches = iter(pages(product_name))
+            try:
+                for products in batches:
+                    if stop.is_set():
+                        break
+                    try:
+                        # Queued before the executor future resolves, so no page is lost
+                        loop.call_soon_threadsafe(results.put_nowait, (name, products))
+                    except RuntimeError:
+                        # The event loop closed while this overdue crawl was running
+                        break
+                    found += len(products)
+                    batches_sent += 1
+            finally:
+                close = getattr(batches, 'close', None)
+                if close:
+                    close()
+
+        with get_tracer().span('store', store=name) as span:
+            try:
+                # The worker thread runs in this task's context, so its spans nest under this one
+                if pages is None:
+                    products = await asyncio.wait_for(
+                        loop.run_in_executor(_STORE_EXECUTOR, bind_context(self.stores[name]), product_name),
+                        timeout=self.store_timeout,
+                    )
+                    found, batches_sent = len(products), 1
+                    results.put_nowait((name, products))
+                else:
+                    await asyncio.wait_for(
+                        loop.run_in_executor(_STORE_EXECUTOR, bind_context(crawl)),
+                        timeout=self.store_timeout,
+                    )
+                if span:
+                    span.set(products=found)
+            except asyncio.TimeoutError:
+                print(f"  ✗ {name} timed out after {self.store_timeout}s")
+                errors[name] = f"timed out after {self.store_timeout}s"
+                if span:
+                    span.error = 'timeout'
+            except Exception as e:
+                print(f"  ✗ Error searching {name}: {str(e)}")
+                errors[name] = str(e) or type(e).__name__
+                if span:
+                    span.error = type(e).__name__
+            finally:
+                # A crawl still running after a timeout stops at its next page
+                stop.set()
+            if not batches_sent:
+                # Stores that found nothing are still reported
+                results.put_nowait((name, []))
+
+    async def stream(
+        self, product_name: str, errors: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[Tuple[str, List[Product]]]:
+        """
+        Search every registered store concurrently, yielding results as they arrive
+
+        A store registered with `pages` yields one batch per results page;
+        other stores yield all their products at once.
+
+        Args:
+            product_name: Product to search for
+            errors: Filled with the reason (timeout, exception, missed deadline)
+                for every store that failed, keyed by store name
+
+        Yields:
+            (store name, products) tuples in completion order
+        """
+        # An async generator cannot hold a context variable across yields, so
+        # the query span is handed to the store tasks explicitly
+        tracer = get_tracer()
+        span = tracer.start_span('search', query=product_name)
+        if errors is None:
+            errors = {}
+        results: asyncio.Queue = asyncio.Queue()
+        tasks = {
+            run_in(span, asyncio.create_task, self._search_store(name, product_name, results, errors)): name
+            for name in self.stores
+        }
+        deadline = time.monotonic() + self.deadline
+        pending = set(tasks)
+        try:
+            while pending or not results.empty():
+                while not results.empty():
+                    yield results.get_nowait()
+                remaining = deadline - time.monotonic()
+                if not pending or remaining <= 0:
+                    break
+                batch = asyncio.create_task(results.get())
+                done, _ = await asyncio.wait(
+                    pending | {batch}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                pending -= done
+                if batch in done:
+                    yield batch.result()
+                else:
+                    batch.cancel()
+        finally:
+            for task in pending:
+                print(f"  ✗ {tasks[task]} missed the {self.deadline}s search deadline")
+                errors[tasks[task]] = f"missed the {self.deadline}s search deadline"
+                task.cancel()
+            if span:
+                span.set(stores=len(tasks), missed=len(pending))
+            tracer.end_span(span)
+
+    async def search_stores(
+        self, product_name: str, errors: Optional[Dict[str, str]] = None
+    ) -> Dict[str, List[Product]]:
+        """
+        Search every registered store concurrently
+
+        Args:
+            product_name: Product to search for
+            errors: Filled with the reason for every store that failed, keyed by store name
+
+        Returns:
+            Dictionary mapping store name to the products it returned in time
+        """
+        results: Dict[str, List[Product]] = {}
+        async for name, products in self.stream(product_name, errors):
+            results.setdefault(name, []).extend(products)
+        return results
+
+    async def search(self, product_name: str) -> List[Product]:
+        """
+        Search every registered store and merge the results
+
+        Args:
+            product_name: Product to search for
+
+        Returns:
+            List of products sorted by price (cheapest first)
+        """
+        results = await self.search_stores(product_name)
+        all_products = [product for products in results.values() for product in products]
+        return sorted(all_products, key=_by_price)
+
+    def search_sync(self, product_name: str) -> List[Product]:
+        """
+        Blocking wrapper around search() for callers without an event loop
+
+        Args:
+            product_name: Product to search for
+
+        Returns:
+            List of products sorted by price (cheapest first)
+        """
+        return asyncio.run(self.search(product_name))
+
+    def iter_search(self, product_name: str) -> Iterator[Tuple[str, List[Product]]]:
+        """
+        Blocking generator over stream() for callers without an event loop
+
+        Args:
+            product_name: Product to search for
+
+        Yields:
+            (store name, products) tuples as results arrive
+        """
+        loop = asyncio.new_event_loop()
+        results = self.stream(product_name)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
@@ -0,0 +1,283 @@
+"""
+HTTP Service
+asyncio (aiohttp) server exposing the search pipeline and per-session chat agents
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from aiohttp import web
+
+import config
+from agent.store_tools import format_comparison
+from agent.matching import dedupe
+from agent.pipeline import build_engine
+from agent.ranking import TopK
+from agent.search_engine import SearchEngine
+from agent.tracing import get_tracer
+from agent.transport import get_transport
+
+
+def _create_chat_agent(engine: SearchEngine):
+    """Default session agent; LangChain is only imported once the first chat session opens"""
+    from agent.langchain_agent import MoroccoSearchAgent
+
+    return MoroccoSearchAgent(search_engine=engine)
+
+
+class _Session:
+    """One chat session: its agent, a lock serializing its turns and when it was last used"""
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class SessionStore:
+    """
+    Chat agents keyed by session id, each with its own conversation memory
+
+    Sessions idle for longer than `ttl` seconds are dropped, and when more than
+    `max_sessions` are alive the least recently used one is evicted first.
+    """
+
+    def __init__(
+        self,
+        agent_factory: Callable[[], object],
+        max_sessions: int = config.SERVICE_MAX_SESSIONS,
+        ttl: float = config.SERVICE_SESSION_TTL_SECONDS,
+    ):
+        """
+        Initialize the store
+
+        Args:
+            agent_factory: Creates the agent for a new session
+            max_sessions: Maximum sessions kept in memory
+            ttl: Seconds of inactivity after which a session is dropped
+        """
+        self.agent_factory = agent_factory
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self.evicted = 0
+
+    def _evict(self):
+        """Drop expired sessions, then the least recently used ones beyond the limit"""
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+            self.evicted += 1
+
+    async def get(self, session_id: str) -> _Session:
+        """
+        Get a session, creating its agent if needed
+
+        Args:
+            session_id: Session identifier chosen by the client
+
+        Returns:
+            The session, marked as just used
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            # Building an agent is blocking work (first LangChain import, memory)
+            agent = await asyncio.to_thread(self.agent_factory)
+            session = self._sessions.setdefault(session_id, _Session(agent))
+        session.last_used = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        self._evict()
+        return session
+
+    def drop(self, session_id: str) -> bool:
+        """Forget a session; returns whether it existed"""
+        return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SearchService:
+    """
+    State shared by every request
+
+    One SearchEngine (and through its store tools one pooled transport, rate
+    limiter set and result cache) serves all requests. Each store is searched
+    by at most `store_concurrency` requests at a time, so a burst of users
+    cannot flood a single site.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[SearchEngine] = None,
+        agent_factory: Optional[Callable[[], object]] = None,
+        store_concurrency: int = config.SERVICE_STORE_CONCURRENCY,
+        max_sessions: int = config.SERVICE_MAX_SESSIONS,
+        session_ttl: float = config.SERVICE_SESSION_TTL_SECONDS,
+    ):
+        """
+        Initialize the service
+
+        Args:
+            engine: Search engine to use (default: the direct pipeline's store tools)
+            agent_factory: Creates a chat agent per session (default: a MoroccoSearchAgent
+                whose direct lookups use this service's engine)
+            store_concurrency: Searches running at once per store, across all requests
+            max_sessions: Chat sessions kept in memory
+            session_ttl: Seconds of inactivity after which a chat session is dropped
+        """
+        self.engine = engine or build_engine(store_concurrency=store_concurrency)
+        # Session agents share the engine, so /chat lookups respect the per-store cap too
+        agent_factory = agent_factory or (lambda: _create_chat_agent(self.engine))
+        self.sessions = SessionStore(agent_factory, max_sessions, session_ttl)
+
+    async def search(self, request: web.Request) -> web.StreamResponse:
+        """
+        GET /search?q=<product>[&limit=N][&stream=1]
+
+        Returns the merged cheapest-first results as JSON, or with stream=1 (or
+        Accept: text/event-stream) one SSE "store" event per store as it answers
+        followed by a "done" event with the final ranking.
+        """
+        query = request.query.get('q', '').strip()
+        if not query:
+            return web.json_response({'error': "Missing query parameter 'q'"}, status=400)
+        try:
+            limit = int(request.query.get('limit', config.MAX_RESULTS_PER_STORE))
+        except ValueError:
+            return web.json_response({'error': "'limit' must be an integer"}, status=400)
+        if limit < 1:
+            return web.json_response({'error': "'limit' must be at least 1"}, status=400)
+
+        stream = request.query.get('stream') in ('1', 'true') or 'text/event-stream' in request.headers.get('Accept', '')
+        if not stream:
+            products = dedupe(await self.engine.search(query))
+            return web.json_response({
+                'query': query,
+                'count': len(products),
+                'products': [product.to_dict() for product in products[:limit]],
+                'report': format_comparison(products[:limit]) if products else '',
+            })
+
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+        await response.prepare(request)
+
+        ranking = TopK(limit)
+        async for store, products in self.engine.stream(query):
+            ranking.extend(products)
+            best = ranking.best
+            await _send_event(response, 'store', {
+                'store': store,
+                'products': [product.to_dict() for product in products],
+                'best': best.to_dict() if best else None,
+            })
+        await _send_event(response, 'done', {
+            'query': query,
+            'count': ranking.seen,
+            'products': [product.to_dict() for product in dedupe(ranking.items())],
+        })
+        await response.write_eof()
+        return response
+
+    async def chat(self, request: web.Request) -> web.Response:
+        """
+        POST /chat with JSON {"message": ..., "session_id": optional}
+
+        Runs one turn with the session's agent (a new session id is issued when
+        none is given) and returns its answer.
+        """
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({'error': 'Body must be JSON'}, status=400)
+        if not isinstance(body, dict):
+            return web.json_response({'error': 'Body must be a JSON object'}, status=400)
+        message = str(body.get('message', '')).strip()
+        if not message:
+            return web.json_response({'error': "Missing 'message'"}, status=400)
+        session_id = str(body.get('session_id') or uuid.uuid4().hex)
+
+        try:
+            session = await self.sessions.get(session_id)
+        except Exception as e:
+            return web.json_response({'error': f"Could not start agent: {e}"}, status=503)
+
+        # Turns of one session run in order; different sessions run in parallel
+        async with session.lock:
+            response = await asyncio.to_thread(session.agent.chat, message)
+            stats = getattr(session.agent, 'last_turn_stats', {})
+        return web.json_response({'session_id': session_id, 'response': response, 'stats': stats})
+
+    async def end_chat(self, request: web.Request) -> web.Response:
+        """DELETE /chat/{session_id}: forget a session and its memory"""
+        if not self.sessions.drop(request.match_info['session_id']):
+            return web.json_response({'error': 'Unknown session'}, status=404)
+        return web.json_response({'ok': True})
+
+    async def health(self, request: web.Request) -> web.Response:
+        """GET /health: liveness plus session counters"""
+        return web.json_response({
+            'status': 'ok',
+            'stores': list(self.engine.stores),
+            'sessions': len(self.sessions),
+            'sessions_evicted': self.sessions.evicted,
+        })
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        """GET /metrics: span latency histograms and counters in the Prometheus text format"""
+        return web.Response(text=get_tracer().metrics.render(), content_type='text/plain', charset='utf-8')
+
+
+async def _send_event(response: web.StreamResponse, event: str, data: Dict):
+    """Write one server-sent event"""
+    payload = json.dumps(data, ensure_ascii=False)
+    await response.write(f"event: {event}\ndata: {payload}\n\n".encode('utf-8'))
+
+
+def create_app(service: Optional[SearchService] = None) -> web.Application:
+    """
+    Build the aiohttp application
+
+    Args:
+        service: Shared service state (default: a new SearchService)
+
+    Returns:
+        Application with /search, /chat, /health and /metrics routes
+    """
+    service = service or SearchService()
+    app = web.Application()
+    app['service'] = service
+    app.add_routes([
+        web.get('/search', service.search),
+        web.post('/chat', service.chat),
+        web.delete('/chat/{session_id}', service.end_chat),
+        web.get('/health', service.health),
+        web.get('/metrics', service.metrics),
+    ])
+
+    async def close_transport(app):
+        get_transport().close()
+    app.on_cleanup.append(close_transport)
+    return app
+
+
+def run_service(host: str = config.SERVICE_HOST, port: int = config.SERVICE_PORT):
+    """
+    Serve the API until interrupted
+
+    Args:
+        host: Interface to listen on
+        port: TCP port
+    """
+    web.run_app(create_app(), host=host, port=port)
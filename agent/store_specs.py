@@ -0,0 +1,205 @@
+"""
+Store Specs
+Declarative per-store scraping specs compiled once into fast product extractors
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote_plus, urljoin
+
+import config
+from agent.models import Product
+from agent.parsers import ParserBackend
+from agent.tracing import get_tracer
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """Where to read one product field inside a product card"""
+
+    selector: Optional[str]          # CSS selector inside the card, None for the card itself
+    attr: Optional[str] = None       # Attribute to read instead of the element text
+    absolute: bool = False           # Resolve the value against the store's base URL
+
+    @classmethod
+    def from_config(cls, entry) -> "FieldSpec":
+        """Build a field spec from a selector string or a dictionary"""
+        if entry is None or isinstance(entry, str):
+            return cls(selector=entry)
+        return cls(selector=entry.get('selector'), attr=entry.get('attr'), absolute=entry.get('absolute', False))
+
+
+@dataclass(frozen=True)
+class StoreSpec:
+    """Everything needed to search one store and extract its product cards"""
+
+    key: str
+    name: str
+    base_url: str
+    search_url: str
+    item_selector: str
+    fields: Dict[str, FieldSpec]
+    currency: str = config.DEFAULT_CURRENCY
+    availability: str = 'Check Store'
+    thousands_separator: str = ','
+    decimal_separator: str = '.'
+
+    @classmethod
+    def from_config(cls, key: str, entry: Dict) -> "StoreSpec":
+        """
+        Build a spec from a config.STORE_SPECS entry
+
+        Args:
+            key: Store key in config.STORE_SPECS
+            entry: Spec dictionary
+
+        Returns:
+            StoreSpec instance
+        """
+        price_rules = entry.get('price', {})
+        return cls(
+            key=key,
+            name=entry['name'],
+            base_url=entry['base_url'],
+            search_url=entry['search_url'],
+            item_selector=entry['item'],
+            fields={name: FieldSpec.from_config(value) for name, value in entry['fields'].items()},
+            currency=entry.get('currency', config.DEFAULT_CURRENCY),
+            availability=entry.get('availability', 'Check Store'),
+            thousands_separator=price_rules.get('thousands', ','),
+            decimal_separator=price_rules.get('decimal', '.'),
+        )
+
+    @property
+    def paginated(self) -> bool:
+        """Whether the search URL template has a {page} placeholder"""
+        return '{page}' in self.search_url
+
+    def url_for(self, product_name: str, page: int = 1) -> str:
+        """Build the search results URL for a product and results page"""
+        return self.search_url.format(base_url=self.base_url, query=quote_plus(product_name), page=page)
+
+
+class CompiledExtractor:
+    """
+    Product extractor compiled from a StoreSpec for one parser backend
+
+    Field lookups are resolved to bound backend methods and the price-cleaning
+    rules to a precompiled regex and translation table, so extracting a card is
+    a flat loop with no per-card configuration work.
+    """
+
+    def __init__(self, spec: StoreSpec, parser: ParserBackend):
+        self.spec = spec
+        self.parser = parser
+
+        thousands = re.escape(spec.thousands_separator)
+        decimal = re.escape(spec.decimal_separator)
+        self._price_pattern = re.compile(rf'\d[\d{thousands}{decimal}]*')
+        self._price_table = str.maketrans({spec.thousands_separator: None, spec.decimal_separator: '.'})
+
+        self._getters: List[Tuple[str, Callable]] = [
+            (name, self._compile_field(field_spec)) for name, field_spec in spec.fields.items()
+        ]
+
+    def _compile_field(self, field_spec: FieldSpec) -> Callable:
+        """Turn a field spec into a function reading that field from a card"""
+        selector, attr = field_spec.selector, field_spec.attr
+        if not attr:
+            read_text = self.parser.text
+            return lambda node: read_text(node, selector)
+
+        read_attr = self.parser.attr
+        if not field_spec.absolute:
+            return lambda node: read_attr(node, selector, attr)
+
+        base_url = self.spec.base_url
+
+        def read_absolute(node):
+            value = read_attr(node, selector, attr)
+            return urljoin(base_url, value) if value else value
+        return read_absolute
+
+    def parse_price(self, price_text: str) -> float:
+        """Extract the numeric price from text using the store's separators"""
+        match = self._price_pattern.search(price_text)
+        if not match:
+            return 0.0
+        try:
+            return float(match.group().translate(self._price_table).rstrip('.'))
+        except ValueError:
+            return 0.0
+
+    def extract(self, content: bytes, limit: Optional[int] = None) -> List[Product]:
+        """
+        Extract products from a results page
+
+        Args:
+            content: Raw page body
+            limit: Maximum products to return (default: all cards on the page)
+
+        Returns:
+            List of products
+        """
+        spec = self.spec
+        products = []
+        tracer = get_tracer()
+
+        with tracer.child('parse', backend=self.parser.name, bytes=len(content)):
+            items = self.parser.select_items(content, spec.item_selector)
+
+        with tracer.child('extract', cards=len(items)):
+            for item in items:
+                if limit is not None and len(products) >= limit:
+                    break
+                try:
+                    values = {name: getter(item) for name, getter in self._getters}
+                    if not (values.get('name') and values.get('price')):
+                        continue
+                    products.append(Product(
+                        name=values['name'],
+                        price=self.parse_price(values['price']),
+                        currency=spec.currency,
+                        store=spec.name,
+                        url=values.get('url') or '',
+                        availability=values.get('availability') or spec.availability,
+                    ))
+                except Exception as e:
+                    print(f"Error parsing product: {e}")
+                    continue
+
+        return products
+
+
+_compiled: Dict[Tuple[str, str], CompiledExtractor] = {}
+
+
+def compile_spec(spec: StoreSpec, parser: ParserBackend) -> CompiledExtractor:
+    """
+    Get the compiled extractor for a spec and parser backend, compiling it once
+
+    Args:
+        spec: Store spec
+        parser: Parser backend
+
+    Returns:
+        CompiledExtractor shared by every scraper using this spec and backend
+    """
+    cache_key = (spec.key, parser.name)
+    extractor = _compiled.get(cache_key)
+    if extractor is None or extractor.spec is not spec:
+        extractor = _compiled[cache_key] = CompiledExtractor(spec, parser)
+    return extractor
+
+
+@lru_cache(maxsize=None)
+def load_store_specs() -> Dict[str, StoreSpec]:
+    """
+    Load every store declared in config.STORE_SPECS (parsed once per process)
+
+    Returns:
+        Dictionary mapping store key to StoreSpec
+    """
+    return {key: StoreSpec.from_config(key, entry) for key, entry in config.STORE_SPECS.items()}
@@ -0,0 +1,161 @@
+"""
+Store Search Functions
+The store searches and price comparison behind the LangChain tools, importable without LangChain
+"""
+
+from typing import List, Union
+import re
+
+from agent.matching import dedupe, get_matcher
+from agent.models import Product, products_to_json
+from agent.resultset import ResultSet
+from agent.scrapers import get_scrapers
+from agent.tracing import get_tracer
+
+# Stores with a tool of their own; every other store in config.STORE_SPECS is
+# searched by search_other_morocco_stores
+_DEDICATED_STORES = ("jumia", "marjane")
+
+
+def search_jumia_morocco(product_name: str) -> str:
+    """
+    Search for products on Jumia Morocco e-commerce site.
+    Use this tool when you need to find products and their prices on Jumia.
+    
+    Args:
+        product_name: The name of the product to search for
+        
+    Returns:
+        JSON string with list of products found
+    """
+    try:
+        return products_to_json(get_scrapers()["jumia"].search(product_name))
+    except Exception as e:
+        return f"Error searching Jumia: {str(e)}"
+
+
+def search_marjane_online(product_name: str) -> str:
+    """
+    Search for products on Marjane online store.
+    Use this tool when you need to find products and their prices on Marjane.
+    
+    Args:
+        product_name: The name of the product to search for
+        
+    Returns:
+        JSON string with list of products found
+    """
+    try:
+        return products_to_json(get_scrapers()["marjane"].search(product_name))
+    except Exception as e:
+        return f"Error searching Marjane: {str(e)}"
+
+
+def search_other_morocco_stores(product_name: str) -> str:
+    """
+    Search for products on other Moroccan e-commerce stores (Electroplanet, Aswak Assalam, etc).
+    Use this tool to get additional price comparisons from other stores.
+    
+    Args:
+        product_name: The name of the product to search for
+        
+    Returns:
+        JSON string with list of products found
+    """
+    try:
+        products = [
+            product
+            for key, scraper in get_scrapers().items() if key not in _DEDICATED_STORES
+            for product in scraper.search(product_name)
+        ]
+        return products_to_json(products)
+    except Exception as e:
+        return f"Error searching other stores: {str(e)}"
+
+
+def format_comparison(products: Union[List[Product], ResultSet]) -> str:
+    """
+    Build the cheapest-first price comparison report
+    
+    Args:
+        products: Products or a ResultSet to compare
+        
+    Returns:
+        Formatted comparison report with products sorted by price
+    """
+    with get_tracer().span('compare', products=len(products)):
+        return _format_comparison(products)
+
+
+def _format_comparison(products: Union[List[Product], ResultSet]) -> str:
+    # Drop repeated listings, then sort by price
+    results = products if isinstance(products, ResultSet) else ResultSet(dedupe(products))
+    sorted_products = results.sort()
+    
+    # Format output
+    result = f"\n{'='*80}\n"
+    result += f"PRICE COMPARISON - {len(sorted_products)} Products Found\n"
+    result += f"Sorted from CHEAPEST to MOST EXPENSIVE\n"
+    result += f"{'='*80}\n\n"
+    
+    for idx, product in enumerate(sorted_products, 1):
+        result += f"#{idx} - {product.price:.2f} {product.currency}\n"
+        result += f"   Product: {product.name}\n"
+        result += f"   Store: {product.store}\n"
+        result += f"   Availability: {product.availability}\n"
+        result += f"   URL: {product.url}\n"
+        result += f"{'-'*80}\n"
+    
+    # Price spread per store, when there is more than one store to compare
+    store_stats = results.store_stats()
+    if len(store_stats) >= 2:
+        result += "\nBY STORE (min / median / max):\n"
+        for store, stats in sorted(store_stats.items(), key=lambda item: item[1]['min']):
+            result += (
+                f"   {store}: {stats['count']} offers, {stats['min']:.2f} / "
+                f"{stats['median']:.2f} / {stats['max']:.2f} MAD\n"
+            )
+    
+    # Best price for each product sold by more than one store
+    matched = [
+        stats for stats in results.group_stats(labels=get_matcher().labels(list(results))).values()
+        if stats['stores'] >= 2
+    ]
+    if matched:
+        result += "\nSAME PRODUCT ACROSS STORES (best price per product):\n"
+        for stats in matched[:10]:
+            best = stats['cheapest']
+            result += (
+                f"   {best.name}: {stats['min']:.2f} {best.currency} at {best.store} "
+                f"({stats['count']} offers in {stats['stores']} stores, save up to {stats['savings']:.2f})\n"
+            )
+    
+    # Calculate savings
+    if len(sorted_products) >= 2:
+        savings = results.savings()
+        
+        result += f"\n💰 SAVINGS: Choose the cheapest option and save {savings['savings']:.2f} MAD "
+        result += f"({savings['percentage']:.1f}% less than the most expensive)\n"
+    
+    return result
+
+
+_REPORT_ENTRY = re.compile(
+    r"#\d+ - ([\d.]+) (\S+)\n\s+Product: (.*)\n\s+Store: (.*)\n\s+Availability: (.*)\n\s+URL: (.*)"
+)
+
+
+def parse_comparison_report(report: str) -> List[Product]:
+    """
+    Read the products back out of a format_comparison report
+    
+    Args:
+        report: Price comparison report text
+        
+    Returns:
+        Products listed in the report (empty if it is not a report)
+    """
+    return [
+        Product(name.strip(), float(price), currency, store.strip(), url.strip(), availability.strip())
+        for price, currency, name, store, availability, url in _REPORT_ENTRY.findall(report)
+    ]
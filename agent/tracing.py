@@ -0,0 +1,354 @@
+"""
+Tracing and Metrics
+Per-stage timing spans exported as sampled JSONL traces and Prometheus-style metrics
+"""
+
+import contextvars
+import functools
+import json
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import config
+
+_current: contextvars.ContextVar = contextvars.ContextVar('trace_span', default=None)
+
+# Histogram bucket upper bounds in seconds
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_MAX_SPANS_PER_TRACE = 2000
+
+
+class _Trace:
+    """Spans of one root operation, exported together when the root ends"""
+
+    __slots__ = ('trace_id', 'sampled', 'spans', 'lock')
+
+    def __init__(self, sampled: bool):
+        self.trace_id = uuid.uuid4().hex
+        self.sampled = sampled
+        self.spans: List[Dict] = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    """
+    One timed stage of a request
+
+    The `store` label is inherited from the parent span, so fetch and parse
+    spans under a store search are attributed to that store in the metrics.
+    """
+
+    __slots__ = ('name', 'trace', 'span_id', 'parent', 'store', 'attributes', 'phases', 'start', 'wall_start',
+                 'duration', 'error')
+
+    def __init__(self, name: str, trace: _Trace, parent: Optional['Span'], attributes: Dict):
+        self.name = name
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.store = attributes.pop('store', None) or (parent.store if parent else '')
+        self.attributes = attributes
+        self.phases: Dict[str, float] = {}
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attributes):
+        """Attach attributes to the span"""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent.span_id if self.parent else None,
+            'name': self.name,
+            'store': self.store,
+            'start': round(self.wall_start, 6),
+            'duration_ms': round((self.duration or 0.0) * 1000, 3),
+            'error': self.error,
+            'attributes': self.attributes,
+        }
+
+
+class Metrics:
+    """
+    In-process metrics rendered in the Prometheus text format
+
+    Every finished span feeds a latency histogram labelled by span name and
+    store, sampled or not, so the metrics stay complete while traces are cut
+    down by sampling.
+    """
+
+    def __init__(self, prefix: str = 'morocco_search'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], List] = {}
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+
+    def observe(self, name: str, store: str, seconds: float):
+        """Record one span duration"""
+        with self._lock:
+            histogram = self._histograms.get((name, store))
+            if histogram is None:
+                histogram = self._histograms[(name, store)] = [[0] * (len(_BUCKETS) + 1), 0.0, 0]
+            histogram[0][bisect_left(_BUCKETS, seconds)] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """Add to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        metric = f"{self.prefix}_span_seconds"
+        lines = [f"# HELP {metric} Duration of traced pipeline stages", f"# TYPE {metric} histogram"]
+        with self._lock:
+            for (name, store), (buckets, total, count) in sorted(self._histograms.items()):
+                labels = f'span="{name}",store="{_escape(store)}"'
+                cumulative = 0
+                for bound, hits in zip(_BUCKETS + (float('inf'),), buckets):
+                    cumulative += hits
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{metric}_sum{{{labels}}} {total}")
+                lines.append(f"{metric}_count{{{labels}}} {count}")
+
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                counter = f"{self.prefix}_{name}_total"
+                if counter not in typed:
+                    lines.append(f"# TYPE {counter} counter")
+                    typed.add(counter)
+                rendered = ','.join(f'{key}="{_escape(str(label))}"' for key, label in labels)
+                lines.append(f"{counter}{{{rendered}}} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class JsonlExporter:
+    """Appends finished traces to a file, one span per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict]):
+        lines = ''.join(json.dumps(span, ensure_ascii=False, default=str) + '\n' for span in spans)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+
+class Tracer:
+    """
+    Creates spans, feeds the metrics and exports sampled traces
+
+    The sampling decision is made once per trace, at its root span. Traces
+    whose root takes longer than `slow_seconds` are exported even when not
+    sampled, so slow queries can always be broken down afterwards.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = config.TRACING_ENABLED,
+        sample_rate: float = config.TRACE_SAMPLE_RATE,
+        slow_seconds: Optional[float] = config.TRACE_SLOW_SECONDS,
+        exporter: Optional[JsonlExporter] = None,
+    ):
+        """
+        Initialize the tracer
+
+        Args:
+            enabled: Record spans at all (False makes every span a no-op)
+            sample_rate: Fraction of traces exported, between 0 and 1
+            slow_seconds: Always export traces whose root takes at least this long
+            exporter: Where exported traces are written (None = metrics only)
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.exporter = exporter
+        self.metrics = Metrics()
+        self.exported = 0
+
+    def _start(self, name: str, attributes: Dict) -> Span:
+        parent = _current.get()
+        trace = parent.trace if parent else _Trace(random.random() < self.sample_rate)
+        return Span(name, trace, parent, attributes)
+
+    def _finish(self, span: Span):
+        span.duration = time.perf_counter() - span.start
+        self.metrics.observe(span.name, span.store, span.duration)
+        if span.error:
+            self.metrics.inc('span_errors', span=span.name)
+
+        if self.exporter is None:
+            return
+        trace = span.trace
+        with trace.lock:
+            if len(trace.spans) < _MAX_SPANS_PER_TRACE:
+                trace.spans.append(span.to_dict())
+        if span.parent is not None:
+            return
+        slow = self.slow_seconds is not None and span.duration >= self.slow_seconds
+        if trace.sampled or slow:
+            with trace.lock:
+                spans, trace.spans = trace.spans, []
+            self.exporter.export(spans)
+            self.exported += 1
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """
+        Time a block as a span, starting a new trace when none is active
+
+        Yields:
+            The span (None when tracing is disabled)
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = self._start(name, attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            self._finish(span)
+
+    @contextmanager
+    def child(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """Like span(), but only inside an active trace (a no-op otherwise)"""
+        if _current.get() is None:
+            yield None
+            return
+        with self.span(name, **attributes) as span:
+            yield span
+
+    def start_span(self, name: str, **attributes) -> Optional[Span]:
+        """
+        Start a span without making it current, for code that cannot use a with-block
+
+        Run work under it with `run_in(span, ...)` and end it with `end_span`.
+        """
+        return self._start(name, attributes) if self.enabled else None
+
+    def end_span(self, span: Optional[Span]):
+        if span is not None:
+            self._finish(span)
+
+    def record(self, name: str, seconds: float, parent: Optional[Span] = None, **attributes):
+        """
+        Record a stage measured elsewhere as a finished child span
+
+        Outside any trace the duration still goes to the metrics.
+
+        Args:
+            name: Span name
+            seconds: Duration of the stage
+            parent: Parent span (default: the current span)
+            **attributes: Span attributes
+        """
+        if not self.enabled:
+            return
+        parent = parent or _current.get()
+        if parent is None:
+            self.metrics.observe(name, attributes.get('store') or '', seconds)
+            return
+        parent.phases[name] = parent.phases.get(name, 0.0) + seconds
+        span = Span(name, parent.trace, parent, attributes)
+        span.start -= seconds
+        span.wall_start -= seconds
+        self._finish(span)
+
+
+def current_span() -> Optional[Span]:
+    """The span active in this thread or task"""
+    return _current.get()
+
+
+def run_in(span: Optional[Span], fn, *args):
+    """Call fn with `span` as the current span, e.g. to create tasks that inherit it"""
+    context = contextvars.copy_context()
+    if span is not None:
+        context.run(_current.set, span)
+    return context.run(fn, *args)
+
+
+def bind_context(fn):
+    """
+    Wrap fn to run in a copy of the caller's context, so work handed to a thread
+    pool stays inside the caller's span (call the wrapper once)
+    """
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    Get the process-wide tracer
+
+    Returns:
+        Tracer configured from config.TRACING_ENABLED, TRACE_SAMPLE_RATE,
+        TRACE_SLOW_SECONDS and TRACE_PATH
+    """
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                exporter = JsonlExporter(config.TRACE_PATH) if config.TRACE_PATH else None
+                _tracer = Tracer(exporter=exporter)
+    return _tracer
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = get_tracer().metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = config.METRICS_PORT, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics in a background thread
+
+    Args:
+        port: TCP port
+        host: Interface to listen on
+
+    Returns:
+        The running server (call shutdown() to stop it)
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics').start()
+    return server
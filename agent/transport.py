@@ -0,0 +1,253 @@
+"""
+HTTP Transport
+Shared, connection-pooled HTTP client used by every scraper
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import config
+from agent.tracing import current_span, get_tracer
+
+try:  # Brotli decoding is only advertised when a decoder is installed
+    import brotli  # noqa: F401
+    _BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _BROTLI = True
+    except ImportError:
+        _BROTLI = False
+
+try:  # HTTP/2 needs httpx with the h2 extra
+    import httpx
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+
+ACCEPT_ENCODING = "gzip, deflate, br" if _BROTLI else "gzip, deflate"
+
+
+# urllib3 connections that report their setup time to the current tracing span.
+# DNS resolution happens inside the socket connect, so "connect" includes it.
+class _TracedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            get_tracer().record('connect', time.perf_counter() - start, host=self.host)
+
+
+class _TracedHTTPSConnection(HTTPSConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._connect_seconds = time.perf_counter() - start
+            get_tracer().record('connect', self._connect_seconds, host=self.host)
+
+    def connect(self):
+        self._connect_seconds = 0.0
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            get_tracer().record('tls', time.perf_counter() - start - self._connect_seconds, host=self.host)
+
+
+class _TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TracedHTTPConnection
+
+
+class _TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TracedHTTPSConnection
+
+
+class _TracedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections record connect and TLS handshake spans"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TracedHTTPConnectionPool,
+            'https': _TracedHTTPSConnectionPool,
+        }
+
+
+# httpcore trace events mapped to span names
+_HTTPX_PHASES = {
+    'connection.connect_tcp': 'connect',
+    'connection.start_tls': 'tls',
+    'http11.receive_response_headers': 'ttfb',
+    'http2.receive_response_headers': 'ttfb',
+    'http11.receive_response_body': 'download',
+    'http2.receive_response_body': 'download',
+}
+
+
+class HttpTransport:
+    """
+    Keep-alive HTTP client shared by all scrapers
+
+    Connections are pooled per host, so repeated requests to the same store reuse
+    an open TCP/TLS connection instead of handshaking again. Responses are gzip
+    (and brotli, when available) decoded transparently. When httpx and h2 are
+    installed, HTTP/2 is negotiated with servers that support it.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = config.HTTP_POOL_CONNECTIONS,
+        pool_maxsize: int = config.HTTP_POOL_MAXSIZE,
+        http2: bool = config.HTTP2_ENABLED,
+    ):
+        """
+        Initialize the transport
+
+        Args:
+            pool_connections: Number of per-host connection pools to keep
+            pool_maxsize: Maximum open connections kept alive per host
+            http2: Use HTTP/2 when httpx and h2 are installed
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.http2 = http2 and _HTTP2
+        self.default_headers = {
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive',
+        }
+
+        if self.http2:
+            self._client = httpx.Client(
+                http2=True,
+                follow_redirects=True,
+                headers=self.default_headers,
+                limits=httpx.Limits(
+                    max_connections=pool_connections * pool_maxsize,
+                    max_keepalive_connections=pool_connections * pool_maxsize,
+                ),
+            )
+        else:
+            self._client = requests.Session()
+            self._client.headers.update(self.default_headers)
+            adapter = _TracedAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=False,
+            )
+            self._client.mount('http://', adapter)
+            self._client.mount('https://', adapter)
+
+    def get(self, url: str, headers: Optional[Dict] = None, timeout: Optional[float] = None):
+        """
+        Fetch a URL over a pooled connection
+
+        Args:
+            url: URL to fetch
+            headers: Extra request headers
+            timeout: Timeout in seconds
+
+        Returns:
+            Response object with content, status_code and headers
+
+        Raises:
+            requests.Timeout: When the request timed out
+            requests.ConnectionError: When no connection could be made
+            requests.RequestException: On other transport errors and 4xx/5xx responses
+        """
+        if not self.http2:
+            response = self._get_requests(url, headers, timeout)
+        else:
+            try:
+                response = self._get_httpx(url, headers, timeout)
+            except httpx.TimeoutException as e:
+                # Keep the requests exception types for callers regardless of backend
+                raise requests.Timeout(str(e)) from e
+            except httpx.ConnectError as e:
+                raise requests.ConnectionError(str(e)) from e
+            except httpx.HTTPError as e:
+                raise requests.RequestException(str(e)) from e
+
+        if response.status_code >= 400:
+            raise requests.HTTPError(f"{response.status_code} error for url: {url}", response=response)
+        return response
+
+    def _get_requests(self, url: str, headers: Optional[Dict], timeout: Optional[float]):
+        """
+        GET with requests, splitting the time into ttfb and download spans
+
+        ttfb runs from sending the request to receiving the response headers,
+        minus any connect/TLS time the connection classes recorded meanwhile.
+        """
+        span = current_span()
+        if span is None:
+            return self._client.get(url, headers=headers, timeout=timeout)
+
+        setup_before = span.phases.get('connect', 0.0) + span.phases.get('tls', 0.0)
+        start = time.perf_counter()
+        response = self._client.get(url, headers=headers, timeout=timeout, stream=True)
+        headers_received = time.perf_counter()
+        setup = span.phases.get('connect', 0.0) + span.phases.get('tls', 0.0) - setup_before
+        tracer = get_tracer()
+        tracer.record('ttfb', headers_received - start - setup)
+        try:
+            body = response.content  # Reads the body and returns the connection to the pool
+        finally:
+            response.close()
+        tracer.record('download', time.perf_counter() - headers_received, bytes=len(body))
+        return response
+
+    def _get_httpx(self, url: str, headers: Optional[Dict], timeout: Optional[float]):
+        """GET with httpx, turning httpcore trace events into connect/tls/ttfb/download spans"""
+        span = current_span()
+        if span is None:
+            return self._client.get(url, headers=headers, timeout=timeout)
+
+        tracer = get_tracer()
+        started: Dict[str, float] = {}
+
+        def trace(event: str, info: Dict):
+            phase, _, stage = event.rpartition('.')
+            name = _HTTPX_PHASES.get(phase)
+            if name is None:
+                return
+            if stage == 'started':
+                started[phase] = time.perf_counter()
+            elif stage in ('complete', 'failed') and phase in started:
+                tracer.record(name, time.perf_counter() - started.pop(phase), parent=span)
+
+        return self._client.get(url, headers=headers, timeout=timeout, extensions={'trace': trace})
+
+    def close(self):
+        """Close all pooled connections"""
+        self._client.close()
+
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """
+    Get the process-wide shared transport
+
+    Returns:
+        The shared HttpTransport instance
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HttpTransport()
+    return _transport
+
@@ -2,15 +2,18 @@
 Utility functions for the product search agent
 """
 
-from typing import List, Dict
+from typing import List, Dict, Union
 
+from agent.models import Product
+from agent.resultset import ResultSet
 
-def display_results(products: List[Dict]):
+
+def display_results(products: Union[List[Product], ResultSet]):
     """
     Display search results in a formatted table
     
     Args:
-        products: List of product dictionaries
+        products: List of products or a ResultSet, already in display order
     """
     if not products:
         print("No products to display.")
@@ -21,16 +24,35 @@ def display_results(products: List[Dict]):
     print(f"{'=' * 100}\n")
     
     for idx, product in enumerate(products, 1):
-        price_str = f"{product['price']:.2f} {product.get('currency', 'MAD')}"
+        price_str = f"{product.price:.2f} {product.currency}"
         print(f"#{idx}")
-        print(f"  Product:      {product['name']}")
+        print(f"  Product:      {product.name}")
         print(f"  Price:        {price_str}")
-        print(f"  Store:        {product.get('store', 'Unknown')}")
-        print(f"  Availability: {product.get('availability', 'Unknown')}")
-        print(f"  URL:          {product.get('url', 'N/A')}")
+        print(f"  Store:        {product.store}")
+        print(f"  Availability: {product.availability}")
+        print(f"  URL:          {product.url or 'N/A'}")
         print(f"{'-' * 100}")
 
 
+def display_progress(store: str, new_products: List[Product], ranking):
+    """
+    Print a one-line update after a store answers during a live search
+    
+    Args:
+        store: Store that just answered
+        new_products: Products that store returned
+        ranking: agent.ranking.TopK holding the cheapest products so far
+    """
+    best = ranking.best
+    if best is None:
+        print(f"  ✓ {store}: {len(new_products)} products - no prices yet")
+        return
+    print(
+        f"  ✓ {store}: {len(new_products)} products - best so far "
+        f"{format_price(best.price, best.currency)} at {best.store}"
+    )
+
+
 def format_price(price: float, currency: str = "MAD") -> str:
     """
     Format price with currency
@@ -45,27 +67,14 @@ def format_price(price: float, currency: str = "MAD") -> str:
     return f"{price:.2f} {currency}"
 
 
-def calculate_savings(products: List[Dict]) -> Dict:
+def calculate_savings(products: Union[List[Product], ResultSet]) -> Dict:
     """
     Calculate potential savings by choosing cheapest option
     
     Args:
-        products: List of product dictionaries
+        products: List of products or a ResultSet, in any order
         
     Returns:
         Dictionary with savings information
     """
-    if len(products) < 2:
-        return {'savings': 0, 'percentage': 0}
-    
-    cheapest = products[0]['price']
-    most_expensive = products[-1]['price']
-    savings = most_expensive - cheapest
-    percentage = (savings / most_expensive) * 100 if most_expensive > 0 else 0
-    
-    return {
-        'savings': savings,
-        'percentage': percentage,
-        'cheapest_price': cheapest,
-        'most_expensive_price': most_expensive
-    }
+    return ResultSet.of(products).savings()
@@ -0,0 +1,442 @@
+"""
+Price Watch
+Re-runs watched searches on a jittered schedule and reports price drops and stock changes
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import random
+import sys
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, TextIO, Tuple
+
+import config
+from agent.batch import read_queries
+from agent.models import Product
+from agent.price_history import PriceHistory, get_price_history
+from agent.product_searcher import ProductSearchAgent
+from agent.resultset import is_in_stock
+
+PRICE_DROP = 'price_drop'
+STOCK_CHANGE = 'stock_change'
+
+def offer_key(product: Product) -> str:
+    """Identity of an offer within one store's results: its URL, or its name when it has none"""
+    return product.url or product.name
+
+
+def fingerprint(product: Product) -> int:
+    """Checksum of everything a product card shows; stable across runs, so snapshots can be saved"""
+    card = f"{product.url}\x1f{product.name}\x1f{product.price!r}\x1f{product.currency}\x1f{product.availability}"
+    return zlib.crc32(card.encode('utf-8'))
+
+
+def _digest(fingerprints) -> int:
+    """Order-independent checksum of a store's whole result list"""
+    return zlib.crc32(b''.join(fp.to_bytes(4, 'little') for fp in sorted(fingerprints)))
+
+
+class _StoreSnapshot:
+    """Last results of one store for one query: offer key -> (fingerprint, price, availability)"""
+
+    __slots__ = ('digest', 'offers')
+
+    def __init__(self, digest: int, offers: Dict[str, Tuple[int, float, str]]):
+        self.digest = digest
+        self.offers = offers
+
+
+@dataclass(frozen=True)
+class WatchEvent:
+    """A price drop or stock change of one offer"""
+
+    kind: str
+    query: str
+    store: str
+    name: str
+    url: str
+    currency: str
+    old_price: float
+    new_price: float
+    old_availability: str
+    new_availability: str
+    at: float
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def describe(self) -> str:
+        """One-line summary for the terminal"""
+        if self.kind == PRICE_DROP:
+            drop = self.old_price - self.new_price
+            return (f"📉 {self.name} at {self.store}: {self.old_price:.2f} -> {self.new_price:.2f} {self.currency} "
+                    f"(-{drop:.2f}, {drop / self.old_price:.0%})")
+        mark = "✅" if is_in_stock(self.new_availability) else "⛔"
+        return f"{mark} {self.name} at {self.store}: {self.old_availability} -> {self.new_availability}"
+
+
+def _write_json(path: str, data: Dict):
+    """Write JSON to a file, replacing it atomically"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+class PriceWatcher:
+    """
+    Watches many queries from a single event loop
+
+    Due checks sit in a heap ordered by time, so the scheduler only ever looks
+    at the next one, and each query is checked again after `interval` seconds
+    stretched or shrunk at random by up to `jitter`, which keeps thousands of
+    queries from hitting the stores in lockstep. At most `concurrency` checks
+    run at once.
+
+    Every check compares each store's results with the query's snapshot. A
+    checksum of the whole result list skips stores where nothing changed; for
+    the others only the offers whose card fingerprint differs are looked at,
+    and those produce the events (and, with a price history, the only rows
+    written). A store that returns nothing keeps its old snapshot, since a
+    failed or empty answer is not the same as every offer disappearing.
+
+    Checks bypass the result cache, whose TTL is as long as a watch interval,
+    and with a `snapshot_path` the snapshots are saved after every check.
+    """
+
+    def __init__(
+        self,
+        searcher: Optional[ProductSearchAgent] = None,
+        interval: float = config.WATCH_INTERVAL_SECONDS,
+        jitter: float = config.WATCH_JITTER,
+        min_drop: float = config.WATCH_MIN_DROP,
+        concurrency: Optional[int] = None,
+        on_event: Optional[Callable[[WatchEvent], None]] = None,
+        history: Optional[PriceHistory] = None,
+        snapshot_path: Optional[str] = None,
+    ):
+        """
+        Initialize the watcher
+
+        Args:
+            searcher: Product search agent whose stores are watched (default: a new
+                one that skips the result cache)
+            interval: Seconds between two checks of the same query
+            jitter: Random fraction by which each interval may be stretched or shrunk
+            min_drop: Smallest relative price drop reported (0.01 = 1%)
+            concurrency: Checks running at once (default: enough to keep the
+                shared store-search worker threads busy without queueing)
+            on_event: Called in the event loop with each event; keep it quick
+            history: Price history receiving new and changed offers (None = don't record)
+            snapshot_path: JSON file the snapshots are saved to after each check (None = don't save)
+        """
+        self.searcher = searcher or ProductSearchAgent(use_cache=False)
+        self.engine = self.searcher.engine
+        self.interval = interval
+        self.jitter = jitter
+        self.min_drop = min_drop
+        self.concurrency = concurrency or max(1, config.SEARCH_WORKERS // max(1, len(self.engine.stores)))
+        self.on_event = on_event
+        self.history = history
+        self.snapshot_path = snapshot_path
+
+        self._snapshots: Dict[str, Dict[str, _StoreSnapshot]] = {}
+        self._due: Dict[str, float] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._saver: Optional[asyncio.Task] = None
+        self._unsaved = False
+        self.stats = {'checks': 0, 'errors': 0, 'unchanged_stores': 0, 'changed_offers': 0, 'events': 0}
+
+    @property
+    def queries(self) -> List[str]:
+        """Queries being watched"""
+        return list(self._due)
+
+    def watch(self, query: str, delay: Optional[float] = None):
+        """
+        Start watching a query
+
+        Args:
+            query: Product to search for
+            delay: Seconds until its first check (default: random within the
+                jitter window, so a large watch list does not start all at once)
+        """
+        query = query.strip()
+        if not query or query in self._due:
+            return
+        if delay is None:
+            delay = random.uniform(0, self.interval * self.jitter)
+        self._snapshots.setdefault(query, {})
+        self._schedule(query, time.monotonic() + delay)
+
+    def unwatch(self, query: str):
+        """Stop watching a query and forget its snapshot"""
+        # Its heap entry is skipped when it comes up
+        self._due.pop(query, None)
+        self._snapshots.pop(query, None)
+
+    def _schedule(self, query: str, due: float):
+        self._due[query] = due
+        heapq.heappush(self._heap, (due, next(self._counter), query))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _next_interval(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def check(self, query: str) -> List[WatchEvent]:
+        """
+        Search a query now and compare the results with its snapshot
+
+        The first check of a query only records the snapshot.
+
+        Args:
+            query: Product to search for
+
+        Returns:
+            Events produced by this check
+        """
+        by_store = await self.engine.search_stores(query)
+        now = time.time()
+        snapshots = self._snapshots.setdefault(query, {})
+        events: List[WatchEvent] = []
+        changed: List[Product] = []
+        for store, products in by_store.items():
+            if products:
+                self._diff(query, store, products, snapshots, now, events, changed)
+
+        self.stats['checks'] += 1
+        self.stats['changed_offers'] += len(changed)
+        self.stats['events'] += len(events)
+        if changed and self.history is not None:
+            await asyncio.to_thread(self.history.record_search, query, changed)
+        if self.on_event is not None:
+            for event in events:
+                self.on_event(event)
+        return events
+
+    def _diff(
+        self,
+        query: str,
+        store: str,
+        products: List[Product],
+        snapshots: Dict[str, _StoreSnapshot],
+        now: float,
+        events: List[WatchEvent],
+        changed: List[Product],
+    ):
+        """Update one store's snapshot, appending events and new or changed offers"""
+        fingerprints = [fingerprint(product) for product in products]
+        digest = _digest(fingerprints)
+        previous = snapshots.get(store)
+        if previous is not None and previous.digest == digest:
+            self.stats['unchanged_stores'] += 1
+            return
+
+        old_offers = previous.offers if previous is not None else {}
+        offers = {}
+        for product, fp in zip(products, fingerprints):
+            key = offer_key(product)
+            offers[key] = (fp, product.price, product.availability)
+            old = old_offers.get(key)
+            if old is not None and old[0] == fp:
+                continue
+            changed.append(product)
+            if old is None:
+                continue
+
+            _, old_price, old_availability = old
+            if product.price < old_price * (1 - self.min_drop):
+                events.append(self._event(PRICE_DROP, query, product, old_price, old_availability, now))
+            if is_in_stock(product.availability) != is_in_stock(old_availability):
+                events.append(self._event(STOCK_CHANGE, query, product, old_price, old_availability, now))
+        snapshots[store] = _StoreSnapshot(digest, offers)
+
+    @staticmethod
+    def _event(kind: str, query: str, product: Product, old_price: float, old_availability: str,
+               now: float) -> WatchEvent:
+        return WatchEvent(
+            kind, query, product.store, product.name, product.url, product.currency,
+            old_price, product.price, old_availability, product.availability, now,
+        )
+
+    async def _run_check(self, query: str, semaphore: asyncio.Semaphore):
+        try:
+            await self.check(query)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"  ✗ Watch check failed for '{query}': {e}", file=sys.stderr)
+        else:
+            self._save_soon()
+        finally:
+            semaphore.release()
+            if query in self._due:
+                self._schedule(query, time.monotonic() + self._next_interval())
+
+    def _save_soon(self):
+        """Save the snapshots in the background; checks finishing during a save share the next one"""
+        if self.snapshot_path is None:
+            return
+        self._unsaved = True
+        if self._saver is None or self._saver.done():
+            self._saver = asyncio.create_task(self._save_pending())
+
+    async def _save_pending(self):
+        while self._unsaved:
+            self._unsaved = False
+            # Copied in the event loop, written in a thread
+            data = self._snapshot_data()
+            try:
+                await asyncio.to_thread(_write_json, self.snapshot_path, data)
+            except OSError as e:
+                print(f"  ✗ Could not save watch snapshots: {e}", file=sys.stderr)
+
+    async def run(self, duration: Optional[float] = None):
+        """
+        Check every watched query on its schedule
+
+        Args:
+            duration: Seconds to run for (None = until cancelled)
+        """
+        self._wakeup = asyncio.Event()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        deadline = None if duration is None else time.monotonic() + duration
+        running = set()
+        try:
+            while True:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                if self._heap:
+                    due, _, query = self._heap[0]
+                    if self._due.get(query) != due:
+                        # Unwatched or rescheduled since this entry was pushed
+                        heapq.heappop(self._heap)
+                        continue
+                    if due <= now:
+                        heapq.heappop(self._heap)
+                        await semaphore.acquire()
+                        task = asyncio.create_task(self._run_check(query, semaphore))
+                        running.add(task)
+                        task.add_done_callback(running.discard)
+                        continue
+                    wake_at = due if deadline is None else min(due, deadline)
+                else:
+                    wake_at = deadline
+
+                # Sleep until the next check is due, or until watch() adds an earlier one
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), None if wake_at is None else wake_at - now)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            if self._saver is not None:
+                await asyncio.gather(self._saver, return_exceptions=True)
+                self._saver = None
+            self._wakeup = None
+
+    def save_snapshots(self, path: str):
+        """Write the watched queries' snapshots to a JSON file (replaced atomically)"""
+        _write_json(path, self._snapshot_data())
+
+    def _snapshot_data(self) -> Dict:
+        return {
+            query: {store: snapshot.offers for store, snapshot in self._snapshots.get(query, {}).items()}
+            for query in self._due
+        }
+
+    def load_snapshots(self, path: str) -> int:
+        """
+        Restore snapshots saved by save_snapshots, for the queries already being watched
+
+        Args:
+            path: JSON file written by save_snapshots
+
+        Returns:
+            Number of queries restored
+        """
+        if not os.path.exists(path):
+            return 0
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+
+        restored = 0
+        for query, stores in data.items():
+            if query not in self._due:
+                continue
+            snapshots = {}
+            for store, offers in stores.items():
+                offers = {key: tuple(offer) for key, offer in offers.items()}
+                snapshots[store] = _StoreSnapshot(_digest(offer[0] for offer in offers.values()), offers)
+            self._snapshots[query] = snapshots
+            restored += 1
+        return restored
+
+
+def run_watch(
+    source: TextIO,
+    events_path: Optional[str] = None,
+    interval: float = config.WATCH_INTERVAL_SECONDS,
+    concurrency: Optional[int] = None,
+    save_history: bool = False,
+    snapshot_path: Optional[str] = config.WATCH_SNAPSHOT_PATH,
+    duration: Optional[float] = None,
+) -> Dict:
+    """
+    Watch every query in a file, printing each event as it happens
+
+    Args:
+        source: Query file or sys.stdin, one query per line
+        events_path: JSONL file to append every event to (None = terminal only)
+        interval: Seconds between two checks of the same query
+        concurrency: Checks running at once (default: see PriceWatcher)
+        save_history: Record new and changed offers in the price history
+        snapshot_path: File keeping the snapshots across restarts, saved after
+            every check (None = memory only)
+        duration: Seconds to run for (None = until interrupted)
+
+    Returns:
+        Watch statistics (checks, errors, unchanged_stores, changed_offers, events)
+    """
+    events_file = open(events_path, 'a', encoding='utf-8') if events_path else None
+
+    def emit(event: WatchEvent):
+        print(event.describe())
+        if events_file is not None:
+            events_file.write(json.dumps(event.to_dict(), ensure_ascii=False) + '\n')
+            events_file.flush()
+
+    watcher = PriceWatcher(
+        interval=interval,
+        concurrency=concurrency,
+        on_event=emit,
+        history=get_price_history() if save_history else None,
+        snapshot_path=snapshot_path,
+    )
+    for query in read_queries(source):
+        watcher.watch(query)
+    restored = watcher.load_snapshots(snapshot_path) if snapshot_path else 0
+    print(f"👀 Watching {len(watcher.queries)} queries every ~{interval:.0f}s "
+          f"({restored} snapshots restored)", file=sys.stderr)
+
+    try:
+        asyncio.run(watcher.run(duration))
+    except KeyboardInterrupt:
+        pass  # Ctrl+C is the normal way to end a watch
+    finally:
+        if snapshot_path:
+            watcher.save_snapshots(snapshot_path)
+        if events_file is not None:
+            events_file.close()
+    return watcher.stats
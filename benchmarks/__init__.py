@@ -0,0 +1,4 @@
+"""
+Benchmarks for the Morocco product search agent
+Run each module from the project root, e.g. python -m benchmarks.bench_transport
+"""
@@ -0,0 +1,82 @@
+"""
+Parse Pool Benchmark
+Compares fetch -> parse throughput with extraction in the fetching threads against the process pool
+
+Fetcher threads simulate network latency, then extract each saved results page
+either in the thread itself (serialized by the GIL) or through a ParsePool with
+1, 2, 4 ... workers up to the number of cores.
+
+Usage:
+    python -m benchmarks.bench_parse_pool [--pages 400] [--fetchers 16] [--latency-ms 20]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from agent.parse_pool import ParsePool, gil_disabled
+from agent.parsers import get_parser
+from agent.store_specs import compile_spec, load_store_specs
+from benchmarks.bench_parsers import load_fixture
+
+PAGES = [('jumia', 'jumia_search.html'), ('marjane', 'marjane_search.html')]
+
+
+def _run(pages: List, fetchers: int, latency: float, extract: Callable) -> float:
+    """Push every page through `fetchers` threads and return pages per second"""
+    def fetch_and_parse(page):
+        time.sleep(latency)
+        return len(extract(*page))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=fetchers) as fetch_pool:
+        products = sum(fetch_pool.map(fetch_and_parse, pages))
+    elapsed = time.perf_counter() - start
+    assert products > 0, "fixtures produced no products"
+    return len(pages) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=400, help='Pages pushed through the pipeline per run')
+    parser.add_argument('--fetchers', type=int, default=16, help='Fetching threads')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Simulated fetch time per page')
+    parser.add_argument('--backend', default=None, help='Parser backend (default: config.PARSER_BACKEND)')
+    args = parser.parse_args()
+
+    backend = get_parser(args.backend)
+    specs = load_store_specs()
+    fixtures = [(specs[key], load_fixture(filename)) for key, filename in PAGES]
+    pages = [fixtures[i % len(fixtures)] for i in range(args.pages)]
+    latency = args.latency_ms / 1000
+
+    cores = os.cpu_count() or 1
+    print(f"{args.pages} pages, {args.fetchers} fetchers, {args.latency_ms:g} ms fetch, "
+          f"backend {backend.name}, {cores} cores{' (free-threaded)' if gil_disabled() else ''}")
+    print(f"{'parse stage':<22}{'pages/s':>10}{'speedup':>10}")
+
+    extractors = {spec.key: compile_spec(spec, backend) for spec, _ in fixtures}
+    baseline = _run(pages, args.fetchers, latency, lambda spec, content: extractors[spec.key].extract(content))
+    print(f"{'in fetching threads':<22}{baseline:>10.1f}{1.0:>9.1f}x")
+
+    workers = 1
+    while True:
+        pool = ParsePool(workers)
+        try:
+            # Start the workers and compile the specs before timing
+            list(pool.map(fixtures * workers, backend.name))
+            rate = _run(pages, args.fetchers, latency,
+                        lambda spec, content: pool.extract(spec, content, backend.name))
+        finally:
+            pool.close()
+        label = f"pool, {workers} worker{'s' if workers > 1 else ''}"
+        print(f"{label:<22}{rate:>10.1f}{rate / baseline:>9.1f}x")
+        if workers >= cores:
+            break
+        workers = min(workers * 2, cores)
+
+
+if __name__ == '__main__':
+    main()
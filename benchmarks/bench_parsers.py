@@ -0,0 +1,86 @@
+"""
+Parser Backend Benchmark
+Compares parse time and peak memory of every installed parser backend on saved store pages
+
+Usage:
+    python -m benchmarks.bench_parsers [--iterations 50]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from agent.parsers import available_backends
+from agent.scrapers import JumiaScraper, MarjaneScraper
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+STORES = {
+    'jumia': (JumiaScraper, 'jumia_search.html'),
+    'marjane': (MarjaneScraper, 'marjane_search.html'),
+}
+
+
+def load_fixture(filename: str) -> bytes:
+    """Read a saved results page"""
+    with open(os.path.join(FIXTURES, filename), 'rb') as f:
+        return f.read()
+
+
+def _measure(backend: str, store: str, iterations: int) -> dict:
+    """Parse one fixture repeatedly in this process and return timings and peak RSS growth"""
+    scraper_cls, filename = STORES[store]
+    content = load_fixture(filename)
+    scraper = scraper_cls(parser=backend)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    products = scraper._parse_results(content)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        scraper._parse_results(content)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        'backend': backend,
+        'store': store,
+        'products': len(products),
+        'ms_per_page': elapsed / iterations * 1000,
+        'peak_rss_kb': rss_after - rss_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50, help='Parses per backend and page')
+    parser.add_argument('--worker', nargs=2, metavar=('BACKEND', 'STORE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_measure(*args.worker, args.iterations)))
+        return
+
+    print(f"{'store':<9}{'backend':<15}{'products':>9}{'ms/page':>10}{'peak RSS':>12}{'speedup':>9}")
+    for store in STORES:
+        baseline = None
+        for backend in available_backends():
+            # Fresh interpreter per run so peak RSS is not shared between backends
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_parsers',
+                 '--iterations', str(args.iterations), '--worker', backend, store],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            baseline = baseline or result['ms_per_page']
+            print(
+                f"{store:<9}{backend:<15}{result['products']:>9}"
+                f"{result['ms_per_page']:>10.2f}{result['peak_rss_kb']:>9d} KB"
+                f"{baseline / result['ms_per_page']:>8.1f}x"
+            )
+
+
+if __name__ == '__main__':
+    main()
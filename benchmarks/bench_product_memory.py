@@ -0,0 +1,112 @@
+"""
+Product Memory Benchmark
+Compares memory and serialization cost of Product records against the old product dictionaries
+
+Usage:
+    python -m benchmarks.bench_product_memory [--stores 20] [--per-store 50]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from agent.models import Product, products_from_json, products_to_json
+
+AVAILABILITY = ('In Stock', 'Limited Stock', 'Check Store')
+
+
+def _fresh(text: str) -> str:
+    """Copy a string the way a parser would produce it (a new, non-interned object)"""
+    return ''.join(list(text))
+
+
+def _crawl_rows(stores: int, per_store: int):
+    """Field values for a crawl of `per_store` results from each of `stores` stores"""
+    for store in range(stores):
+        for index in range(per_store):
+            yield (
+                f"Laptop model {store}-{index} 16GB RAM 512GB SSD",
+                1999.0 + index,
+                'MAD',
+                f"Store {store}",
+                f"https://store{store}.example.ma/product/{index}",
+                AVAILABILITY[index % len(AVAILABILITY)],
+            )
+
+
+def build_dicts(rows):
+    return [
+        {
+            'name': name,
+            'price': price,
+            'currency': _fresh(currency),
+            'store': _fresh(store),
+            'url': url,
+            'availability': _fresh(availability),
+        }
+        for name, price, currency, store, url, availability in rows
+    ]
+
+
+def build_products(rows):
+    return [
+        Product(name, price, _fresh(currency), _fresh(store), url, _fresh(availability))
+        for name, price, currency, store, url, availability in rows
+    ]
+
+
+def _measure_memory(build, rows) -> int:
+    """Bytes still allocated by the built records (the row values themselves are excluded)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = build(rows)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return after - before
+
+
+def _time(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stores', type=int, default=20, help='Stores in the simulated crawl')
+    parser.add_argument('--per-store', type=int, default=50, help='Results per store')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per serialization timing')
+    args = parser.parse_args()
+
+    # Names and URLs are allocated up front: both representations hold the same
+    # ones, so only the per-record overhead and the repeated short fields count
+    rows = list(_crawl_rows(args.stores, args.per_store))
+    count = len(rows)
+
+    dict_bytes = _measure_memory(build_dicts, rows)
+    product_bytes = _measure_memory(build_products, rows)
+
+    dicts = build_dicts(rows)
+    products = build_products(rows)
+    dict_payload = json.dumps(dicts, ensure_ascii=False)
+
+    print(f"{count} products ({args.stores} stores x {args.per_store} results)\n")
+    print(f"{'':<12}{'bytes/record':>14}{'total KB':>11}{'to JSON ms':>12}{'from JSON ms':>14}")
+    print(
+        f"{'dict':<12}{dict_bytes / count:>14.0f}{dict_bytes / 1024:>11.0f}"
+        f"{_time(lambda: json.dumps(dicts, ensure_ascii=False), args.repeat):>12.2f}"
+        f"{_time(lambda: json.loads(dict_payload), args.repeat):>14.2f}"
+    )
+    print(
+        f"{'Product':<12}{product_bytes / count:>14.0f}{product_bytes / 1024:>11.0f}"
+        f"{_time(lambda: products_to_json(products), args.repeat):>12.2f}"
+        f"{_time(lambda: products_from_json(dict_payload), args.repeat):>14.2f}"
+    )
+    print(f"\nProduct records use {product_bytes / dict_bytes:.0%} of the dictionary memory")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Startup Benchmark
+Import time of the entry points, checked against a startup budget
+
+Each target is imported in a fresh interpreter and only the import itself is
+timed (best of --repeat runs). A target fails when it is slower than its
+budget or when it pulls in a dependency it should only load on first use
+(LangChain, Gemini, aiohttp...). The exit code is 1 on any failure, so the
+check can gate CI.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 5] [--scale 1.0]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module -> (budget in ms, top-level packages it must not import)
+STARTUP_BUDGETS = {
+    'main': (50, ['langchain', 'langchain_core', 'langchain_google_genai', 'langgraph', 'aiohttp', 'bs4', 'requests']),
+    'agent': (10, ['langchain', 'langchain_core', 'numpy', 'requests']),
+    'agent.pipeline': (400, ['langchain', 'langchain_core', 'langchain_google_genai', 'langgraph', 'aiohttp']),
+    'agent.product_searcher': (400, ['langchain', 'langchain_core', 'langchain_google_genai', 'langgraph', 'aiohttp']),
+    'agent.watch': (400, ['langchain', 'langchain_core', 'langchain_google_genai', 'langgraph', 'aiohttp']),
+    'agent.batch': (500, ['langchain', 'langchain_core', 'langchain_google_genai', 'langgraph', 'aiohttp']),
+    'agent.service': (800, ['langchain', 'langchain_core', 'langchain_google_genai', 'langgraph']),
+    'agent.langchain_agent': (1500, ['langchain_google_genai', 'langgraph', 'aiohttp']),
+}
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': sorted({{name.split('.')[0] for name in sys.modules}})}}))
+"""
+
+
+def measure(module: str, repeat: int) -> Dict:
+    """
+    Import `module` in `repeat` fresh interpreters
+
+    Returns:
+        Best import time in ms and the top-level packages loaded by the import
+    """
+    best, modules = None, []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', _PROBE.format(module=module)],
+            cwd=ROOT, check=True, capture_output=True, text=True,
+        ).stdout
+        run = json.loads(output.strip().splitlines()[-1])
+        if best is None or run['seconds'] < best:
+            best, modules = run['seconds'], run['modules']
+    return {'ms': round(best * 1000, 1), 'modules': modules}
+
+
+def _importtime(code: str) -> Dict[str, int]:
+    """Cumulative import time in microseconds per module, from python -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, capture_output=True, text=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            times[parts[2].strip()] = int(parts[1])
+    return times
+
+
+def slowest_imports(module: str, top: int = 8) -> List[str]:
+    """The imports under `module` with the largest cumulative time (interpreter start-up excluded)"""
+    startup = _importtime('pass')
+    times = _importtime(f'import {module}')
+    rows = sorted(((us, name) for name, us in times.items() if name not in startup), reverse=True)
+    return [f"{us / 1000:8.1f} ms  {name}" for us, name in rows[:top]]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per target (best is kept)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply every budget, for slower machines')
+    parser.add_argument('modules', nargs='*', help='Targets to check (default: all)')
+    args = parser.parse_args(argv)
+
+    failures = []
+    print(f"{'module':<26}{'import ms':>10}{'budget ms':>11}  status")
+    for module in args.modules or STARTUP_BUDGETS:
+        budget_ms, forbidden = STARTUP_BUDGETS.get(module, (float('inf'), []))
+        budget_ms *= args.scale
+        result = measure(module, args.repeat)
+        leaked = sorted(set(forbidden) & set(result['modules']))
+
+        problems = []
+        if result['ms'] > budget_ms:
+            problems.append('over budget')
+        if leaked:
+            problems.append(f"imports {', '.join(leaked)}")
+        print(f"{module:<26}{result['ms']:>10.1f}{budget_ms:>11.0f}  {'; '.join(problems) or 'ok'}")
+        if problems:
+            failures.append(module)
+
+    for module in failures:
+        print(f"\nSlowest imports under {module}:")
+        print('\n'.join(slowest_imports(module)))
+    if failures:
+        print(f"\n{len(failures)} target(s) failed the startup budget")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,290 @@
+"""
+Offline Benchmark Suite
+End-to-end latency, per-stage timings, throughput and peak RSS against recorded store pages
+
+Stores are replayed from benchmarks/fixtures by a local server and the chat
+model is a deterministic fake, so runs are repeatable and need no network or
+API key. Each run is saved to benchmarks/results/<commit>.json; pass
+--compare <commit> to diff against an earlier run (exit code 1 on regressions).
+
+Usage:
+    python -m benchmarks.bench_suite [--queries 50] [--concurrency 1 4 16] [--compare <commit>]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import config
+from agent.store_tools import format_comparison
+from agent.scrapers import SpecScraper, configure_scrapers
+from agent.search_engine import SearchEngine
+from benchmarks.fake_llm import FakeChatModel, LLMTimer
+from benchmarks.fixture_server import FixtureServer
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+class StageTimer:
+    """Thread-safe collection of durations per pipeline stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self.durations[stage].append(seconds)
+
+    @contextlib.contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self.durations.clear()
+
+    def summary(self) -> Dict[str, Dict]:
+        return {stage: latency_summary(values) for stage, values in sorted(self.durations.items())}
+
+
+class _TimedScraper(SpecScraper):
+    """SpecScraper recording how long fetching and parsing each page takes"""
+
+    def __init__(self, spec, timer: StageTimer):
+        super().__init__(spec)
+        self.timer = timer
+
+    def get_page(self, url: str):
+        with self.timer.time('fetch'):
+            return super().get_page(url)
+
+    def _parse_results(self, content: bytes):
+        with self.timer.time('parse'):
+            return super()._parse_results(content)
+
+
+def latency_summary(seconds: List[float]) -> Dict:
+    """Count, mean and percentiles of a list of durations, in milliseconds"""
+    if not seconds:
+        return {'count': 0}
+    ms = np.asarray(seconds) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        'count': len(seconds),
+        'mean_ms': round(float(ms.mean()), 3),
+        'p50_ms': round(float(p50), 3),
+        'p90_ms': round(float(p90), 3),
+        'p99_ms': round(float(p99), 3),
+    }
+
+
+def build_fixture_engine(server: FixtureServer, timer: StageTimer) -> SearchEngine:
+    """
+    Search engine over scrapers of the recorded stores, served by the fixture server
+
+    The scrapers also replace the shared ones, so the agent's store tools search
+    the fixtures too.
+    """
+    scrapers = {key: _TimedScraper(spec, timer) for key, spec in server.specs().items()}
+    configure_scrapers(scrapers)
+    engine = SearchEngine()
+    for scraper in scrapers.values():
+        engine.register(scraper.spec.name, scraper.search, pages=scraper.search_pages)
+    return engine
+
+
+def bench_search(engine: SearchEngine, timer: StageTimer, queries: List[str]) -> Dict:
+    """Sequential queries: end-to-end latency of search + price comparison"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        products = engine.search_sync(query)
+        with timer.time('compare'):
+            format_comparison(products)
+        latencies.append(time.perf_counter() - start)
+    return latency_summary(latencies)
+
+
+def bench_throughput(engine: SearchEngine, queries: List[str], concurrency: int) -> Dict:
+    """Queries per second with `concurrency` queries in flight"""
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(query):
+            async with semaphore:
+                start = time.perf_counter()
+                await engine.search(query)
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(query) for query in queries))
+        return latencies, time.perf_counter() - start
+
+    latencies, elapsed = asyncio.run(run())
+    return {'qps': round(len(queries) / elapsed, 2), **latency_summary(latencies)}
+
+
+def bench_agent(engine: SearchEngine, timer: StageTimer, turns: int, llm_latency: float) -> Dict:
+    """Chat turns through MoroccoSearchAgent with the fake model: direct lookups and ReAct turns"""
+    from agent.langchain_agent import MoroccoSearchAgent
+
+    llm_timer = LLMTimer()
+    agent = MoroccoSearchAgent(
+        llm=FakeChatModel(latency=llm_latency, callbacks=[llm_timer]),
+        search_engine=engine,
+        use_llm_cache=False,
+    )
+    latencies = defaultdict(list)
+    # AgentExecutor is verbose; keep its trace out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for turn in range(turns):
+            for kind, message in (('direct', f"find bench phone {turn}"),
+                                  ('react', f"which bench phone {turn} should I buy?")):
+                start = time.perf_counter()
+                agent.chat(message)
+                latencies[kind].append(time.perf_counter() - start)
+    for seconds in llm_timer.durations:
+        timer.add('llm', seconds)
+    return {kind: latency_summary(values) for kind, values in latencies.items()}
+
+
+def git_commit() -> str:
+    """Short hash of HEAD, with "-dirty" when the tree has uncommitted changes"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+                                check=True, capture_output=True, text=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                               check=True, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return f"{commit}-dirty" if dirty else commit
+
+
+def flatten(metrics: Dict, prefix: str = '') -> Dict[str, float]:
+    """Nested metrics as {"a.b.c": value}, keeping only numbers"""
+    flat = {}
+    for key, value in metrics.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key != 'count':
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """
+    Print the change of every metric and list the regressions
+
+    Times and memory regress when they grow by more than `threshold`, rates
+    ("qps") when they shrink by more than it.
+    """
+    old, new = flatten(baseline['metrics']), flatten(current['metrics'])
+    regressions = []
+    print(f"\n{'metric':<40}{baseline['commit']:>14}{current['commit']:>14}{'change':>9}")
+    for name in sorted(old.keys() & new.keys()):
+        before, after = old[name], new[name]
+        change = (after - before) / before if before else 0.0
+        worse = -change if name.endswith('qps') else change
+        flag = ''
+        if worse > threshold:
+            flag = '  << regression'
+            regressions.append(name)
+        print(f"{name:<40}{before:>14.2f}{after:>14.2f}{change:>+8.0%}{flag}")
+    return regressions
+
+
+def load_result(ref: str) -> Dict:
+    """Load a saved run by commit hash or file path"""
+    path = ref if os.path.exists(ref) else os.path.join(RESULTS_DIR, f"{ref}.json")
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--queries', type=int, default=50, help='Sequential end-to-end queries')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help='Queries in flight for the throughput runs')
+    parser.add_argument('--agent-turns', type=int, default=10, help='Chat turns of each kind (0 to skip)')
+    parser.add_argument('--server-latency-ms', type=float, default=5, help='Fixture server delay per page')
+    parser.add_argument('--llm-latency-ms', type=float, default=0, help='Fake model delay per call')
+    parser.add_argument('--compare', metavar='COMMIT', help='Saved run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative change reported as a regression')
+    parser.add_argument('--no-save', action='store_true', help="Don't write benchmarks/results/<commit>.json")
+    args = parser.parse_args(argv)
+
+    # Measure the pipeline, not the caches in front of it
+    config.HTTP_CACHE_ENABLED = False
+    run_id = int(time.time())
+    timer = StageTimer()
+    metrics: Dict = {}
+
+    with FixtureServer(latency=args.server_latency_ms / 1000) as server:
+        engine = build_fixture_engine(server, timer)
+        engine.search_sync('warm up')
+        timer.reset()
+        metrics['search'] = bench_search(engine, timer, [f"bench laptop {run_id} {i}" for i in range(args.queries)])
+
+        metrics['throughput'] = {
+            f"c{concurrency}": bench_throughput(
+                engine, [f"bench tv {run_id} {concurrency} {i}" for i in range(max(args.queries, 4 * concurrency))],
+                concurrency,
+            )
+            for concurrency in args.concurrency
+        }
+
+        if args.agent_turns:
+            metrics['agent'] = bench_agent(engine, timer, args.agent_turns, args.llm_latency_ms / 1000)
+        metrics['stages'] = timer.summary()
+        requests_served = server.requests
+
+    metrics['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'cores': os.cpu_count(),
+        'parser': config.PARSER_BACKEND,
+        'options': {k: v for k, v in vars(args).items() if k not in ('compare', 'no_save')},
+        'requests_served': requests_served,
+        'metrics': metrics,
+    }
+
+    print(json.dumps(result, indent=2))
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{result['commit']}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved to {path}", file=sys.stderr)
+
+    if args.compare:
+        regressions = compare(load_result(args.compare), result, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Transport Benchmark
+Compares one-connection-per-request fetching with the shared keep-alive transport
+
+Usage:
+    python -m benchmarks.bench_transport [--pages 200]
+"""
+
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from agent.transport import HttpTransport
+
+PAGE = b"<html><body>" + b"<article class='prd'>product</article>" * 200 + b"</body></html>"
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """Serves the same search page for every path, with keep-alive"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _CountingServer(ThreadingHTTPServer):
+    """Local stand-in store that counts accepted TCP connections"""
+
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+
+def _run(label: str, fetch, urls, server: _CountingServer):
+    """Fetch every URL with the given function and print timings"""
+    server.connections = 0
+    start = time.perf_counter()
+    for url in urls:
+        fetch(url)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<28} {elapsed * 1000:9.1f} ms  "
+        f"{elapsed / len(urls) * 1000:7.3f} ms/page  "
+        f"{server.connections:5d} connections"
+    )
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200, help="Pages to fetch per run")
+    args = parser.parse_args()
+
+    server = _CountingServer(("127.0.0.1", 0), _PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base}/catalog/?q=laptop&page={i}" for i in range(args.pages)]
+
+    print(f"Fetching {args.pages} pages from {base}\n")
+    cold = _run("requests.get (no reuse)", lambda url: requests.get(url, timeout=10), urls, server)
+
+    transport = HttpTransport()
+    warm = _run("HttpTransport (keep-alive)", lambda url: transport.get(url, timeout=10), urls, server)
+    transport.close()
+
+    print(f"\nSpeedup: {cold / warm:.2f}x")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
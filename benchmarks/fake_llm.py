@@ -0,0 +1,74 @@
+"""
+Fake Chat Model
+Deterministic stand-in for Gemini that drives MoroccoSearchAgent's ReAct loop offline
+"""
+
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+_USER_LINE = re.compile(r'^User: (.*)$', re.MULTILINE)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Scripted ReAct model
+
+    For an agent prompt it calls each tool in `tool_plan` once with the user's
+    message, then gives a final answer; any other prompt (conversation
+    summaries) gets a fixed short reply. The same prompt always produces the
+    same text, and `latency` adds a fixed delay per call to stand in for the
+    model's response time.
+    """
+
+    tool_plan: List[str] = ['search_jumia_morocco', 'search_marjane_online', 'search_other_morocco_stores']
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return 'fake-react'
+
+    def _reply(self, prompt: str) -> str:
+        if 'Tool Names:' not in prompt:
+            return 'The user compared product prices across Moroccan stores.'
+        users = _USER_LINE.findall(prompt)
+        query = users[-1].strip() if users else ''
+        steps = prompt.count('Observation:')
+        if steps < len(self.tool_plan):
+            return (f"Thought: I should check another store.\n"
+                    f"Action: {self.tool_plan[steps]}\nAction Input: {query}")
+        return f"Thought: I now know the final answer.\nFinal Answer: Compared {steps} stores for {query}."
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = '\n'.join(str(message.content) for message in messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(prompt)))])
+
+
+class LLMTimer(BaseCallbackHandler):
+    """Callback collecting the wall time of every chat model call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[UUID, float] = {}
+        self.durations: List[float] = []
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        end = time.perf_counter()
+        with self._lock:
+            start = self._started.pop(run_id, None)
+            if start is not None:
+                self.durations.append(end - start)
@@ -0,0 +1,93 @@
+"""
+Fixture Store Server
+Local HTTP server replaying the recorded store pages, so benchmarks never touch the live sites
+"""
+
+import dataclasses
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+import config
+from agent.store_specs import StoreSpec, load_store_specs
+from benchmarks.bench_parsers import load_fixture
+
+# Recorded results page served for every request under /<store key>/
+FIXTURES = {
+    'jumia': 'jumia_search.html',
+    'marjane': 'marjane_search.html',
+}
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    """Serves the recorded page of the store named by the first path segment"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        store = self.path.lstrip('/').split('/', 1)[0]
+        page = self.server.pages.get(store)
+        if page is None:
+            self.send_error(404)
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """
+    Stand-in for the store sites, serving saved results pages on 127.0.0.1
+
+    Use as a context manager; `specs()` returns the store specs rewritten to
+    point at the server and `latency` adds a fixed delay per response to
+    emulate the network.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Start serving on a free local port
+
+        Args:
+            latency: Seconds to wait before answering each request
+        """
+        super().__init__(('127.0.0.1', 0), _FixtureHandler)
+        self.latency = latency
+        self.requests = 0
+        self.pages: Dict[str, bytes] = {key: load_fixture(filename) for key, filename in FIXTURES.items()}
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def specs(self) -> Dict[str, StoreSpec]:
+        """Store specs of the recorded stores with their URLs on this server"""
+        specs = load_store_specs()
+        return {
+            key: dataclasses.replace(specs[key], base_url=f"{self.base_url}/{key}")
+            for key in FIXTURES
+        }
+
+    def __enter__(self):
+        # The local "stores" must not be throttled like the real sites
+        config.STORE_RATE_LIMITS.setdefault(self.base_url.split('//', 1)[1], 10 ** 9)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
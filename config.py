@@ -2,17 +2,161 @@
 
 # Search settings
 MAX_RESULTS_PER_STORE = 50
-TIMEOUT_SECONDS = 10
+TIMEOUT_SECONDS = 10          # Per-store timeout
+SEARCH_DEADLINE_SECONDS = 15  # Overall deadline for one query across all stores
+SEARCH_WORKERS = 16           # Threads shared by concurrent store searches
+MAX_PAGES_PER_STORE = 5       # Results pages crawled per store and query
+PAGE_FETCH_CONCURRENCY = 3    # Results pages fetched at the same time per store
+PARSE_WORKERS = 0             # Processes extracting products from fetched pages
+                              # (0 = parse in the fetching thread, None = one per core)
+
+# HTML parser backend: "auto" (fastest installed), "selectolax", "lxml",
+# "strainer", "strainer-lxml", "bs4" or "bs4-lxml"
+PARSER_BACKEND = "auto"
+
+# Chat memory: "summary" keeps recent turns and summarizes older ones within a
+# token budget; "buffer" keeps the full history
+MEMORY_MODE = "summary"
+MEMORY_MAX_TURNS = 4            # Exchanges kept verbatim
+MEMORY_TOKEN_BUDGET = 1500      # Approximate tokens allowed in {chat_history}
+MEMORY_MAX_OUTPUT_CHARS = 600   # Longest agent answer kept verbatim in memory
+
+# Cross-store product matching (MinHash/LSH over normalized name tokens)
+MATCH_THRESHOLD = 0.5   # Minimum token Jaccard similarity for two offers to be the same product
+MATCH_NUM_PERM = 64     # MinHash signature length
+MATCH_BANDS = 32        # LSH bands (MATCH_NUM_PERM must be a multiple)
+
+# LLM response cache (memory LRU in front of SQLite)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_MAX_ENTRIES = 512     # Responses kept in memory
+LLM_CACHE_PATH = "llm_cache.db"  # None keeps the cache in memory only
+LLM_CACHE_MAX_ROWS = 20000      # Responses kept in SQLite
+
+# Search result cache
+RESULT_CACHE_TTL_SECONDS = 900   # How long a store's results for a query stay fresh
+RESULT_CACHE_MAX_ENTRIES = 1024  # In-memory LRU bound
+RESULT_CACHE_PATH = None         # SQLite file to persist the cache, e.g. "result_cache.db"
+
+# Price history (every saved search and its prices)
+PRICE_HISTORY_PATH = "price_history.db"
+
+# HTTP page cache (ETag / Last-Modified revalidation)
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_DIR = ".http_cache"
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Fetch resilience, tracked per store host
+ADAPTIVE_TIMEOUT_ENABLED = True
+ADAPTIVE_TIMEOUT_MULTIPLIER = 3.0  # Timeout = recent p99 latency x this, capped at TIMEOUT_SECONDS
+ADAPTIVE_TIMEOUT_MIN = 1.0         # Never time out sooner than this (seconds)
+LATENCY_WINDOW = 200               # Recent response times kept per store
+LATENCY_MIN_SAMPLES = 20           # Responses needed before timeouts and hedging adapt
+HEDGE_ENABLED = True               # Send a duplicate request when the first passes the store's p95
+HEDGE_MAX_RATIO = 0.1              # Duplicates allowed per request sent (caps the extra load)
+HEDGE_MIN_DELAY = 0.05             # Never hedge sooner than this (seconds)
+HEDGE_WORKERS = 64                 # Threads running hedged request pairs
+CIRCUIT_FAILURE_THRESHOLD = 5      # Consecutive failures that open a store's circuit
+CIRCUIT_RESET_SECONDS = 30         # An open circuit skips the store this long, then lets one probe through
+
+# HTTP connection pooling
+HTTP_POOL_CONNECTIONS = 10  # Number of hosts with a kept-alive connection pool
+HTTP_POOL_MAXSIZE = 20      # Connections kept alive per host
+HTTP2_ENABLED = True        # Used when httpx[http2] is installed
+
+# Tracing: per-stage spans (fetch phases, parse, compare, LLM calls) feed
+# Prometheus-style metrics; a sample of whole traces is written as JSONL
+TRACING_ENABLED = True
+TRACE_SAMPLE_RATE = 0.05       # Fraction of traces written to TRACE_PATH
+TRACE_SLOW_SECONDS = 5.0       # Traces at least this slow are always written (None = sampled only)
+TRACE_PATH = "traces.jsonl"    # None keeps metrics only
+METRICS_PORT = None            # Serve GET /metrics on this port (the HTTP service always has /metrics)
+
+# HTTP service (python main.py --serve)
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8080
+SERVICE_STORE_CONCURRENCY = 4        # Searches running at once per store, across all requests
+SERVICE_MAX_SESSIONS = 200           # Chat sessions kept in memory (least recently used evicted first)
+SERVICE_SESSION_TTL_SECONDS = 1800   # Idle chat sessions are dropped after this long
+
+# Price watch (python main.py --watch)
+WATCH_INTERVAL_SECONDS = 900          # Time between two checks of the same query
+WATCH_JITTER = 0.1                    # Each interval is randomly stretched or shrunk by up to this fraction
+WATCH_MIN_DROP = 0.01                 # Smallest relative price drop reported as an event
+WATCH_SNAPSHOT_PATH = "watch_snapshots.json"  # Last results per query, kept across restarts (None = memory only)
 
 # Moroccan e-commerce sites
 STORES = {
     "jumia": "https://www.jumia.ma",
     "marjane": "https://www.marjane.ma",
+    "electroplanet": "https://www.electroplanet.ma",
+    "aswak_assalam": "https://www.aswakassalam.com",
     # Add more stores here
 }
 
+# Scraping spec per store - adding a store only needs a new entry here.
+# "search_url" is formatted with {base_url}, the URL-encoded {query} and the
+# results {page} number (leave {page} out for stores without pagination).
+# Fields are CSS selectors inside a product card ("item"); use a dictionary
+# with "attr" to read an attribute and "absolute" to resolve relative links.
+# These are example selectors - CUSTOMIZE based on the actual HTML structure.
+STORE_SPECS = {
+    "jumia": {
+        "name": "Jumia",
+        "base_url": STORES["jumia"],
+        "search_url": "{base_url}/catalog/?q={query}&page={page}",
+        "item": "article.prd",
+        "fields": {
+            "name": "h3.name",
+            "price": "div.prc",
+            "url": {"selector": "a.core", "attr": "href", "absolute": True},
+        },
+        "price": {"thousands": ",", "decimal": "."},
+    },
+    "marjane": {
+        "name": "Marjane",
+        "base_url": STORES["marjane"],
+        "search_url": "{base_url}/search?q={query}&page={page}",
+        "item": "div.product-item",
+        "fields": {
+            "name": "div.product-name",
+            "price": "span.price",
+            "url": {"selector": "a", "attr": "href"},
+        },
+        "price": {"thousands": ",", "decimal": "."},
+    },
+    "electroplanet": {
+        "name": "Electroplanet",
+        "base_url": STORES["electroplanet"],
+        "search_url": "{base_url}/catalogsearch/result/?q={query}&p={page}",
+        "item": "li.product-item",
+        "fields": {
+            "name": "a.product-item-link",
+            "price": "span.price",
+            "url": {"selector": "a.product-item-link", "attr": "href"},
+        },
+        "price": {"thousands": " ", "decimal": ","},
+    },
+    "aswak_assalam": {
+        "name": "Aswak Assalam",
+        "base_url": STORES["aswak_assalam"],
+        "search_url": "{base_url}/page/{page}/?s={query}&post_type=product",
+        "item": "li.product",
+        "fields": {
+            "name": "h2.woocommerce-loop-product__title",
+            "price": "span.woocommerce-Price-amount",
+            "url": {"selector": "a.woocommerce-LoopProduct-link", "attr": "href"},
+        },
+        "price": {"thousands": " ", "decimal": ","},
+    },
+}
+
 # Currency
 DEFAULT_CURRENCY = "MAD"
 
 # Rate limiting (requests per minute)
 RATE_LIMIT = 30
+RATE_LIMIT_BURST = None  # Requests allowed back to back (None = one minute's budget)
+STORE_RATE_LIMITS = {
+    # Per-host overrides, e.g. "www.jumia.ma": 60
+}
+
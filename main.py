@@ -3,10 +3,110 @@ Morocco Product Price Search Agent - Powered by LangChain
 Main entry point for the AI-powered product search agent
 """
 
-from agent.langchain_agent import MoroccoSearchAgent
-
+import argparse
 import sys
 
+import config
+
+# Each mode imports what it needs when it starts: LangChain, Gemini, aiohttp and
+# the scrapers take most of a second to import, and a batch run or the service
+# should not pay for the parts it never uses.
+
+
+def quick_scan(product_name: str, top_k: int = 10):
+    """Search every store directly and show the best price as each store answers"""
+    from agent.product_searcher import ProductSearchAgent
+    from agent.ranking import TopK
+    from agent.utils import display_progress, display_results
+
+    searcher = ProductSearchAgent()
+    ranking = TopK(top_k)
+
+    for store, products in searcher.iter_products(product_name):
+        ranking.extend(products)
+        display_progress(store, products, ranking)
+
+    display_results(ranking.items())
+
+
+def parse_args(argv=None):
+    """Parse command-line options; without --batch, --watch or --serve the interactive agent starts"""
+    parser = argparse.ArgumentParser(description="Morocco Product Price Search Agent")
+    parser.add_argument(
+        "--batch", metavar="FILE",
+        help="Search every query in FILE ('-' for stdin), one per line, without the AI agent",
+    )
+    parser.add_argument(
+        "--output", metavar="FILE", default="batch_results.jsonl",
+        help="JSONL file receiving one result per query (default: batch_results.jsonl)",
+    )
+    parser.add_argument("--concurrency", type=int, help="Queries searched at the same time")
+    parser.add_argument(
+        "--parse-workers", type=int,
+        help="Processes extracting products from pages (default: one per core, 0 = no pool)",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Skip queries already completed in --output and append to it",
+    )
+    parser.add_argument(
+        "--save-history", action="store_true", help="Also record every result in the price history"
+    )
+    parser.add_argument(
+        "--watch", metavar="FILE",
+        help="Keep re-checking every query in FILE ('-' for stdin) and report price drops and stock changes",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=config.WATCH_INTERVAL_SECONDS,
+        help="Seconds between two checks of the same query (with --watch)",
+    )
+    parser.add_argument("--events", metavar="FILE", help="JSONL file receiving every watch event (with --watch)")
+    parser.add_argument(
+        "--serve", action="store_true", help="Run the HTTP service (/search, /chat) instead of the terminal UI"
+    )
+    parser.add_argument("--host", default=config.SERVICE_HOST, help="Service interface (with --serve)")
+    parser.add_argument("--port", type=int, default=config.SERVICE_PORT, help="Service port (with --serve)")
+    return parser.parse_args(argv)
+
+
+def batch_mode(args):
+    """Run a batch sweep and print its summary"""
+    from agent.batch import run_batch
+
+    if args.batch == "-":
+        stats = run_batch(
+            sys.stdin, args.output, args.concurrency, args.resume, args.save_history, args.parse_workers
+        )
+    else:
+        with open(args.batch, encoding="utf-8") as source:
+            stats = run_batch(
+                source, args.output, args.concurrency, args.resume, args.save_history, args.parse_workers
+            )
+
+    print(
+        f"\n✅ Batch done: {stats['ok']} ok, {stats['partial']} partial, {stats['errors']} errors, "
+        f"{stats['skipped']} already done, {stats['products']} products in {stats['elapsed']:.1f}s "
+        f"-> {args.output}",
+        file=sys.stderr,
+    )
+
+
+def watch_mode(args):
+    """Watch a list of queries until interrupted"""
+    from agent.watch import run_watch
+
+    if args.watch == "-":
+        stats = run_watch(sys.stdin, args.events, args.interval, args.concurrency, args.save_history)
+    else:
+        with open(args.watch, encoding="utf-8") as source:
+            stats = run_watch(source, args.events, args.interval, args.concurrency, args.save_history)
+
+    print(
+        f"\n✅ Watch stopped: {stats['checks']} checks, {stats['events']} events, "
+        f"{stats['changed_offers']} changed offers, {stats['errors']} errors",
+        file=sys.stderr,
+    )
+
 
 def main():
     """Main function to run the LangChain-powered product search agent"""
@@ -19,6 +119,8 @@ def main():
     try:
         # Initialize the LangChain agent
         print("🔧 Initializing AI agent with Google Gemini...")
+        from agent.langchain_agent import MoroccoSearchAgent
+
         agent = MoroccoSearchAgent(model="gemini-1.5-pro", temperature=0)
         print("✅ Agent ready!\n")
 
@@ -36,9 +138,20 @@ def main():
 
     # Interactive mode or single search
     mode = input(
-        "Choose mode:\n1. Single search\n2. Interactive chat mode\nEnter choice (1 or 2): "
+        "Choose mode:\n1. Single search\n2. Interactive chat mode\n"
+        "3. Quick price scan (live results, no AI)\nEnter choice (1, 2 or 3): "
     ).strip()
 
+    if mode == "3":
+        product_name = input("\nEnter product name to search: ").strip()
+        if not product_name:
+            print("❌ Error: Product name cannot be empty")
+            return
+
+        print(f"\n🔍 Scanning stores for '{product_name}'...\n")
+        quick_scan(product_name)
+        return
+
     if mode == "2":
         # Interactive chat mode
         print("\n" + "=" * 80)
@@ -62,6 +175,13 @@ def main():
             response = agent.chat(user_input)
             print(response)
 
+            stats = agent.last_turn_stats
+            if stats:
+                print(
+                    f"\n   (prompt tokens this turn: ~{stats['prompt_tokens']} over "
+                    f"{stats['llm_calls']} LLM calls, history: ~{stats['history_tokens']})"
+                )
+
     else:
         # Single search mode
         product_name = input("\nEnter product name to search: ").strip()
@@ -85,8 +205,22 @@ def main():
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    if config.METRICS_PORT and not args.serve:
+        from agent.tracing import start_metrics_server
+
+        start_metrics_server(config.METRICS_PORT)
     try:
-        main()
+        if args.serve:
+            from agent.service import run_service
+
+            run_service(args.host, args.port)
+        elif args.batch:
+            batch_mode(args)
+        elif args.watch:
+            watch_mode(args)
+        else:
+            main()
     except KeyboardInterrupt:
         print("\n\n👋 Search cancelled by user. Goodbye!")
     except Exception as e:
@@ -0,0 +1,58 @@
+"""Tests for batch result statuses and resume in agent.batch"""
+
+import asyncio
+import io
+import json
+import time
+
+from agent.batch import BatchRunner, load_checkpoint
+from agent.models import Product
+from agent.search_engine import SearchEngine
+
+
+def _answer(query):
+    return [Product(f"{query} phone", 1000.0, 'MAD', 'Fast', 'http://fast/p', 'In stock')]
+
+
+def _fail(query):
+    raise RuntimeError("store down")
+
+
+def _slow(query):
+    time.sleep(0.5)
+    return []
+
+
+def _run(*stores):
+    engine = SearchEngine(store_timeout=0.1)
+    for index, search in enumerate(stores):
+        engine.register(f"Store{index}", search)
+    output = io.StringIO()
+    stats = asyncio.run(BatchRunner(engine).run(['phone'], output, progress=None))
+    return stats, json.loads(output.getvalue())
+
+
+def test_every_store_answering_is_ok():
+    stats, record = _run(_answer, _answer)
+    assert record['status'] == 'ok' and record['store_errors'] == {}
+    assert stats['ok'] == 1
+
+
+def test_some_stores_failing_is_partial():
+    stats, record = _run(_answer, _fail, _slow)
+    assert record['status'] == 'partial'
+    assert set(record['store_errors']) == {'Store1', 'Store2'}
+    assert record['count'] == 1 and stats['partial'] == 1
+
+
+def test_every_store_failing_is_an_error():
+    stats, record = _run(_fail, _slow)
+    assert record['status'] == 'error'
+    assert stats['errors'] == 1
+
+
+def test_resume_retries_partial_and_failed_queries(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    path.write_text(''.join(json.dumps({'query': query, 'status': status}) + '\n' for query, status in
+                            [('tv', 'ok'), ('laptop', 'partial'), ('phone', 'error')]))
+    assert load_checkpoint(str(path)) == {'tv'}
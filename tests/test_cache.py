@@ -0,0 +1,25 @@
+"""Tests for the persistent tier of agent.cache"""
+
+import os
+import time
+
+from agent.cache import ResultCache
+from agent.models import Product
+
+
+class _Payload:
+    def __reduce__(self):
+        return (os.system, ('exit 0',))
+
+
+def test_products_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'results.db')
+    ResultCache(path=path).put('Jumia', 'tv', [Product('TV 55"', 4999.0, store='Jumia')])
+    assert ResultCache(path=path).get('Jumia', 'TV') == [Product('TV 55"', 4999.0, store='Jumia')]
+
+
+def test_entries_naming_other_classes_are_misses(tmp_path):
+    path = str(tmp_path / 'results.db')
+    cache = ResultCache(path=path)
+    cache.backend.set(cache.make_key('Jumia', 'tv'), _Payload(), time.time() + 60)
+    assert ResultCache(path=path).get('Jumia', 'tv') is None
@@ -0,0 +1,32 @@
+"""Tests for cross-store product grouping in agent.matching"""
+
+import pytest
+
+from agent.matching import ProductMatcher
+from agent.models import Product
+
+
+def _groups(*names):
+    products = [Product(name, 1000.0 + index, 'MAD', f'Store{index}', f'http://store{index}/p', 'In stock')
+                for index, name in enumerate(names)]
+    return sorted(sorted(offer.name for offer in group.offers) for group in ProductMatcher().group(products))
+
+
+@pytest.mark.parametrize("names", [
+    ("Apple iPhone 15 128GB", "iPhone 15 Pro 128GB", "iPhone 15 Pro Max 128GB"),
+    ("Samsung Galaxy S24 256GB", "Samsung Galaxy S24 Ultra 256GB", "Samsung Galaxy S24+ 256GB"),
+    ("Xiaomi Redmi Note 13 128GB", "Xiaomi Redmi Note 13 Pro 128GB"),
+    ("tv - Basic Model", "tv - Premium Model"),
+    ("laptop - Marjane Brand", "laptop - Store Brand"),
+])
+def test_different_models_stay_apart(names):
+    assert len(_groups(*names)) == len(names)
+
+
+@pytest.mark.parametrize("names", [
+    ("Samsung Galaxy A54 5G 128Go Noir", "Samsung Galaxy A54 128GB Bleu"),
+    ("Apple iPhone 15 Pro 128GB", "iPhone 15 Pro 128 Go Apple"),
+    ("Xiaomi Redmi Note 13 Pro 256GB", "Redmi Note 13 Pro 256 Go Xiaomi"),
+])
+def test_same_model_is_grouped(names):
+    assert len(_groups(*names)) == 1
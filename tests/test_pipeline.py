@@ -0,0 +1,30 @@
+"""Tests for the direct price-lookup detection in agent.pipeline"""
+
+import pytest
+
+from agent.pipeline import parse_price_lookup
+
+
+@pytest.mark.parametrize("message, product", [
+    ("find samsung galaxy a54", "samsung galaxy a54"),
+    ("Search for the cheapest iPhone 15 in Morocco", "iPhone 15"),
+    ("look up the best price for a PS5", "a PS5"),
+    ("What's the cheapest Dell XPS 13?", "Dell XPS 13"),
+])
+def test_plain_lookups_are_detected(message, product):
+    assert parse_price_lookup(message) == product
+
+
+@pytest.mark.parametrize("message", [
+    "show me the second one",
+    "search again",
+    "show me more results",
+    "show me the details of the first product",
+    "get me the link to the cheapest one",
+    "find the cheapest one",
+    "find more results",
+    "search for the first product again",
+    "find laptops under 5000 MAD",
+])
+def test_follow_ups_go_to_the_agent(message):
+    assert parse_price_lookup(message) is None